@@ -1,45 +1,72 @@
-import os
 import json
+import logging
+import os
+import time
 import google.generativeai as genai
-from dotenv import load_dotenv
 from tools.search import WebSearchTool
 from tools.scraper import WebScraperTool
 from tools.analyzer import ContentAnalyzerTool
+from tools.summarizer import ExtractiveSummarizer
+from agent.query_cache import SemanticQueryCache
+from agent.dedup import ParagraphDeduplicator, merge_key_points
+from agent.cancellation import check_cancelled
+from agent.llm_stats import llm_stats
+from agent.gemini import configure_gemini
+from tools.text_utils import tokenize
+from agent.errors import ResearchUnavailable, is_failed_report
 import re
 
-# Load environment variables (ensure .env file exists and is configured)
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
-else:
-    print("Warning: GEMINI_API_KEY not found. Agent LLM features will fail.")
+logger = logging.getLogger(__name__)
 
 class WebResearchAgent:
     """Agent that researches user queries online."""
 
-    def __init__(self, model_name="gemini-2.0-flash"):
+    def __init__(self, model_name="gemini-2.0-flash", llm_model=None, search_tool=None,
+                 scraper_tool=None, analyzer_tool=None, domain_stats=None):
         """
         Initializes the WebResearchAgent.
 
         Args:
             model_name: The name of the Gemini model to use for LLM tasks.
+            llm_model: Optional model used for query analysis and synthesis instead of Gemini;
+                anything with a compatible generate_content(prompt) works.
+            search_tool: Optional replacement for the DuckDuckGo WebSearchTool.
+            scraper_tool: Optional replacement for the WebScraperTool.
+            analyzer_tool: Optional replacement for the Gemini ContentAnalyzerTool.
+            domain_stats: Optional DomainStats that learns from every fetched source and
+                orders (and prunes) the URLs of later runs by their domain's history.
+
+        Raises:
+            ValueError: If Gemini is needed (no llm_model or analyzer_tool given) and
+                GEMINI_API_KEY is not set.
         """
-        if not api_key:
+        if (llm_model is None or analyzer_tool is None) and not configure_gemini():
             raise ValueError("Cannot initialize WebResearchAgent without GEMINI_API_KEY.")
         
-        self.llm_model = genai.GenerativeModel(model_name)
-        self.search_tool = WebSearchTool()
-        self.scraper_tool = WebScraperTool()
+        self.llm_model = llm_model if llm_model is not None else genai.GenerativeModel(model_name)
+        self.search_tool = search_tool if search_tool is not None else WebSearchTool()
+        self.scraper_tool = scraper_tool if scraper_tool is not None else WebScraperTool()
         # Initialize analyzer tool here, it handles its own LLM setup
-        self.analyzer_tool = ContentAnalyzerTool(model_name=model_name)
+        self.analyzer_tool = analyzer_tool if analyzer_tool is not None else \
+            ContentAnalyzerTool(model_name=model_name)
         self.max_search_results = 10  # Increased from 5 to 10
         self.max_sources_to_process = 7  # Increased from 3 to 7
-        print(f"--- Web Research Agent initialized with model: {model_name} ---")
+        # Follow-ups: stored pages must cover this share of the query's terms to be reused,
+        # and with this many reusable pages the new search is skipped entirely
+        self.min_reuse_coverage = 0.6
+        self.sufficient_reused_sources = 3
+        # Reports for semantically equivalent stand-alone questions are served from here
+        self.query_cache = SemanticQueryCache()
+        # Local summarizer standing in for per-source LLM analysis in extractive mode
+        # (WEBSIGHT_ANALYSIS_MODE=extractive, or the extractive_analysis run option)
+        self.summarizer = ExtractiveSummarizer()
+        self.analysis_mode = os.environ.get('WEBSIGHT_ANALYSIS_MODE', 'llm')
+        self.domain_stats = domain_stats
+        logger.info("Web Research Agent initialized", extra={'model': model_name})
 
     def _analyze_query(self, query: str, context: str = None) -> dict:
         """Uses LLM to understand the query and suggest search terms, with optional context from previous interactions."""
-        print(f"--- Analyzing query: {query} ---")
+        logger.info("Analyzing query", extra={'query': query})
         
         # Include context if provided
         context_section = ""
@@ -63,20 +90,21 @@ class WebResearchAgent:
         }}
         """
         try:
-            response = self.llm_model.generate_content(prompt)
+            with llm_stats.timed():
+                response = self.llm_model.generate_content(prompt)
             # Basic cleaning and parsing
             cleaned_response = response.text.strip().strip('```json').strip('```').strip()
             result = json.loads(cleaned_response)
-            print(f"--- Query Analysis Result: {result} ---")
+            logger.info("Query analysis done", extra={'search_query': result.get('search_query')})
             return result
         except Exception as e:
-            print(f"--- Query analysis failed: {e}. Falling back to original query. ---")
+            logger.warning("Query analysis failed, falling back to the original query", extra={'error': str(e)})
             # Fallback strategy
             return {"analysis": "Analysis failed, using original query.", "search_query": query}
 
     def _synthesize(self, analyzed_data: list[dict], original_query: str, context: str = None) -> str:
         """Uses LLM to synthesize the findings into a coherent report with user-friendly formatting."""
-        print(f"--- Synthesizing information from {len(analyzed_data)} sources for query: {original_query} ---")
+        logger.info("Synthesizing report", extra={'sources': len(analyzed_data), 'query': original_query})
         if not analyzed_data:
             return "No relevant information was found or successfully processed from the web search."
 
@@ -89,7 +117,8 @@ class WebResearchAgent:
             
         synthesis_context += "Sources Analyzed:\n"
         source_num = 1
-        for item in analyzed_data:
+        # Sources often restate each other; keep one phrasing of each key point
+        for item in merge_key_points(analyzed_data):
             # Only include sources that were deemed relevant and successfully analyzed
             # Lowered the relevance threshold from 0.3 to 0.15
             if item.get('relevance_score', 0) > 0.15 and not item.get('error') and item.get('summary'):
@@ -118,7 +147,8 @@ class WebResearchAgent:
         """
 
         try:
-            response = self.llm_model.generate_content(prompt)
+            with llm_stats.timed():
+                response = self.llm_model.generate_content(prompt)
             raw_text = response.text
             
             # Further clean up the response to make it user-friendly
@@ -130,10 +160,10 @@ class WebResearchAgent:
             # Format with HTML for better display
             formatted_html = self._format_as_html(cleaned_text)
             
-            print("--- Synthesis successful ---")
+            logger.info("Synthesis successful", extra={'report_chars': len(formatted_html)})
             return formatted_html
         except Exception as e:
-            print(f"--- Synthesis failed: {e} ---")
+            logger.error("Synthesis failed", extra={'error': str(e)})
             return f"Error during synthesis: {e}. Partial data might be available in logs."
 
     def _clean_source_citations(self, text: str) -> str:
@@ -171,92 +201,108 @@ class WebResearchAgent:
                 query_analysis_callback=None, 
                 search_callback=None, 
                 source_callback=None, 
-                synthesis_callback=None) -> str:
-        """Performs the end-to-end web research process."""
-        print(f"=== Starting Research for Query: {query} ===")
-        
-        # 1. Analyze Query
-        query_analysis = self._analyze_query(query)
-        search_keywords = query_analysis.get('search_query', query)
-        
-        # Send query analysis result via callback
-        if query_analysis_callback:
-            query_analysis_callback(query_analysis)
+                synthesis_callback=None,
+                source_store=None,
+                use_cache=True,
+                cancel_token=None,
+                options=None) -> str:
+        """
+        Performs the end-to-end web research process.
 
-        # 2. Search Web
-        search_results = self.search_tool.search(search_keywords, num_results=self.max_search_results)
-        
-        # Send search results via callback
-        if search_callback:
-            search_callback(search_results)
-        
-        if not search_results:
-            print("=== Research Complete (No Search Results) ===")
-            return "Could not find any relevant web pages for the query."
+        source_callback is called as (source_num, total_sources, url, title, status, findings=None);
+        status is "start", "complete" (with the source's relevance_score, summary and key_points
+        as findings), "skipped" or "failed".
 
-        # 3. Scrape & Analyze Results (Iterative)
-        analyzed_content_list = []
-        processed_urls = set()
-        urls_to_process = [r['url'] for r in search_results if r.get('url')]
-        
-        total_sources_to_process = min(len(urls_to_process), self.max_sources_to_process)
-        source_number = 0
+        options lets one run do less work than the agent's defaults (e.g. under load), without
+        touching the shared agent: max_search_results, max_sources_to_process,
+        skip_query_analysis (search for the query as asked), snippets_only (answer from search
+        snippets, without scraping or per-source analysis), extractive_analysis (summarize
+        sources locally instead of with the LLM) and cached_only (answer only from the query cache).
 
-        for url in urls_to_process:
-             if len(analyzed_content_list) >= self.max_sources_to_process:
-                  print(f"--- Reached processing limit ({self.max_sources_to_process} sources) ---")
-                  break # Stop processing if we hit the limit
-            
-             if url in processed_urls or not url:
-                  continue # Skip duplicates or empty URLs
+        Raises:
+            ResearchCancelled: If cancel_token is triggered; the run stops at the next stage,
+                fetch or LLM call.
+            ResearchUnavailable: If options has cached_only and there is no cached answer.
+        """
+        logger.info("Starting research", extra={'query': query})
 
-             source_number += 1
-             processed_urls.add(url)
-             
-             # Get the title if available from search results
-             title = next((r.get('title', 'Untitled') for r in search_results if r.get('url') == url), 'Untitled')
-             
-             # Notify start of source processing
-             if source_callback:
-                 source_callback(source_number, total_sources_to_process, url, title, "start")
-             
-             scrape_data = self.scraper_tool.scrape(url)
+        if use_cache and self.query_cache is not None:
+            cached = self.query_cache.lookup(query)
+            if cached:
+                logger.info("Serving cached report for a similar query", extra={
+                    'matched_query': cached['matched_query'], 'similarity': round(cached['similarity'], 3)})
+                return self._replay_cached(cached, query_analysis_callback, search_callback,
+                                           source_callback, synthesis_callback)
 
-             if scrape_data['error']:
-                 print(f"  Skipping analysis for {url} due to scraping error: {scrape_data['error']}")
-                 # Optionally add error info to a list to report later
-                 continue
-            
-             if scrape_data['raw_text']:
-                 content_analysis = self.analyzer_tool.analyze(scrape_data['raw_text'], query)
-                 # Store analysis result along with URL for synthesis context
-                 analyzed_content_list.append({**content_analysis, 'url': url, 'title': title})
-                 
-                 # Add current relevance to the callback context
-                 if source_callback:
-                     if not content_analysis.get('error'):
-                         source_callback(source_number, total_sources_to_process, url, title, "complete")
-                 
-                 if content_analysis.get('error'):
-                      print(f"  Analysis for {url} resulted in error: {content_analysis['error']}")
-                 else:
-                      print(f"  Analysis for {url} complete. Relevance: {content_analysis.get('relevance_score', 0.0):.2f}")
-             else:
-                  print(f"  Skipping analysis for {url} as no text content was scraped.")
+        final_report, analyzed_data = self._run_research(
+            query, None,
+            query_analysis_callback, search_callback, source_callback, synthesis_callback,
+            source_store, cancel_token, options
+        )
 
-        # 4. Synthesize Findings
+        # Reports from a reduced run (see options) would outlive the load that caused them
+        if use_cache and self.query_cache is not None and not options and \
+                self._is_cacheable(final_report, analyzed_data):
+            sources = [{'url': item['url'], 'title': item.get('title'), **self._source_findings(item)}
+                       for item in analyzed_data if not item.get('error')]
+            self.query_cache.store(query, final_report, sources)
+
+        logger.info("Research complete", extra={'query': query})
+        return final_report
+
+    def _replay_cached(self, cached, query_analysis_callback, search_callback,
+                       source_callback, synthesis_callback) -> str:
+        """Reports a cache hit through the regular callbacks so progress streams look the same."""
+        if query_analysis_callback:
+            query_analysis_callback({
+                "analysis": f"Answered from a recent research on \"{cached['matched_query']}\".",
+                "search_query": None,
+                "cache_hit": {
+                    "matched_query": cached['matched_query'],
+                    "similarity": round(cached['similarity'], 3),
+                    "age_seconds": int(cached['age_seconds']),
+                    "report_id": cached['report_id']
+                }
+            })
+        if search_callback:
+            search_callback([])
+        sources = cached['sources']
+        for i, source in enumerate(sources, start=1):
+            if source_callback:
+                source_callback(i, len(sources), source['url'], source.get('title') or 'Untitled', "start")
+                source_callback(i, len(sources), source['url'], source.get('title') or 'Untitled', "complete",
+                                self._source_findings(source))
         if synthesis_callback:
             synthesis_callback()
-        
-        final_report = self._synthesize(analyzed_content_list, query)
-        print(f"=== Research Complete for Query: {query} ===")
-        return final_report
+        return cached['report']
+
+    @staticmethod
+    def _source_findings(analysis: dict) -> dict:
+        """The part of a source's analysis shown to the user while the report is still being written."""
+        return {
+            'relevance_score': analysis.get('relevance_score', 0.0),
+            'summary': analysis.get('summary', ''),
+            'key_points': analysis.get('key_points', [])
+        }
+
+    @staticmethod
+    def _is_cacheable(report: str, analyzed_data: list[dict]) -> bool:
+        """Only reports actually synthesized from analyzed sources are worth reusing."""
+        if not any(not item.get('error') and item.get('summary') for item in analyzed_data):
+            return False
+        # Sources summarized locally because the LLM failed make a weaker report than usual
+        if any(item.get('llm_error') for item in analyzed_data):
+            return False
+        return not is_failed_report(report)
 
     def research_with_context(self, query: str, context: str,
                          query_analysis_callback=None, 
                          search_callback=None, 
                          source_callback=None, 
-                         synthesis_callback=None) -> str:
+                         synthesis_callback=None,
+                         source_store=None,
+                         cancel_token=None,
+                         options=None) -> str:
         """
         Performs the end-to-end web research process with awareness of previous conversation context.
         
@@ -264,47 +310,143 @@ class WebResearchAgent:
             query: The research query from the user
             context: Previous conversation history/context
             callbacks: Various callback functions for progress tracking
+            source_store: Optional SourceStore holding pages fetched in earlier turns
+                of the conversation; they are re-ranked against the new query and
+                reused before anything new is searched for or fetched.
+            cancel_token: Optional CancelToken; see research().
+            options: Optional per-run limits; see research().
             
         Returns:
             A comprehensive research report
         """
-        print(f"=== Starting Context-Aware Research for Query: {query} ===")
-        
-        # 1. Analyze Query with context awareness
-        query_analysis = self._analyze_query(query, context)
-        search_keywords = query_analysis.get('search_query', query)
-        
+        logger.info("Starting context-aware research", extra={'query': query})
+        final_report, _ = self._run_research(
+            query, context,
+            query_analysis_callback, search_callback, source_callback, synthesis_callback,
+            source_store, cancel_token, options
+        )
+        logger.info("Context-aware research complete", extra={'query': query})
+        return final_report
+
+    def _run_research(self, query, context, query_analysis_callback, search_callback,
+                      source_callback, synthesis_callback, source_store, cancel_token=None,
+                      options=None) -> tuple:
+        """
+        Shared research pipeline behind research() and research_with_context().
+
+        Returns:
+            A tuple of the final report and the list of per-source analyses it was built from.
+        """
+        options = options or {}
+        if options.get('cached_only'):
+            raise ResearchUnavailable("No recent research matches this question, and new research "
+                                      "is paused while WebSight is overloaded. Please try again shortly.")
+        max_sources = options.get('max_sources_to_process', self.max_sources_to_process)
+        max_results = options.get('max_search_results', self.max_search_results)
+        extractive = options.get('extractive_analysis', self.analysis_mode == 'extractive')
+        # Tools only receive the token when there is one, so simpler tool implementations keep working
+        cancel_kwargs = {'cancel_token': cancel_token} if cancel_token is not None else {}
+        analyzed_content_list = []
+        # Paragraphs repeated across this turn's sources (site chrome, syndicated text) are analyzed once
+        deduplicator = ParagraphDeduplicator()
+
+        # 1. Re-rank pages already fetched in this conversation against the new query
+        reused_sources = []
+        if source_store is not None and len(source_store):
+            ranked = source_store.rank(query, top_k=max_sources)
+            reused_sources = [r for r in ranked if r['coverage'] >= self.min_reuse_coverage]
+            logger.info("Stored sources matched", extra={'reused': len(reused_sources), 'stored': len(source_store)})
+
+        enough_reused = len(reused_sources) >= self.sufficient_reused_sources
+
+        # 2. Analyze Query (skipped when stored sources already cover the query)
+        if enough_reused:
+            query_analysis = {
+                "analysis": f"Answering from {len(reused_sources)} previously analyzed sources.",
+                "search_query": None
+            }
+        elif options.get('skip_query_analysis'):
+            query_analysis = {"analysis": "Searching for the question as asked.", "search_query": query}
+        else:
+            check_cancelled(cancel_token)
+            query_analysis = self._analyze_query(query, context)
+        search_keywords = query_analysis.get('search_query') or query
+
         # Send query analysis result via callback
         if query_analysis_callback:
             query_analysis_callback(query_analysis)
 
-        # 2. Search Web
-        search_results = self.search_tool.search(search_keywords, num_results=self.max_search_results)
-        
+        # 3. Search Web, only for what the stored sources don't cover
+        search_results = []
+        if not enough_reused:
+            check_cancelled(cancel_token)
+            search_results = self.search_tool.search(search_keywords, num_results=max_results,
+                                                     **cancel_kwargs)
+
         # Send search results via callback
         if search_callback:
             search_callback(search_results)
-        
-        if not search_results:
-            print("=== Research Complete (No Search Results) ===")
-            return "Could not find any relevant web pages for the query."
 
-        # 3. Scrape & Analyze Results (Iterative)
-        analyzed_content_list = []
-        processed_urls = set()
-        urls_to_process = [r['url'] for r in search_results if r.get('url')]
-        
-        total_sources_to_process = min(len(urls_to_process), self.max_sources_to_process)
+        if not search_results and not reused_sources:
+            logger.info("Research complete without search results")
+            return "Could not find any relevant web pages for the query.", analyzed_content_list
+
+        processed_urls = {r['url'] for r in reused_sources}
+        new_urls = []
+        for r in search_results:
+            url = r.get('url')
+            # Pages already in the store were ranked above; don't fetch them again
+            if url and url not in processed_urls and url not in new_urls and \
+                    (source_store is None or url not in source_store):
+                new_urls.append(url)
+
+        if options.get('snippets_only'):
+            # Search snippets stand in for scraped and analyzed pages
+            search_results = [r for r in search_results if r.get('url') in new_urls]
+            new_urls = []
+            analyzed_content_list = self._analyze_snippets(search_results[:max_sources], query, source_callback)
+
+        if self.domain_stats is not None and new_urls:
+            # Domains that have been fast and relevant before are fetched first
+            new_urls, pruned_urls = self.domain_stats.order(new_urls, keep=max_sources)
+            if pruned_urls:
+                logger.info("Pruned sources from poor domains", extra={'pruned': len(pruned_urls)})
+
+        total_sources_to_process = min(len(reused_sources) + len(new_urls), max_sources)
         source_number = 0
 
-        for url in urls_to_process:
-             if len(analyzed_content_list) >= self.max_sources_to_process:
-                  print(f"--- Reached processing limit ({self.max_sources_to_process} sources) ---")
+        def skip(url, title, reason):
+            logger.info("Skipping source", extra={'url': url, 'reason': reason})
+            if source_callback:
+                source_callback(source_number, total_sources_to_process, url, title, "skipped")
+
+        # 4a. Analyze the best passages of stored pages (no fetching needed)
+        for stored in reused_sources:
+            check_cancelled(cancel_token)
+            source_number += 1
+            url, title = stored['url'], stored['title']
+            if source_callback:
+                source_callback(source_number, total_sources_to_process, url, title, "start")
+
+            passages_text = deduplicator.filter("\n".join(stored['passages']))
+            content_analysis = source_store.get_analysis(url, query)
+            if content_analysis is None:
+                if not passages_text:
+                    skip(url, title, "its passages repeat earlier sources.")
+                    continue
+                content_analysis = self._analyze_content(passages_text, query, extractive, cancel_kwargs)
+                if self._is_storable(content_analysis):
+                    source_store.add_analysis(url, query, content_analysis)
+            self._record_analysis(analyzed_content_list, content_analysis, url, title,
+                                  source_number, total_sources_to_process, source_callback)
+
+        # 4b. Scrape & Analyze new results (Iterative)
+        for url in new_urls:
+             if len(analyzed_content_list) >= max_sources:
+                  logger.info("Reached the source processing limit", extra={'max_sources': max_sources})
                   break # Stop processing if we hit the limit
-            
-             if url in processed_urls or not url:
-                  continue # Skip duplicates or empty URLs
 
+             check_cancelled(cancel_token)
              source_number += 1
              processed_urls.add(url)
              
@@ -315,124 +457,105 @@ class WebResearchAgent:
              if source_callback:
                  source_callback(source_number, total_sources_to_process, url, title, "start")
              
-             scrape_data = self.scraper_tool.scrape(url)
+             fetch_started = time.perf_counter()
+             scrape_data = self.scraper_tool.scrape(url, **cancel_kwargs)
+             if self.domain_stats is not None:
+                 self.domain_stats.record_fetch(url, time.perf_counter() - fetch_started,
+                                                not scrape_data['error'], len(scrape_data['raw_text'] or ''))
 
              if scrape_data['error']:
-                 print(f"  Skipping analysis for {url} due to scraping error: {scrape_data['error']}")
+                 skip(url, title, f"scraping error: {scrape_data['error']}")
                  continue
             
              if scrape_data['raw_text']:
-                 # Use context-aware analysis
-                 content_analysis = self.analyzer_tool.analyze(scrape_data['raw_text'], query)
-                 # Store analysis result along with URL for synthesis context
-                 analyzed_content_list.append({**content_analysis, 'url': url, 'title': title})
-                 
-                 # Add current relevance to the callback context
-                 if source_callback:
-                     if not content_analysis.get('error'):
-                         source_callback(source_number, total_sources_to_process, url, title, "complete")
-                 
-                 if content_analysis.get('error'):
-                      print(f"  Analysis for {url} resulted in error: {content_analysis['error']}")
-                 else:
-                      print(f"  Analysis for {url} complete. Relevance: {content_analysis.get('relevance_score', 0.0):.2f}")
+                 if source_store is not None:
+                     source_store.add_page(url, title, scrape_data['raw_text'])
+                 unique_text = deduplicator.filter(scrape_data['raw_text'])
+                 if not unique_text:
+                     skip(url, title, "its content repeats earlier sources.")
+                     continue
+                 content_analysis = self._analyze_content(unique_text, query, extractive, cancel_kwargs)
+                 if source_store is not None and self._is_storable(content_analysis):
+                     source_store.add_analysis(url, query, content_analysis)
+                 if self.domain_stats is not None and self._is_storable(content_analysis):
+                     # Local summaries score on a different scale than the LLM's analyses
+                     self.domain_stats.record_relevance(url, content_analysis.get('relevance_score', 0))
+                 self._record_analysis(analyzed_content_list, content_analysis, url, title,
+                                       source_number, total_sources_to_process, source_callback)
              else:
-                  print(f"  Skipping analysis for {url} as no text content was scraped.")
+                  skip(url, title, "no text content was scraped.")
 
-        # 4. Synthesize Findings with context awareness
+        dedup_stats = deduplicator.stats()
+        if dedup_stats['blocks_removed']:
+            logger.info("Removed blocks repeated across sources", extra={
+                'blocks_removed': dedup_stats['blocks_removed'], 'chars_removed': dedup_stats['chars_removed']})
+
+        # 5. Synthesize Findings
+        check_cancelled(cancel_token)
         if synthesis_callback:
             synthesis_callback()
         
-        final_report = self._synthesize(analyzed_content_list, query, context)
-        print(f"=== Context-Aware Research Complete for Query: {query} ===")
-        return final_report
+        return self._synthesize(analyzed_content_list, query, context), analyzed_content_list
 
-    def process_search_results(self, search_results: dict, query: str) -> list:
-        """Process the search results, scrape and analyze content from the top results."""
-        print(f"--- Processing search results for query: {query} ---")
-        
-        processed_results = []
-        
-        # Take top N results
-        top_results = search_results.get("results", [])[:self.max_sources_to_process]
-        
-        if not top_results:
-            print("--- No search results to process ---")
-            return []
-        
-        for result in top_results:
-            try:
-                # Extract URL and title
-                url = result.get("href", "")
-                title = result.get("title", "No title")
-                
-                if not url:
-                    continue
-                    
-                print(f"\n--- Processing result: {title} ---")
-                print(f"--- URL: {url} ---")
-                
-                # Scrape content
-                scraped_content = self.scraper_tool.scrape(url)
-                
-                if not scraped_content or len(scraped_content) < 100:  # Skip if too little content
-                    print(f"--- Skipping {url}: insufficient content ---")
-                    continue
-                    
-                # Analyze content
-                analysis = self.analyzer_tool.analyze(scraped_content, query)
-                
-                # Check if analysis failed
-                if analysis.get('error'):
-                    print(f"--- Warning: Analysis had an error: {analysis.get('error')} ---")
-                    # If there's an error but we still have a summary or key points, we can use them
-                    if not analysis.get('summary') and not analysis.get('key_points'):
-                        # Create a basic analysis based on the presence of keywords in the content
-                        keywords = [kw for kw in self.analyzer_tool._extract_keywords(query) if len(kw) > 3]
-                        if keywords and any(kw.lower() in scraped_content.lower() for kw in keywords):
-                            # Create a minimal analysis with keyword-based extraction
-                            print("--- Creating fallback analysis based on keywords ---")
-                            analysis['relevance_score'] = 0.3  # Assign moderate-low relevance
-                            analysis['summary'] = f"Content from {title} that may be relevant to {query}"
-                            # Extract sentences containing keywords as key points
-                            sentences = [s.strip() for s in scraped_content.split('.') if s.strip()]
-                            relevant_sentences = []
-                            for sentence in sentences[:100]:  # Look at first 100 sentences max
-                                if any(kw.lower() in sentence.lower() for kw in keywords):
-                                    relevant_sentences.append(sentence + '.')
-                                    if len(relevant_sentences) >= 3:
-                                        break
-                            if relevant_sentences:
-                                analysis['key_points'] = relevant_sentences
-                
-                # Filter out results with very low relevance
-                if analysis.get('relevance_score', 0) < 0.1:
-                    print(f"--- Skipping {url}: low relevance score {analysis.get('relevance_score')} ---")
-                    continue
-                    
-                # Add to processed results
-                processed_result = {
-                    "title": title,
-                    "url": url,
-                    "summary": analysis.get("summary", ""),
-                    "key_points": analysis.get("key_points", []),
-                    "relevance_score": analysis.get("relevance_score", 0.0)
-                }
-                processed_results.append(processed_result)
-                
-            except Exception as e:
-                print(f"--- Error processing result: {e} ---")
+    def _analyze_content(self, text: str, query: str, extractive: bool, cancel_kwargs: dict) -> dict:
+        """Analyzes one source's text with the LLM analyzer, or locally in extractive mode."""
+        if extractive:
+            check_cancelled(cancel_kwargs.get('cancel_token'))
+            return self.summarizer.summarize(text, query)
+        return self.analyzer_tool.analyze(text, query, **cancel_kwargs)
+
+    @staticmethod
+    def _is_storable(content_analysis: dict) -> bool:
+        """Whether an analysis is kept for follow-ups; local summaries are redone by the LLM when it's back."""
+        return not content_analysis.get('error') and content_analysis.get('method') != 'extractive'
+
+    def _analyze_snippets(self, search_results: list[dict], query: str, source_callback) -> list:
+        """
+        Turns search results into analyses without fetching or calling the LLM.
+
+        A snippet's relevance is the share of the query's terms it mentions.
+        """
+        query_terms = set(tokenize(query))
+        analyses = []
+        for i, result in enumerate(search_results, start=1):
+            snippet = result.get('snippet') or ''
+            if not snippet:
                 continue
-        
-        # Sort by relevance score (high to low)
-        processed_results.sort(key=lambda x: x["relevance_score"], reverse=True)
-        
-        print(f"--- Processed {len(processed_results)} search results ---")
-        return processed_results
+            title = result.get('title') or 'Untitled'
+            if source_callback:
+                source_callback(i, len(search_results), result['url'], title, "start")
+            terms = set(tokenize(f"{title} {snippet}"))
+            analysis = {
+                'summary': snippet,
+                'key_points': [],
+                'relevance_score': len(query_terms & terms) / len(query_terms) if query_terms else 0.5,
+                'error': None
+            }
+            self._record_analysis(analyses, analysis, result['url'], title,
+                                  i, len(search_results), source_callback)
+        return analyses
+
+    def _record_analysis(self, analyzed_content_list, content_analysis, url, title,
+                         source_number, total_sources_to_process, source_callback):
+        """Stores an analysis result along with its URL for synthesis context and reports it."""
+        analyzed_content_list.append({**content_analysis, 'url': url, 'title': title})
+
+        if source_callback:
+            if content_analysis.get('error'):
+                source_callback(source_number, total_sources_to_process, url, title, "failed")
+            else:
+                # Findings go out now, so the UI can show them long before synthesis finishes
+                source_callback(source_number, total_sources_to_process, url, title, "complete",
+                                self._source_findings(content_analysis))
+
+        if content_analysis.get('error'):
+             logger.warning("Source analysis failed", extra={'url': url, 'error': content_analysis['error']})
+        else:
+             logger.info("Source analyzed", extra={'url': url, 'relevance': content_analysis.get('relevance_score', 0.0)})
 
 # Example usage (for testing - requires API key in .env)
 if __name__ == '__main__':
-    if not api_key:
+    if not configure_gemini():
         print("Skipping WebResearchAgent test because GEMINI_API_KEY is not set.")
     else:
         agent = WebResearchAgent()
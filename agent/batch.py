@@ -0,0 +1,270 @@
+import argparse
+import copy
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from agent.errors import is_failed_report
+from agent.query_cache import SemanticQueryCache
+
+logger = logging.getLogger(__name__)
+
+
+class _SharedResults:
+    """Thread-safe memo that computes each key once, even when requested concurrently."""
+
+    def __init__(self):
+        self._results = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute, should_cache=lambda result: True):
+        while True:
+            with self._lock:
+                if key in self._results:
+                    self.hits += 1
+                    return self._results[key]
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another query is already computing this key; wait and re-check
+            event.wait()
+
+        try:
+            result = compute()
+            if should_cache(result):
+                with self._lock:
+                    self._results[key] = result
+            return result
+        finally:
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+
+class CachingScraper:
+    """Wraps a WebScraperTool so each URL is fetched at most once per batch."""
+
+    def __init__(self, scraper_tool):
+        self.scraper_tool = scraper_tool
+        self.cache = _SharedResults()
+
+    def scrape(self, url: str, *args, **kwargs) -> dict:
+        # Failed fetches are not cached so a later query may retry them
+        return self.cache.get_or_compute(
+            url, lambda: self.scraper_tool.scrape(url, *args, **kwargs),
+            should_cache=lambda result: not result.get('error')
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.scraper_tool, name)
+
+
+class CachingAnalyzer:
+    """Wraps a ContentAnalyzerTool so identical (content, query) analyses run once per batch."""
+
+    def __init__(self, analyzer_tool):
+        self.analyzer_tool = analyzer_tool
+        self.cache = _SharedResults()
+
+    def analyze(self, content: str, query_context: str, *args, **kwargs) -> dict:
+        key = (hashlib.sha1(content.encode('utf-8', 'ignore')).hexdigest(), _normalize(query_context))
+        return self.cache.get_or_compute(
+            key, lambda: self.analyzer_tool.analyze(content, query_context, *args, **kwargs),
+            should_cache=lambda result: not result.get('error') and not result.get('llm_error')
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.analyzer_tool, name)
+
+
+def _normalize(query: str) -> str:
+    return ' '.join(query.lower().split())
+
+
+def _query_id(item: dict) -> str:
+    if item.get('id') is not None:
+        return str(item['id'])
+    return hashlib.sha1(_normalize(item['query']).encode('utf-8')).hexdigest()[:16]
+
+
+class BatchResearchRunner:
+    """
+    Runs many research queries through one WebResearchAgent.
+
+    Queries share a fixed pool of workers, and page fetches and content
+    analyses are shared between queries. Results are appended to a JSONL
+    file as they finish, and queries already recorded as successful are
+    skipped on the next run, so an interrupted batch resumes where it stopped.
+    """
+
+    def __init__(self, agent, max_workers: int = 4, output_path: str = None):
+        """
+        Initializes the BatchResearchRunner.
+
+        Args:
+            agent: The WebResearchAgent to run queries with. It is copied, not modified.
+            max_workers: Number of queries researched concurrently.
+            output_path: JSONL file results are appended to (and resumed from).
+        """
+        self.agent = copy.copy(agent)
+        self.agent.scraper_tool = CachingScraper(agent.scraper_tool)
+        self.agent.analyzer_tool = CachingAnalyzer(agent.analyzer_tool)
+        # A shallow copy would share the caller's cache; batch answers go into one of their own
+        if getattr(agent, 'query_cache', None) is not None:
+            cache = agent.query_cache
+            self.agent.query_cache = SemanticQueryCache(cache.threshold, cache.ttl_seconds, cache.max_entries)
+        self.max_workers = max_workers
+        self.output_path = output_path
+        self._write_lock = threading.Lock()
+
+    def completed_ids(self) -> set:
+        """Returns the IDs of queries already recorded as successful in the output file."""
+        done = set()
+        if not self.output_path or not os.path.exists(self.output_path):
+            return done
+        with open(self.output_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut short by an interruption
+                if record.get('status') == 'ok':
+                    done.add(str(record.get('id')))
+        return done
+
+    def run(self, items: list[dict]) -> dict:
+        """
+        Researches every query that has no successful result yet.
+
+        Args:
+            items: Dictionaries with a 'query' and optionally an 'id' and a 'context'.
+
+        Returns:
+            Run statistics, including throughput in queries per minute.
+        """
+        done = self.completed_ids()
+        pending = {}
+        skipped = 0
+        for item in items:
+            if not item.get('query'):
+                continue
+            qid = _query_id(item)
+            if qid in done:
+                skipped += 1
+                continue
+            # Identical queries are researched once and recorded under each ID
+            key = (_normalize(item['query']), item.get('context') or '')
+            group = pending.setdefault(key, {'query': item['query'], 'context': item.get('context'), 'ids': []})
+            group['ids'].append(qid)
+
+        to_run = sum(len(group['ids']) for group in pending.values())
+        logger.info("Batch started", extra={'to_run': to_run, 'skipped': skipped})
+        stats = {'total': to_run + skipped, 'skipped': skipped,
+                 'succeeded': 0, 'failed': 0}
+        started = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch") as executor:
+            futures = {
+                executor.submit(self._research_one, group['query'], group['context']): group['ids']
+                for group in pending.values()
+            }
+            for future in as_completed(futures):
+                record = future.result()
+                for qid in futures[future]:
+                    self._write({**record, 'id': qid})
+                    stats['succeeded' if record['status'] == 'ok' else 'failed'] += 1
+                finished = stats['succeeded'] + stats['failed']
+                logger.info("Batch progress", extra={
+                    'finished': finished, 'to_run': to_run,
+                    'queries_per_minute': round(self._per_minute(finished, time.time() - started), 1)})
+
+        elapsed = time.time() - started
+        stats.update({
+            'elapsed_s': round(elapsed, 2),
+            'queries_per_minute': round(self._per_minute(stats['succeeded'] + stats['failed'], elapsed), 2),
+            'scrape_cache_hits': self.agent.scraper_tool.cache.hits,
+            'analysis_cache_hits': self.agent.analyzer_tool.cache.hits,
+        })
+        return stats
+
+    def _research_one(self, query: str, context: str) -> dict:
+        sources = []
+
+        def source_callback(source_num, total_sources, url, title, status, *args):
+            if status == "complete":
+                sources.append({'url': url, 'title': title})
+
+        started = time.time()
+        record = {'query': query, 'started_at': started}
+        try:
+            if context:
+                report = self.agent.research_with_context(query, context, source_callback=source_callback)
+            else:
+                report = self.agent.research(query, source_callback=source_callback)
+            if is_failed_report(report):
+                # Recorded as a failure, so a resumed batch tries the query again
+                record.update({'status': 'error', 'report': None, 'sources': sources, 'error': report})
+            else:
+                record.update({'status': 'ok', 'report': report, 'sources': sources, 'error': None})
+        except Exception as e:
+            record.update({'status': 'error', 'report': None, 'sources': sources, 'error': str(e)})
+        record['finished_at'] = time.time()
+        record['duration_s'] = round(record['finished_at'] - started, 2)
+        return record
+
+    def _write(self, record: dict):
+        if not self.output_path:
+            return
+        with self._write_lock:
+            with open(self.output_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+
+    @staticmethod
+    def _per_minute(count: int, elapsed: float) -> float:
+        return count * 60.0 / elapsed if elapsed > 0 else 0.0
+
+
+def read_queries(path: str) -> list[dict]:
+    """Reads queries from a JSONL file; each line is an object with 'query' or a bare JSON string."""
+    items = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            items.append({'query': item} if isinstance(item, str) else item)
+    return items
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run research queries in bulk from a JSONL file.")
+    parser.add_argument('input', help="JSONL file with one {\"id\": ..., \"query\": ...} object per line")
+    parser.add_argument('-o', '--output', required=True, help="JSONL file results are appended to")
+    parser.add_argument('-w', '--workers', type=int, default=4, help="Queries researched concurrently")
+    parser.add_argument('--model', default="gemini-2.0-flash", help="Gemini model name")
+    args = parser.parse_args(argv)
+
+    # Imported here so the caching helpers above can be used without the LLM stack
+    from agent.agent import WebResearchAgent
+
+    runner = BatchResearchRunner(WebResearchAgent(model_name=args.model),
+                                 max_workers=args.workers, output_path=args.output)
+    stats = runner.run(read_queries(args.input))
+    print(json.dumps(stats, indent=2))
+    return 0 if stats['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
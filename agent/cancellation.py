@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchCancelled(Exception):
+    """Raised inside the research pipeline once its cancel token has been triggered."""
+
+
+class CancelToken:
+    """
+    Cooperative cancellation flag shared between a research run and its owner.
+
+    The pipeline calls raise_if_cancelled() between stages and before every
+    fetch and LLM call, and uses wait() instead of time.sleep() so delays end
+    early. An optional poll function lets the token notice cancellation
+    requested elsewhere (for example by another worker process); it is
+    consulted at most once per poll_interval.
+    """
+
+    def __init__(self, poll=None, poll_interval: float = 1.0):
+        """
+        Initializes the CancelToken.
+
+        Args:
+            poll: Optional callable returning a reason string (or True) when the
+                run should be cancelled, and a falsy value otherwise.
+            poll_interval: Minimum number of seconds between two poll() calls.
+        """
+        self.poll = poll
+        self.poll_interval = poll_interval
+        self.reason = None
+        self._event = threading.Event()
+        self._last_poll = 0.0
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.poll and time.time() - self._last_poll >= self.poll_interval:
+            self._last_poll = time.time()
+            try:
+                reason = self.poll()
+            except Exception:
+                logger.exception("Cancellation check failed")
+                reason = None
+            if reason:
+                self.cancel(reason if isinstance(reason, str) else "cancelled")
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise ResearchCancelled(self.reason)
+
+    def wait(self, seconds: float) -> bool:
+        """Sleeps up to seconds, returning early (True) if the token is cancelled meanwhile."""
+        deadline = time.time() + seconds
+        while not self.cancelled:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            self._event.wait(min(remaining, self.poll_interval if self.poll else remaining))
+        return True
+
+
+def check_cancelled(cancel_token):
+    """Raises ResearchCancelled if a (possibly absent) token has been cancelled."""
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
@@ -0,0 +1,107 @@
+import hashlib
+import re
+
+from tools.text_utils import tokenize
+
+_NORMALIZE_RE = re.compile(r'[^a-z0-9]+')
+
+
+def _fingerprint(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ParagraphDeduplicator:
+    """
+    Strips paragraphs already seen in earlier sources of the same research turn.
+
+    Every block of text (one line of scraped text) is fingerprinted. Short
+    blocks such as navigation, cookie banners and legal lines are matched
+    exactly; longer blocks are split into word shingles and dropped when
+    most of their shingles were already seen, which catches syndicated
+    paragraphs that differ in a word or two.
+    """
+
+    def __init__(self, shingle_size: int = 4, containment_threshold: float = 0.75):
+        """
+        Initializes the ParagraphDeduplicator.
+
+        Args:
+            shingle_size: Number of words per shingle.
+            containment_threshold: Share of a block's shingles that must already
+                have been seen for the block to count as a duplicate.
+        """
+        self.shingle_size = shingle_size
+        self.containment_threshold = containment_threshold
+        self._blocks = set()
+        self._shingles = set()
+        self.blocks_seen = 0
+        self.blocks_removed = 0
+        self.chars_removed = 0
+
+    def filter(self, text: str) -> str:
+        """Returns the text without blocks that repeat earlier ones, and remembers the new blocks."""
+        kept = []
+        for block in text.splitlines():
+            block = block.strip()
+            if not block:
+                continue
+            self.blocks_seen += 1
+            if self._is_duplicate(block):
+                self.blocks_removed += 1
+                self.chars_removed += len(block)
+            else:
+                kept.append(block)
+        return '\n'.join(kept)
+
+    def _is_duplicate(self, block: str) -> bool:
+        normalized = _NORMALIZE_RE.sub(' ', block.lower()).strip()
+        if not normalized:
+            return False
+        block_hash = _fingerprint(normalized)
+        if block_hash in self._blocks:
+            return True
+        self._blocks.add(block_hash)
+
+        words = normalized.split()
+        if len(words) < self.shingle_size * 2:
+            # Too short for shingles to be meaningful; exact matches only
+            return False
+        shingles = {_fingerprint(' '.join(words[i:i + self.shingle_size]))
+                    for i in range(len(words) - self.shingle_size + 1)}
+        seen = len(shingles & self._shingles)
+        self._shingles.update(shingles)
+        return seen / len(shingles) >= self.containment_threshold
+
+    def stats(self) -> dict:
+        return {
+            'blocks_seen': self.blocks_seen,
+            'blocks_removed': self.blocks_removed,
+            'chars_removed': self.chars_removed
+        }
+
+
+def merge_key_points(analyzed_data: list[dict], similarity_threshold: float = 0.7) -> list[dict]:
+    """
+    Drops key points that nearly repeat a point already made by a more relevant source.
+
+    Points are compared by the Jaccard similarity of their word sets. Sources are
+    visited from most to least relevant, so the best-scored phrasing is kept. The
+    returned items are copies in the original order; the input is not modified.
+    """
+    kept_points = []
+    merged = {}
+    order = sorted(range(len(analyzed_data)),
+                   key=lambda i: analyzed_data[i].get('relevance_score', 0) or 0, reverse=True)
+    for i in order:
+        item = analyzed_data[i]
+        points = []
+        for point in item.get('key_points') or []:
+            terms = set(tokenize(str(point)))
+            if not terms:
+                continue
+            if any(len(terms & other) / len(terms | other) >= similarity_threshold for other in kept_points):
+                continue
+            kept_points.append(terms)
+            points.append(point)
+        merged[i] = {**item, 'key_points': points}
+    return [merged[i] for i in range(len(analyzed_data))]
@@ -0,0 +1,253 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DOMAIN_MAX_AGE = 90 * 24 * 3600  # seconds a domain's stats are kept after its last fetch
+# Weight of the newest observation in each moving average, so a site that changes is re-learned
+EWMA_ALPHA = 0.2
+# What an unknown domain is assumed to be like, worth this many observations
+PRIOR_WEIGHT = 2
+PRIOR_SUCCESS = 0.8
+PRIOR_RELEVANCE = 0.5
+PRIOR_LATENCY = 2.0
+# A fetch taking this many seconds halves a domain's value
+LATENCY_SCALE = 4.0
+# Pages with less text than this are paywalls, consent walls or error pages, not sources
+MIN_USEFUL_CHARS = 200
+# How much a search result's position counts against its domain's prior
+RANK_DECAY = 0.1
+
+
+def domain_of(url: str) -> str:
+    """The host a URL is fetched from, lowercased and without a leading 'www.'."""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class DomainStats:
+    """
+    Persistent fetch and relevance history of the domains sources come from.
+
+    After every source the agent records how long its page took to fetch,
+    whether that gave usable text and how much, and the relevance score its
+    analysis got. Each is kept as a moving average per domain, smoothed
+    towards a neutral prior until a domain has a few observations, so one
+    slow fetch doesn't bury a site. Before fetching, candidate URLs are
+    ordered by their domain's expected relevance per unit of latency,
+    weighted by search rank; domains that have reliably failed or scored
+    low are pruned, and come back once their stats are `retry_after`
+    seconds old.
+    """
+
+    def __init__(self, path: str, max_age: float = DOMAIN_MAX_AGE, min_samples: int = 5,
+                 min_success: float = 0.25, min_relevance: float = 0.2, retry_after: float = 24 * 3600):
+        """
+        Initializes the DomainStats.
+
+        Args:
+            path: SQLite database file; several worker processes can share it (and the report store's).
+            max_age: Seconds a domain's stats are kept after they were last updated.
+            min_samples: Observations a domain needs before it can be pruned.
+            min_success: Domains whose usable fetch rate is below this are pruned.
+            min_relevance: Domains whose average relevance score is below this are pruned.
+            retry_after: Seconds after its last update a pruned domain is tried again.
+        """
+        self.path = path
+        self.max_age = max_age
+        self.min_samples = min_samples
+        self.min_success = min_success
+        self.min_relevance = min_relevance
+        self.retry_after = retry_after
+        self._local = threading.local()
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS domains (
+                domain TEXT PRIMARY KEY, fetches INTEGER NOT NULL, failures INTEGER NOT NULL,
+                success REAL NOT NULL, latency REAL NOT NULL, chars REAL,
+                analyses INTEGER NOT NULL DEFAULT 0, relevance REAL, updated_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS domains_updated ON domains (updated_at);
+        """)
+        self.recorded = 0
+        self.reordered = 0
+        self.pruned = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record_fetch(self, url: str, seconds: float, ok: bool, chars: int = 0):
+        """
+        Records a page fetch.
+
+        Args:
+            url: The page's URL.
+            seconds: How long the fetch took.
+            ok: Whether it succeeded; a page under MIN_USEFUL_CHARS of text counts as failed.
+            chars: Characters of text extracted from the page.
+        """
+        useful = 1.0 if ok and chars >= MIN_USEFUL_CHARS else 0.0
+        self._write("""
+            INSERT INTO domains (domain, fetches, failures, success, latency, chars, updated_at)
+            VALUES (:domain, 1, 1 - :useful, :useful, :seconds, :chars, :now)
+            ON CONFLICT (domain) DO UPDATE SET
+                fetches = fetches + 1,
+                failures = failures + 1 - :useful,
+                success = success + :alpha * (:useful - success),
+                latency = latency + :alpha * (:seconds - latency),
+                chars = CASE WHEN :chars IS NULL THEN chars WHEN chars IS NULL THEN :chars
+                             ELSE chars + :alpha * (:chars - chars) END,
+                updated_at = :now
+        """, {'domain': domain_of(url), 'useful': useful, 'seconds': max(seconds, 0.0),
+              'chars': chars if ok else None, 'alpha': EWMA_ALPHA, 'now': time.time()})
+
+    def record_relevance(self, url: str, score: float):
+        """Records the relevance score the analysis of a fetched page got."""
+        self._write("""
+            UPDATE domains SET
+                analyses = analyses + 1,
+                relevance = CASE WHEN relevance IS NULL THEN :score
+                                 ELSE relevance + :alpha * (:score - relevance) END,
+                updated_at = :now
+            WHERE domain = :domain
+        """, {'domain': domain_of(url), 'score': min(max(float(score), 0.0), 1.0), 'alpha': EWMA_ALPHA,
+              'now': time.time()})
+
+    def _write(self, sql: str, params: dict):
+        # Learning is best effort: a busy or broken database must not fail the research run
+        try:
+            self._connect().execute(sql, params)
+            self.recorded += 1
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning("Could not record domain stats", extra={'domain': params['domain'], 'error': str(e)})
+
+    def get(self, url: str) -> dict:
+        """The smoothed estimates for a URL's domain (the prior for a domain never seen)."""
+        domain = domain_of(url)
+        return self._lookup([domain])[domain]
+
+    def _lookup(self, domains: list) -> dict:
+        known = {}
+        try:
+            placeholders = ', '.join('?' * len(domains))
+            rows = self._connect().execute(
+                f"SELECT domain, fetches, success, latency, chars, analyses, relevance, updated_at "
+                f"FROM domains WHERE domain IN ({placeholders})", domains).fetchall()
+            known = {row[0]: row for row in rows}
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning("Could not read domain stats", extra={'error': str(e)})
+        return {domain: self._estimate(domain, known.get(domain)) for domain in domains}
+
+    @staticmethod
+    def _estimate(domain: str, row) -> dict:
+        fetches, success, latency, chars, analyses, relevance, updated_at = row[1:] if row else \
+            (0, PRIOR_SUCCESS, PRIOR_LATENCY, None, 0, None, None)
+
+        def smooth(value, count, prior):
+            if value is None:
+                return prior
+            return (count * value + PRIOR_WEIGHT * prior) / (count + PRIOR_WEIGHT)
+
+        estimate = {
+            'domain': domain,
+            'fetches': fetches,
+            'analyses': analyses,
+            'success': smooth(success, fetches, PRIOR_SUCCESS),
+            'latency_s': smooth(latency, fetches, PRIOR_LATENCY),
+            'relevance': smooth(relevance, analyses, PRIOR_RELEVANCE),
+            'chars': round(chars) if chars is not None else None,
+            'updated_at': updated_at
+        }
+        # Expected relevance from one fetch, discounted by how long the fetch takes
+        estimate['value'] = estimate['success'] * estimate['relevance'] / (1 + estimate['latency_s'] / LATENCY_SCALE)
+        return estimate
+
+    def order(self, urls: list, keep: int = 0) -> tuple:
+        """
+        Orders candidate URLs by what their domains are expected to give, and prunes the bad ones.
+
+        A URL's search position still counts: unknown domains keep the search
+        engine's order, and a known domain moves up or down from its position
+        in proportion to how much better or worse than the prior it has been.
+
+        Args:
+            urls: Candidate URLs in search rank order.
+            keep: Pruned URLs are kept (at the end) while fewer than this many would remain.
+
+        Returns:
+            A (urls to fetch in order, pruned urls) tuple.
+        """
+        if not urls:
+            return [], []
+        estimates = self._lookup(sorted({domain_of(url) for url in urls}))
+        prior_value = self._estimate('', None)['value']
+        stale_before = time.time() - self.retry_after
+        ranked, pruned = [], []
+        for position, url in enumerate(urls):
+            estimate = estimates[domain_of(url)]
+            priority = estimate['value'] / prior_value / (1 + RANK_DECAY * position)
+            if self._is_poor(estimate) and estimate['updated_at'] >= stale_before:
+                pruned.append((priority, position, url))
+            else:
+                ranked.append((priority, position, url))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        pruned.sort(key=lambda item: (-item[0], item[1]))
+        ordered = [url for _, _, url in ranked]
+        dropped = [url for _, _, url in pruned]
+        if len(ordered) < keep:
+            ordered += dropped[:keep - len(ordered)]
+            dropped = dropped[len(ordered) - len(ranked):]
+        kept = set(ordered)
+        if ordered != [url for url in urls if url in kept]:
+            self.reordered += 1
+        self.pruned += len(dropped)
+        return ordered, dropped
+
+    def _is_poor(self, estimate: dict) -> bool:
+        if estimate['fetches'] < self.min_samples:
+            return False
+        return estimate['success'] < self.min_success or \
+            (estimate['analyses'] >= self.min_samples and estimate['relevance'] < self.min_relevance)
+
+    def reap(self) -> dict:
+        """Deletes the stats of domains not fetched for max_age, so they start from the prior again."""
+        expired = self._connect().execute("DELETE FROM domains WHERE updated_at < ?",
+                                          (time.time() - self.max_age,)).rowcount
+        return {'expired': expired}
+
+    def stats(self) -> dict:
+        count, fetches = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(fetches), 0) FROM domains").fetchone()
+        return {
+            'path': self.path,
+            'domains': count,
+            'fetches': fetches,
+            'recorded': self.recorded,
+            'reordered_runs': self.reordered,
+            'pruned_urls': self.pruned,
+            'errors': self.errors
+        }
+
+
+def create_domain_stats() -> DomainStats:
+    """
+    Builds the domain stats configured by WEBSIGHT_DOMAIN_STATS_PATH.
+
+    By default they share the report store's database file; 'off' disables them (returns None).
+    """
+    path = os.environ.get('WEBSIGHT_DOMAIN_STATS_PATH') or \
+        os.environ.get('WEBSIGHT_REPORT_PATH', 'websight_reports.db')
+    if path.lower() == 'off':
+        return None
+    return DomainStats(path, max_age=float(os.environ.get('WEBSIGHT_DOMAIN_STATS_MAX_DAYS', 90)) * 24 * 3600)
@@ -0,0 +1,16 @@
+class ResearchUnavailable(Exception):
+    """Raised when a run limited to cached answers (see WebResearchAgent.research() options) has none to give."""
+
+
+# What WebResearchAgent.research() returns in place of a report when it could not write one
+FAILED_REPORT_PREFIXES = (
+    "Could not find any relevant web pages",
+    "No relevant information was found",
+    "Found web sources, but none",
+    "Error during synthesis",
+)
+
+
+def is_failed_report(report: str) -> bool:
+    """Whether a research result is one of the agent's failure messages rather than a synthesized report."""
+    return not report or report.startswith(FAILED_REPORT_PREFIXES)
@@ -0,0 +1,29 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+_lock = threading.Lock()
+_api_key = None
+
+
+def configure_gemini() -> str:
+    """
+    Loads .env and configures the Gemini SDK, once per process.
+
+    The SDK is only imported here, on first use: importing it is most of
+    the app's startup time.
+
+    Returns:
+        The API key in use, or None if GEMINI_API_KEY is not set.
+    """
+    global _api_key
+    with _lock:
+        if _api_key is None:
+            load_dotenv()
+            api_key = os.getenv("GEMINI_API_KEY")
+            if api_key:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                _api_key = api_key
+        return _api_key
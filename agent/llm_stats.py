@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+
+class LLMCallStats:
+    """
+    Latency and failure record of recent Gemini calls.
+
+    Every generate_content call of the agent and the analyzer runs inside
+    timed(), so the rest of the app can tell how loaded the model (or our
+    quota) currently is without making calls of its own. Structured outputs
+    are counted too (record_parse): how often they were valid, needed a
+    corrective retry or could not be used.
+    """
+
+    def __init__(self, window: int = 200):
+        """
+        Initializes the LLMCallStats.
+
+        Args:
+            window: Number of most recent calls kept for percentiles and error rates.
+        """
+        self._calls = deque(maxlen=window)  # (finished_at, seconds, ok)
+        self._lock = threading.Lock()
+        self.total_calls = 0
+        self.total_errors = 0
+        self.parse_outcomes = Counter()  # 'valid', 'repaired' or 'invalid', per output
+        self.parse_errors = Counter()  # reason -> invalid outputs seen, retries included
+
+    def record(self, seconds: float, ok: bool = True):
+        with self._lock:
+            self._calls.append((time.time(), seconds, ok))
+            self.total_calls += 1
+            self.total_errors += 0 if ok else 1
+
+    @contextmanager
+    def timed(self):
+        """Times the enclosed call, counting it as failed if it raises."""
+        started = time.time()
+        try:
+            yield
+        except BaseException:
+            self.record(time.time() - started, ok=False)
+            raise
+        self.record(time.time() - started)
+
+    def recent(self, seconds: float = 120) -> dict:
+        """Summarizes the calls that finished within the last `seconds`."""
+        cutoff = time.time() - seconds
+        with self._lock:
+            calls = [call for call in self._calls if call[0] >= cutoff]
+        durations = sorted(call[1] for call in calls)
+        return {
+            'calls': len(calls),
+            'p50_s': durations[len(durations) // 2] if durations else 0.0,
+            'p95_s': durations[int(0.95 * (len(durations) - 1))] if durations else 0.0,
+            'error_rate': sum(1 for call in calls if not call[2]) / len(calls) if calls else 0.0
+        }
+
+    def record_parse(self, outcome: str, errors: list = ()):
+        """
+        Records how one structured output ended up.
+
+        Args:
+            outcome: 'valid' (first answer usable), 'repaired' (usable after a retry) or 'invalid'.
+            errors: Why each rejected answer was rejected (e.g. 'not_json', 'missing_keys').
+        """
+        with self._lock:
+            self.parse_outcomes[outcome] += 1
+            self.parse_errors.update(errors)
+
+    def parse_stats(self) -> dict:
+        with self._lock:
+            outcomes, errors = dict(self.parse_outcomes), dict(self.parse_errors)
+        answers = sum(outcomes.values()) + sum(errors.values()) - outcomes.get('invalid', 0)
+        return {
+            **{outcome: outcomes.get(outcome, 0) for outcome in ('valid', 'repaired', 'invalid')},
+            'errors': errors,
+            # Share of the model's answers (retries included) that could not be parsed
+            'failure_rate': round(sum(errors.values()) / answers, 4) if answers else 0.0
+        }
+
+    def stats(self) -> dict:
+        return {**self.recent(), 'total_calls': self.total_calls, 'total_errors': self.total_errors,
+                'parse': self.parse_stats()}
+
+
+# Shared by every model user in the process
+llm_stats = LLMCallStats()
@@ -0,0 +1,136 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.text_utils import strip_html, split_sentences, estimate_tokens
+
+# One background worker shared by every conversation: updates are cheap and
+# running them in order keeps each memory consistent with its turn sequence.
+_update_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-update")
+
+
+def submit_update(fn, *args):
+    """Runs fn(*args) on the background memory worker and returns its future."""
+    return _update_executor.submit(fn, *args)
+
+
+def summarize_turn(query: str, report: str, max_tokens: int = 120) -> dict:
+    """
+    Condenses one research turn into a compact, HTML-free list of findings.
+
+    The lead sentence of each report paragraph is taken first (they tend to
+    carry the paragraph's point), then further sentences, until the token
+    budget is used up.
+
+    Args:
+        query: The research query of the turn.
+        report: The report produced for the query (HTML or plain text).
+        max_tokens: Token budget for the findings of this turn.
+
+    Returns:
+        A dictionary with 'query' and 'findings' (a list of sentences).
+    """
+    paragraphs = [split_sentences(p) for p in strip_html(report).splitlines()]
+    # Headings and one-word lines are not findings
+    paragraphs = [p for p in paragraphs if p and len(p[0].split()) > 3]
+
+    findings = []
+    used = 0
+    depth = 0
+    while used < max_tokens and any(len(p) > depth for p in paragraphs):
+        for sentences in paragraphs:
+            if depth >= len(sentences):
+                continue
+            cost = estimate_tokens(sentences[depth])
+            if used + cost > max_tokens:
+                continue
+            findings.append(sentences[depth])
+            used += cost
+        depth += 1
+    return {'query': query, 'findings': findings}
+
+
+class ConversationMemory:
+    """
+    Rolling summary of a conversation's findings, kept under a fixed token cap.
+
+    Each turn is condensed into a few findings. The rendered context keeps the
+    most recent turns in full and compresses older turns to their query and
+    lead finding, dropping the oldest once the cap is reached, so the context
+    passed to query analysis and synthesis has a constant cost.
+    """
+
+    def __init__(self, max_tokens: int = 500, turn_tokens: int = 120,
+                 full_turns: int = 2, max_turns: int = 20):
+        """
+        Initializes the ConversationMemory.
+
+        Args:
+            max_tokens: Token cap for the rendered context.
+            turn_tokens: Token budget for the findings of a single turn.
+            full_turns: Number of most recent turns kept with all their findings.
+            max_turns: Maximum number of condensed turns retained.
+        """
+        self.max_tokens = max_tokens
+        self.turn_tokens = turn_tokens
+        self.full_turns = full_turns
+        self.max_turns = max_turns
+        self._turns = []
+        self._summary = ''
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_turns(cls, turns: list[dict], **kwargs):
+        """Rebuilds a memory from previously condensed turns."""
+        memory = cls(**kwargs)
+        with memory._lock:
+            memory._turns = list(turns)[-memory.max_turns:]
+            memory._summary = memory._render()
+        return memory
+
+    def add_turn(self, query: str, report: str) -> dict:
+        """Condenses a finished turn and merges it into the rolling summary."""
+        turn = summarize_turn(query, report, self.turn_tokens)
+        with self._lock:
+            self._turns.append(turn)
+            del self._turns[:-self.max_turns]
+            self._summary = self._render()
+        return turn
+
+    def add_turn_async(self, query: str, report: str):
+        """Schedules add_turn() on the background worker and returns its future."""
+        return submit_update(self.add_turn, query, report)
+
+    def get_context(self) -> str:
+        """Returns the current rolling summary ('' when nothing has been researched yet)."""
+        with self._lock:
+            return self._summary
+
+    def get_turns(self) -> list[dict]:
+        """Returns a copy of the condensed turns."""
+        with self._lock:
+            return list(self._turns)
+
+    def clear(self):
+        with self._lock:
+            self._turns = []
+            self._summary = ''
+
+    def _render(self) -> str:
+        """Builds the summary from the newest turn backwards until the cap is hit."""
+        blocks = []
+        used = estimate_tokens("Previous research:\n")
+        for age, turn in enumerate(reversed(self._turns)):
+            findings = turn['findings'] if age < self.full_turns else turn['findings'][:1]
+            lines = [f"Q: {turn['query']}"] + [f"- {f}" for f in findings]
+            cost = estimate_tokens('\n'.join(lines)) + 1
+            while used + cost > self.max_tokens and len(lines) > 1:
+                # Trim the last findings of this turn before giving up on it
+                lines.pop()
+                cost = estimate_tokens('\n'.join(lines)) + 1
+            if used + cost > self.max_tokens:
+                break
+            blocks.append('\n'.join(lines))
+            used += cost
+        if not blocks:
+            return ''
+        return "Previous research:\n" + '\n'.join(reversed(blocks))
@@ -0,0 +1,241 @@
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+
+from tools.text_utils import tokenize
+
+# Words that phrase the same intent differently map onto one concept token,
+# so "React vs Vue comparison" and "compare React versus Vue" sketch alike.
+# Only true synonyms belong here: opposites (pros/cons, better/worse) ask different questions.
+_CONCEPTS = {
+    'compare': {'vs', 'versus', 'compare', 'compared', 'comparing', 'comparison', 'comparisons',
+                'difference', 'differences', 'differ', 'contrast'},
+    'explain': {'explain', 'explained', 'explanation', 'overview', 'introduction', 'intro',
+                'guide', 'basics', 'understand', 'understanding', 'meaning', 'definition', 'define'},
+    'latest': {'latest', 'recent', 'newest'},
+    'benefit': {'benefits', 'benefit', 'uses', 'use', 'usage', 'applications'},
+}
+# Words that flip a question's answer; they get more weight and no trigrams, since
+# "advantages" and "disadvantages" share most of theirs
+_POLARITY_WORDS = {'pros', 'cons', 'advantage', 'disadvantage', 'better', 'worse', 'best', 'worst',
+                   'against', 'safe', 'unsafe', 'healthy', 'unhealthy', 'legal', 'illegal'}
+_POLARITY_WEIGHT = 1.5
+# Words whose neighbours' order matters: "X better than Y" is not "Y better than X"
+_DIRECTIONAL_WORDS = {'better', 'worse', 'against', 'over', 'beat', 'beats', 'faster', 'slower', 'cheaper'}
+_ORDER_WEIGHT = 1.0
+# Adjacent term pairs: enough to tell reversed questions apart, not reworded ones
+_BIGRAM_WEIGHT = 0.8
+_CONCEPT_OF = {word: concept for concept, words in _CONCEPTS.items() for word in words}
+# Concepts collapse many words into one, so they shouldn't outweigh the topic
+_CONCEPT_WEIGHT = 0.6
+_TRIGRAM_WEIGHT = 0.35
+
+
+def normalize_query(query: str) -> list[str]:
+    """
+    Reduces a query to a sorted list of canonical terms.
+
+    Stop words are dropped, intent words are mapped onto shared concepts and
+    simple plurals are folded, so trivially different phrasings of a question
+    normalize to the same terms.
+    """
+    return sorted(set(_canonical_tokens(query)))
+
+
+def _canonical_tokens(query: str) -> list[str]:
+    """The query's terms in their original order, with concepts and plurals folded."""
+    tokens = []
+    for token in tokenize(query):
+        token = _CONCEPT_OF.get(token, token)
+        if token not in _CONCEPTS and len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def sketch_query(query: str, dim: int = 512) -> dict:
+    """
+    Builds a sparse, L2-normalized feature-hashed vector for a query.
+
+    Whole terms carry most of the weight; character trigrams add tolerance
+    for typos and word forms, and pairs of adjacent terms keep some of the
+    word order, so "effects of caffeine on sleep" and "effects of sleep on
+    caffeine" differ. Returns a dict of bucket -> weight.
+    """
+    vector = {}
+
+    def add(feature, weight):
+        bucket = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=4).digest(), 'big') % dim
+        vector[bucket] = vector.get(bucket, 0.0) + weight
+
+    for term in normalize_query(query):
+        if term in _CONCEPTS:
+            add('w:' + term, _CONCEPT_WEIGHT)
+            continue
+        add('w:' + term, _POLARITY_WEIGHT if term in _POLARITY_WORDS else 1.0)
+        if term not in _POLARITY_WORDS:
+            padded = f"#{term}#"
+            for i in range(len(padded) - 2):
+                add('c:' + padded[i:i + 3], _TRIGRAM_WEIGHT)
+
+    # Adjacent topic terms, in order; a comparison reads the same both ways
+    terms = _canonical_tokens(query)
+    topic = [term for term in terms if term not in _CONCEPTS]
+    symmetric = 'compare' in terms
+    for first, second in zip(topic, topic[1:]):
+        if symmetric:
+            first, second = sorted((first, second))
+        add(f'b:{first}>{second}', _BIGRAM_WEIGHT)
+
+    # The terms on either side of a directional word keep their sides
+    tokens = tokenize(query)
+    for i, token in enumerate(tokens):
+        if token in _DIRECTIONAL_WORDS:
+            if i > 0:
+                add(f'o:{tokens[i - 1]}<{token}', _ORDER_WEIGHT)
+            if i + 1 < len(tokens):
+                add(f'o:{token}>{tokens[i + 1]}', _ORDER_WEIGHT)
+
+    norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+    return {k: w / norm for k, w in vector.items()}
+
+
+def _cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(k, 0.0) for k, w in a.items())
+
+
+class SemanticQueryCache:
+    """
+    Caches research reports by query meaning rather than exact text.
+
+    Queries are sketched locally (no model, no network) and a lookup returns
+    the freshest stored report whose query is at least `threshold` similar.
+    Hits are kept in an audit log so false hits can be reported, which also
+    evicts the offending entry.
+    """
+
+    def __init__(self, threshold: float = 0.85, ttl_seconds: int = 6 * 3600, max_entries: int = 500):
+        """
+        Initializes the SemanticQueryCache.
+
+        Args:
+            threshold: Minimum cosine similarity between query sketches for a hit.
+            ttl_seconds: Age after which a cached report is no longer served.
+            max_entries: Maximum number of reports kept; the oldest are dropped first.
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = []
+        self._audit = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.false_hits = 0
+
+    def lookup(self, query: str) -> dict:
+        """
+        Finds a fresh cached report for a semantically similar query.
+
+        Returns:
+            A dictionary with 'report', 'sources', 'report_id' (see link_report()),
+            'matched_query', 'similarity' and 'age_seconds', or None on a miss.
+        """
+        sketch = sketch_query(query)
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            self._entries = [e for e in self._entries if now - e['created_at'] <= self.ttl_seconds]
+            best, best_score = None, 0.0
+            for entry in self._entries:
+                score = _cosine(sketch, entry['sketch'])
+                if score > best_score:
+                    best, best_score = entry, score
+            if best is None or best_score < self.threshold:
+                return None
+
+            self.hits += 1
+            best['hits'] += 1
+            self._audit.append({
+                'query': query,
+                'matched_query': best['query'],
+                'similarity': round(best_score, 3),
+                'at': now,
+                'false_hit': False
+            })
+            return {
+                'report': best['report'],
+                'sources': list(best['sources']),
+                'report_id': best['report_id'],
+                'matched_query': best['query'],
+                'similarity': best_score,
+                'age_seconds': now - best['created_at']
+            }
+
+    def store(self, query: str, report: str, sources: list[dict] = None):
+        """Caches a finished report (and the sources it was built from) for a query."""
+        entry = {
+            'query': query,
+            'sketch': sketch_query(query),
+            'report': report,
+            'sources': sources or [],
+            'report_id': None,
+            'created_at': time.time(),
+            'hits': 0
+        }
+        with self._lock:
+            # A fresh report replaces any entry for an equivalent query
+            self._entries = [e for e in self._entries if _cosine(e['sketch'], entry['sketch']) < 0.999]
+            self._entries.append(entry)
+            del self._entries[:-self.max_entries]
+
+    def link_report(self, report: str, report_id: str):
+        """Records the ID a cached report was saved under, so hits on it share its permalink."""
+        with self._lock:
+            for entry in self._entries:
+                if entry['report'] is report:
+                    entry['report_id'] = report_id
+
+    def report_false_hit(self, query: str) -> bool:
+        """
+        Flags the most recent hit served for a query as wrong and evicts its entry.
+
+        Returns:
+            True if a matching hit was found in the audit log.
+        """
+        with self._lock:
+            for record in reversed(self._audit):
+                if record['query'] == query and not record['false_hit']:
+                    record['false_hit'] = True
+                    self.false_hits += 1
+                    self._entries = [e for e in self._entries if e['query'] != record['matched_query']]
+                    return True
+        return False
+
+    def invalidate(self):
+        """Drops every cached report."""
+        with self._lock:
+            self._entries = []
+
+    def stats(self) -> dict:
+        """Returns hit-rate counters (no query text, so they can be shown publicly)."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+                'false_hits': self.false_hits,
+                'false_hit_rate': self.false_hits / self.hits if self.hits else 0.0,
+                'threshold': self.threshold,
+                'ttl_seconds': self.ttl_seconds
+            }
+
+    def recent_hits(self, limit: int = 20) -> list[dict]:
+        """Returns the most recent hits for auditing; they hold users' queries, so keep them private."""
+        with self._lock:
+            return list(self._audit)[-limit:] if limit > 0 else []
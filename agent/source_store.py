@@ -0,0 +1,151 @@
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from tools.text_utils import tokenize, split_passages
+
+
+class SourceStore:
+    """
+    Per-conversation store of fetched page text and the analyses made from it.
+
+    Follow-up questions usually stay on the same topic, so the pages fetched
+    for earlier turns often already answer them. The store keeps those pages
+    split into passages and ranks them locally (BM25) against a new query so
+    the agent only has to search and fetch for what the stored pages lack.
+    """
+
+    def __init__(self, max_pages: int = 40, passage_chars: int = 600):
+        """
+        Initializes the SourceStore.
+
+        Args:
+            max_pages: Maximum number of pages kept; the least recently used are dropped.
+            passage_chars: Approximate size of the passages pages are split into.
+        """
+        self.max_pages = max_pages
+        self.passage_chars = passage_chars
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pages)
+
+    def __contains__(self, url):
+        return url in self._pages
+
+    def add_page(self, url: str, title: str, text: str):
+        """Stores the extracted text of a page, replacing any previous copy."""
+        passages = split_passages(text, self.passage_chars)
+        page = {
+            'url': url,
+            'title': title,
+            'text': text,
+            'passages': passages,
+            'passage_tokens': [Counter(tokenize(p)) for p in passages],
+            'fetched_at': time.time(),
+            'analyses': {}
+        }
+        with self._lock:
+            self._pages[url] = page
+            self._pages.move_to_end(url)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+    def get_page(self, url: str) -> dict:
+        """Returns the stored page for a URL, or None."""
+        with self._lock:
+            return self._pages.get(url)
+
+    def add_analysis(self, url: str, query: str, analysis: dict):
+        """Records an analysis of a stored page made for the given query."""
+        with self._lock:
+            page = self._pages.get(url)
+            if page is not None:
+                page['analyses'][self._query_key(query)] = analysis
+
+    def get_analysis(self, url: str, query: str) -> dict:
+        """Returns a previous analysis of the page for an equivalent query, if any."""
+        with self._lock:
+            page = self._pages.get(url)
+            if page is None:
+                return None
+            return page['analyses'].get(self._query_key(query))
+
+    def clear(self):
+        """Removes every stored page."""
+        with self._lock:
+            self._pages.clear()
+
+    def rank(self, query: str, top_k: int = 5, passages_per_page: int = 3) -> list[dict]:
+        """
+        Ranks stored pages against a query using BM25 over their passages.
+
+        Args:
+            query: The new research query.
+            top_k: Maximum number of pages to return.
+            passages_per_page: Number of best passages returned for each page.
+
+        Returns:
+            A list of dictionaries sorted by score, each containing 'url', 'title',
+            'score', 'coverage' (share of the query's term weight found in the
+            returned passages, 0.0-1.0) and 'passages'.
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return []
+
+        with self._lock:
+            pages = list(self._pages.values())
+
+        all_passages = [(page, i, tf) for page in pages for i, tf in enumerate(page['passage_tokens'])]
+        if not all_passages:
+            return []
+
+        # Document frequencies over passages, so common terms count for less
+        n = len(all_passages)
+        avg_len = sum(sum(tf.values()) for _, _, tf in all_passages) / n or 1.0
+        df = Counter()
+        for _, _, tf in all_passages:
+            for term in query_terms:
+                if term in tf:
+                    df[term] += 1
+        idf = {t: math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in query_terms}
+        total_weight = sum(idf.values()) or 1.0
+
+        k1, b = 1.5, 0.75
+        scored = {}
+        for page, i, tf in all_passages:
+            length = sum(tf.values())
+            score = 0.0
+            for term in query_terms:
+                freq = tf.get(term, 0)
+                if freq:
+                    score += idf[term] * freq * (k1 + 1) / (freq + k1 * (1 - b + b * length / avg_len))
+            if score > 0:
+                scored.setdefault(page['url'], []).append((score, i))
+
+        results = []
+        for page in pages:
+            hits = sorted(scored.get(page['url'], []), reverse=True)[:passages_per_page]
+            if not hits:
+                continue
+            indices = sorted(i for _, i in hits)
+            covered = set()
+            for i in indices:
+                covered.update(t for t in query_terms if t in page['passage_tokens'][i])
+            results.append({
+                'url': page['url'],
+                'title': page['title'],
+                'score': hits[0][0],
+                'coverage': sum(idf[t] for t in covered) / total_weight,
+                'passages': [page['passages'][i] for i in indices]
+            })
+
+        results.sort(key=lambda r: r['score'], reverse=True)
+        return results[:top_k]
+
+    @staticmethod
+    def _query_key(query: str) -> str:
+        return ' '.join(sorted(set(tokenize(query))))
@@ -0,0 +1,215 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else on a record came from `extra` or the log context
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'sample'}
+
+# Correlation fields (request_id, session_id, user_id, ...) of the code currently running
+_context = contextvars.ContextVar('websight_log_context', default={})
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def bind(**fields) -> contextvars.Token:
+    """Adds fields to every record logged from the current context; undo with unbind(token)."""
+    return _context.set({**_context.get(), **fields})
+
+
+def unbind(token: contextvars.Token):
+    _context.reset(token)
+
+
+@contextmanager
+def log_context(**fields):
+    """Adds fields to every record logged inside the block."""
+    token = bind(**fields)
+    try:
+        yield
+    finally:
+        unbind(token)
+
+
+def current_context() -> dict:
+    return dict(_context.get())
+
+
+class ContextFilter(logging.Filter):
+    """Copies the log context onto each record; runs in the logging thread, before the queue."""
+
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a share of chatty records.
+
+    DEBUG records are kept with probability `debug_rate`; any record logged
+    with extra={'sample': rate} is kept with that probability instead.
+    """
+
+    def __init__(self, debug_rate: float = 1.0):
+        super().__init__()
+        self.debug_rate = debug_rate
+        self.dropped = 0
+
+    def filter(self, record):
+        rate = getattr(record, 'sample', None)
+        if rate is None and record.levelno <= logging.DEBUG:
+            rate = self.debug_rate
+        if rate is None or rate >= 1 or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+def _extras(record) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, thread, the context and extra fields, exc."""
+
+    def format(self, record):
+        document = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+            **_extras(record)
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            document['exc'] = record.exc_text
+        return json.dumps(document, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, with the extra fields as key=value."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extras(record)
+        if fields:
+            first_line, _, rest = line.partition('\n')
+            line = first_line + ' ' + ' '.join(f"{key}={value}" for key, value in fields.items()) + \
+                (('\n' + rest) if rest else '')
+        return line
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without ever blocking the caller.
+
+    The message is merged and any traceback rendered in the calling thread
+    (they may refer to objects that change later); everything else,
+    formatting and writing, happens on the listener thread. When the queue is
+    full the record is dropped and counted instead of waiting.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level: str = None, fmt: str = None, debug_sample_rate: float = None,
+                      stream=None, max_queue: int = None):
+    """
+    Routes all logging through a queue to one writer thread, once per process.
+
+    Settings default to WEBSIGHT_LOG_LEVEL (INFO), WEBSIGHT_LOG_FORMAT (json
+    or text), WEBSIGHT_LOG_DEBUG_SAMPLE (share of DEBUG records kept, 1.0)
+    and WEBSIGHT_LOG_QUEUE (records buffered before dropping, 10000).
+    Calling it again reconfigures the level, format and sampling.
+
+    Args:
+        level: Minimum level logged.
+        fmt: 'json' for one JSON object per line, 'text' for readable lines.
+        debug_sample_rate: Share of DEBUG records kept.
+        stream: Where the log is written (stderr by default).
+        max_queue: Records buffered before new ones are dropped.
+    """
+    global _handler, _listener
+    level = (level or os.environ.get('WEBSIGHT_LOG_LEVEL', 'INFO')).upper()
+    fmt = fmt or os.environ.get('WEBSIGHT_LOG_FORMAT', 'json')
+    if debug_sample_rate is None:
+        debug_sample_rate = float(os.environ.get('WEBSIGHT_LOG_DEBUG_SAMPLE', 1.0))
+    max_queue = max_queue or int(os.environ.get('WEBSIGHT_LOG_QUEUE', 10000))
+
+    with _lock:
+        root = logging.getLogger()
+        if _handler is not None:
+            root.removeHandler(_handler)
+            _listener.stop()
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+        _handler = NonBlockingQueueHandler(queue.Queue(max_queue))
+        _handler.addFilter(ContextFilter())
+        _handler.addFilter(SamplingFilter(debug_sample_rate))
+        root.addHandler(_handler)
+        root.setLevel(level)
+        _listener = QueueListener(_handler.queue, output)
+        _listener.start()
+
+
+def flush_logging():
+    """Writes out everything queued so far (the listener is restarted)."""
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.start()
+
+
+def logging_stats() -> dict:
+    if _handler is None:
+        return {'configured': False}
+    sampling = next(f for f in _handler.filters if isinstance(f, SamplingFilter))
+    return {
+        'configured': True,
+        'level': logging.getLevelName(logging.getLogger().level),
+        'queued': _handler.queue.qsize(),
+        'dropped': _handler.dropped,
+        'sampled_out': sampling.dropped
+    }
+
+
+@atexit.register
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
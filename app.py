@@ -4,21 +4,30 @@ import time
 import uuid
 import threading
 import logging
-from flask import Flask, request, render_template, jsonify, Response, stream_with_context, session
+from flask import Flask, request, render_template, jsonify, Response, stream_with_context, session, g
 from dotenv import load_dotenv
 from queue import Queue
-from threading import Thread
-from agent.agent import WebResearchAgent
+from agent.errors import ResearchUnavailable, is_failed_report
+from agent.llm_stats import llm_stats
+from agent.domain_stats import create_domain_stats
+from agent.structured_log import configure_logging, bind, unbind, logging_stats
+from agent.source_store import SourceStore
+from agent.memory import ConversationMemory, submit_update, summarize_turn
+from agent.cancellation import CancelToken, ResearchCancelled
+from tools.text_utils import strip_html
+from server.worker_pool import ResearchWorkerPool, QueueFullError, OwnerLimitError
+from server.rate_limit import UserRateLimiter, RateLimitedError
+from server.state_store import create_state_store, HISTORY_TTL, PROGRESS_TTL
+from server.bounded_store import BoundedStore, Reaper, process_memory
+from server.single_flight import SingleFlight, flight_key
+from server.degradation import DegradationController
+from server.report_store import create_report_store
+from server.profiling import StackSampler, MemoryTracer, RequestProfiles, admin_token, is_admin
 from datetime import datetime
+from functools import wraps
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# Structured logging through a background writer thread (WEBSIGHT_LOG_LEVEL, WEBSIGHT_LOG_FORMAT, ...)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Get API key from environment variable (making sure it's secure for deployment)
@@ -37,251 +46,769 @@ if not api_key:
 # Set the correct environment variable that the agent expects
 os.environ['GEMINI_API_KEY'] = api_key
 
-# Initialize research agent
+# The research agent is built on first use (or by the warm-up thread), so the
+# page is served without waiting for the Gemini SDK and the tools to import
 agent_instance = None
 initialization_error = None
-research_progress = {}
-conversation_history = {}
+agent_lock = threading.Lock()
+# user_id -> SourceStore of pages fetched in that conversation (per process);
+# idle conversations are dropped after an hour, the least recent beyond 200
+source_stores = BoundedStore(max_entries=200, ttl_seconds=3600)
 
-# Check if API key is present before attempting to initialize the agent
-api_key_present = bool(api_key)
+# Progress, history, conversation memory and progress events live in the state
+# store, so several gunicorn workers can share them (WEBSIGHT_STATE_BACKEND)
+state_store = create_state_store()
 
-if api_key_present:
-    try:
-        # Import the agent class only if the key is present
-        agent_instance = WebResearchAgent()
-        print("Web Research Agent initialized successfully.")
-    except Exception as e:
-        initialization_error = f"Failed to initialize Web Research Agent: {e}"
-        print(f"Error: {initialization_error}")
-else:
-    initialization_error = "API key not found in environment variables. Agent cannot be initialized."
-    print(f"Error: {initialization_error}")
+# Identical requests arriving while one is running share its session
+research_flights = SingleFlight()
+
+# Cancel tokens of the research running on this process's pool, by session ID
+running_tokens = {}
+running_tokens_lock = threading.Lock()
+# Statuses after which a session's progress no longer changes
+TERMINAL_STATUSES = ["complete", "error", "cancelled"]
+# A dropped progress stream only cancels if the client hasn't reconnected within this many seconds
+DISCONNECT_GRACE_SECONDS = 10
+
+# Finished reports, kept (compressed) so they can be re-opened and shared by link
+report_store = create_report_store()
+# Fetch latency, success and relevance per domain, learned across runs to order candidate sources
+domain_stats = create_domain_stats()
+
+# One background thread expires old sessions, histories, page stores and reports
+reaper = Reaper(interval=float(os.environ.get('WEBSIGHT_REAP_INTERVAL', 60)))
+reaper.register("state_store", state_store.reap)
+reaper.register("source_stores", source_stores.reap)
+reaper.register("report_store", report_store.reap)
+if domain_stats is not None:
+    reaper.register("domain_stats", domain_stats.reap)
+reaper.start()
+
+def on_queue_position_change(session_id, position):
+    """Keeps the queue position of waiting research sessions up to date."""
+    if position:
+        update_progress(session_id, queue_position=position,
+                        message=f"Waiting for a free research worker (position {position} in queue)...")
+    else:
+        update_progress(session_id, queue_position=position)
+
+# Research runs on a bounded pool; requests beyond its queue are turned away.
+# Users share the workers fairly and each may only have a few jobs in it.
+research_pool = ResearchWorkerPool(
+    max_workers=int(os.environ.get('WEBSIGHT_MAX_WORKERS', 4)),
+    max_queue=int(os.environ.get('WEBSIGHT_MAX_QUEUE', 16)),
+    on_position_change=on_queue_position_change,
+    max_active_per_owner=int(os.environ.get('WEBSIGHT_USER_MAX_ACTIVE', 1)),
+    max_queued_per_owner=int(os.environ.get('WEBSIGHT_USER_MAX_QUEUED', 2))
+)
+
+# Per-user request allowance, so one user can't use up the workers and the Gemini quota
+rate_limiter = UserRateLimiter(
+    per_minute=float(os.environ.get('WEBSIGHT_USER_RATE_PER_MINUTE', 6)),
+    burst=int(os.environ.get('WEBSIGHT_USER_BURST', 3))
+)
+
+# Under load, research runs do less work (fewer sources, snippets only, cached answers only)
+degradation = DegradationController.from_env(research_pool.metrics, llm_stats.recent)
+
+# Live diagnostics for admins (WEBSIGHT_ADMIN_TOKEN): tracemalloc snapshots and profiled research sessions
+memory_tracer = MemoryTracer()
+request_profiles = RequestProfiles()
+
+def client_key(user_id, has_session, remote_addr):
+    """
+    Identifies who rate limits and fair queueing apply to.
+    
+    A request without a session cookie would get a fresh user_id every time,
+    so cookie-less clients are identified by their address instead.
+    """
+    return user_id if has_session else f"ip:{remote_addr}"
+
+def get_agent():
+    """Returns the research agent, building it on first call; None if it could not be built."""
+    global agent_instance, initialization_error
+    if agent_instance is not None or initialization_error is not None:
+        return agent_instance
+    with agent_lock:
+        if agent_instance is None and initialization_error is None:
+            started = time.time()
+            try:
+                # Importing the agent pulls in the Gemini SDK, search and scraping libraries
+                from agent.agent import WebResearchAgent
+                agent_instance = WebResearchAgent(domain_stats=domain_stats)
+                logger.info("Web Research Agent initialized",
+                            extra={'elapsed_s': round(time.time() - started, 2)})
+            except Exception as e:
+                initialization_error = f"Failed to initialize Web Research Agent: {e}"
+                logger.exception("Web Research Agent could not be initialized")
+    return agent_instance
+
+def warm_up():
+    """Builds the agent on a background thread, so the first research doesn't pay for it."""
+    threading.Thread(target=get_agent, name="agent-warmup", daemon=True).start()
 
 app = Flask(__name__, static_url_path='/static')
-app.secret_key = os.getenv("FLASK_SECRET_KEY", os.urandom(24).hex())  # For session management
+# For session management; without FLASK_SECRET_KEY the workers agree on a generated key through the state store
+app.secret_key = os.getenv("FLASK_SECRET_KEY") or state_store.setdefault_json("flask_secret_key", os.urandom(24).hex())
 app.config['SESSION_TYPE'] = 'filesystem'
 
+@app.before_request
+def bind_request_log_context():
+    """Tags every record logged while handling the request (and the research it queues) with its IDs."""
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:12]
+    g.log_token = bind(request_id=g.request_id, user_id=session.get('user_id'))
+
+@app.after_request
+def add_request_id_header(response):
+    response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.teardown_request
+def unbind_request_log_context(exc):
+    if 'log_token' in g:
+        unbind(g.log_token)
+
 @app.route('/')
 def index():
     """Renders the main HTML page."""
     # Create session if it doesn't exist
     if 'user_id' not in session:
         session['user_id'] = str(uuid.uuid4())
-        conversation_history[session['user_id']] = []
         
     return render_template('index.html', error=initialization_error)
 
-def run_research_task(query, session_id, user_id, context):
-    """Run research in a separate thread and track progress."""
-    global research_progress
+def update_progress(session_id, **changes):
+    """Applies changes to a session's progress and publishes them as a delta event."""
+    if state_store.update_progress(session_id, changes):
+        state_store.publish_event(session_id, {"type": "update", "changes": changes})
+
+def upsert_source(session_id, url, **fields):
+    """Adds or updates one entry of a session's source list and publishes it."""
+    source = state_store.upsert_source(session_id, url, fields)
+    if source is not None:
+        state_store.publish_event(session_id, {"type": "source", "source": source})
+
+def memory_key(user_id):
+    return f"memory:{user_id}"
+
+def load_memory(user_id):
+    """Rebuilds a user's rolling conversation memory from the condensed turns in the state store."""
+    return ConversationMemory.from_turns(state_store.get_json(memory_key(user_id)) or [])
+
+def record_turn(user_id, query, result, report_id=None):
+    """Adds a finished research turn to a user's conversation memory and history."""
+    # Fold this turn's findings into the rolling context off the request path. The
+    # stored turns are read and written back in one atomic update, so turns finishing
+    # together for the same user (coalesced users, other workers) don't overwrite each other.
+    def fold_turn():
+        turn = summarize_turn(query, result)
+        try:
+            state_store.update_json(
+                memory_key(user_id), lambda turns: ConversationMemory.from_turns((turns or []) + [turn]).get_turns(),
+                ttl_seconds=HISTORY_TTL)
+        except Exception:
+            logger.exception("Could not update conversation memory", extra={'user_id': user_id})
+    submit_update(fold_turn)
+    
+    # Store in conversation history
+    # Plain-text preview for the history panel (first 200 chars)
+    text = strip_html(result)
+    summary = text[:200] + "..." if len(text) > 200 else text
+    # Keep history to a reasonable size
+    state_store.append_history(user_id, {
+        "query": query,
+        "summary": summary,
+        "timestamp": time.time(),
+        "report_id": report_id
+    }, max_entries=10)
+
+def save_report(session_id, query, result, started_at, mode):
+    """Persists a finished report with the sources shown during the research; returns its ID or None."""
+    progress = state_store.get_progress(session_id) or {}
+    sources = [{k: v for k, v in source.items() if k != "status"}
+               for source in progress.get("sources", []) if source.get("status") == "analyzed"]
     try:
+        return report_store.save(query, result, sources, started_at=started_at,
+                                 metadata={"mode": mode["mode"]} if mode["level"] else None)
+    except Exception:
+        # The research itself succeeded; only the permalink is missing
+        logger.exception("Could not save report")
+        return None
+
+def cache_hit_key(user_id):
+    return f"cache_hit:{user_id}"
+
+def cancel_key(session_id):
+    return f"cancel:{session_id}"
+
+def request_cancel(session_id, user_id, grace=0):
+    """
+    Records that a user no longer wants a research session.
+    
+    The research stops once every user attached to it has left (after the
+    grace period). The record lives in the state store, so the worker process
+    running the research notices it wherever the request arrived.
+    """
+    leaves = state_store.get_json(cancel_key(session_id)) or {}
+    leaves[user_id] = time.time() + grace
+    state_store.set_json(cancel_key(session_id), leaves, ttl_seconds=PROGRESS_TTL)
+    cancel_if_abandoned(session_id)
+
+def withdraw_cancel(session_id, user_id):
+    """Forgets a user's earlier cancel request for a session they came back to."""
+    leaves = state_store.get_json(cancel_key(session_id))
+    if leaves and leaves.pop(user_id, None) is not None:
+        state_store.set_json(cancel_key(session_id), leaves, ttl_seconds=PROGRESS_TTL)
+
+def abandoned_reason(session_id):
+    """Returns why a session in flight on this process should stop, or None while someone still wants it."""
+    leaves = state_store.get_json(cancel_key(session_id))
+    if not leaves:
+        return None
+    users = research_flights.users_of(session_id)
+    now = time.time()
+    if users and all(user in leaves and leaves[user] <= now for user in users):
+        return "Research cancelled: no client is waiting for it anymore."
+    return None
+
+def cancel_if_abandoned(session_id):
+    """Stops a session of this process right away if every attached user has left."""
+    reason = abandoned_reason(session_id)
+    if not reason:
+        return
+    if research_pool.cancel(session_id):
+        # Never started; release the worker slot it was waiting for
+        research_flights.finish_session(session_id)
+        mark_cancelled(session_id, reason)
+        return
+    with running_tokens_lock:
+        token = running_tokens.get(session_id)
+    if token:
+        token.cancel(reason)
+
+def mark_cancelled(session_id, reason):
+    update_progress(session_id, status="cancelled", phase="cancelled", message=reason)
+
+def run_research_task(query, session_id, user_id, context, key=None):
+    """Run research on a pool worker and track progress."""
+    # Cancelled from the cancel endpoint, a dropped stream or a newer query (possibly on another worker)
+    token = CancelToken(poll=lambda: abandoned_reason(session_id))
+    with running_tokens_lock:
+        running_tokens[session_id] = token
+    started_at = time.time()
+    # Jobs run in the submitting request's log context; records of this run also carry its session
+    log_token = bind(session_id=session_id)
+    try:
+        # Everyone may have left while the job waited in the queue
+        token.raise_if_cancelled()
+        
+        # How much work this run may do, given the load right now
+        mode = degradation.current()
+        
         # Initial state
-        research_progress[session_id] = {
-            "status": "starting",
-            "phase": "initialization",
-            "message": "Starting research process...",
-            "sources": [],
-            "progress_pct": 5,
-            "result": None,
-            "error": None
-        }
+        update_progress(
+            session_id,
+            status="starting",
+            phase="initialization",
+            message=mode["message"] or "Starting research process...",
+            progress_pct=5,
+            queue_position=0,
+            degradation={"level": mode["level"], "mode": mode["mode"], "message": mode["message"]}
+        )
+        
+        # The cache hit this run was answered from, if any
+        cache_hit = {}
         
         # Hook into different stages of the research process
         def query_analysis_callback(analysis):
-            research_progress[session_id]["status"] = "analyzing_query"
-            research_progress[session_id]["phase"] = "query_analysis"
-            research_progress[session_id]["message"] = f"Analyzing query: '{query}'"
-            research_progress[session_id]["progress_pct"] = 10
+            changes = {
+                "status": "analyzing_query",
+                "phase": "query_analysis",
+                "message": f"Analyzing query: '{query}'",
+                "progress_pct": 10
+            }
+            if analysis.get("cache_hit"):
+                # Served from the semantic cache; lets the UI offer a "not what I asked" report,
+                # which only the users who got this answer may send
+                changes["cache_hit"] = analysis["cache_hit"]
+                cache_hit.update(analysis["cache_hit"])
+                for attached_user in research_flights.users_of(session_id) or [user_id]:
+                    state_store.set_json(cache_hit_key(attached_user), {"query": query},
+                                         ttl_seconds=PROGRESS_TTL)
+            update_progress(session_id, **changes)
             
         def search_callback(search_results):
-            research_progress[session_id]["status"] = "searching"
-            research_progress[session_id]["phase"] = "web_search"
-            research_progress[session_id]["message"] = f"Searching the web for relevant information..."
-            research_progress[session_id]["progress_pct"] = 20
+            update_progress(
+                session_id,
+                status="searching",
+                phase="web_search",
+                message="Searching the web for relevant information...",
+                progress_pct=20
+            )
         
-        def source_callback(source_num, total_sources, url, title, status):
+        def source_callback(source_num, total_sources, url, title, status, findings=None):
             if status == "start":
-                research_progress[session_id]["status"] = "processing_sources"
-                research_progress[session_id]["phase"] = "analyzing_content"
-                research_progress[session_id]["message"] = f"Analyzing source {source_num}/{total_sources}: {title}"
                 # Calculate progress based on how many sources we've processed
                 progress_pct = 20 + (source_num / total_sources) * 60
-                research_progress[session_id]["progress_pct"] = min(80, progress_pct)
+                update_progress(
+                    session_id,
+                    status="processing_sources",
+                    phase="analyzing_content",
+                    message=f"Analyzing source {source_num}/{total_sources}: {title}",
+                    progress_pct=min(80, progress_pct)
+                )
                 
                 # Add source to the list
-                research_progress[session_id]["sources"].append({
-                    "url": url,
-                    "title": title,
-                    "status": "processing",
-                    "relevance": None
-                })
+                upsert_source(session_id, url, title=title, status="processing", relevance=None)
             elif status == "complete":
-                # Update source status and relevance
-                for source in research_progress[session_id]["sources"]:
-                    if source["url"] == url:
-                        source["status"] = "analyzed"
-                        source["relevance"] = research_progress[session_id].get("current_relevance", 0.0)
+                # Publish the source's findings right away; the UI shows them before the report is ready
+                findings = findings or {}
+                upsert_source(session_id, url, status="analyzed",
+                              relevance=findings.get("relevance_score", 0.0),
+                              summary=findings.get("summary", ""),
+                              key_points=findings.get("key_points", []))
+            else:
+                upsert_source(session_id, url, status=status)
         
         def synthesis_callback():
-            research_progress[session_id]["status"] = "synthesizing"
-            research_progress[session_id]["phase"] = "synthesis"
-            research_progress[session_id]["message"] = "Synthesizing findings into a comprehensive report..."
-            research_progress[session_id]["progress_pct"] = 85
+            update_progress(
+                session_id,
+                status="synthesizing",
+                phase="synthesis",
+                message="Synthesizing findings into a comprehensive report...",
+                progress_pct=85
+            )
+        
+        # Pages fetched in earlier turns are reused for follow-up questions
+        source_store = source_stores.get(user_id) or SourceStore()
+        source_stores.set(user_id, source_store)
         
         # Use context-aware research if we have context
         if context:
-            # Include context in the query
-            context_text = "Previous research:\n" + "\n".join([
-                f"Query: {item['query']}\nSummary: {item['summary']}"
-                for item in context if 'summary' in item
-            ])
-            
-            # Modify the query to include context
-            augmented_query = f"{query}\n\nContext from previous research: {context_text}"
-            result = agent_instance.research_with_context(
+            result = get_agent().research_with_context(
                 query=query,
-                context=context_text,
+                context=context,
                 query_analysis_callback=query_analysis_callback,
                 search_callback=search_callback,
                 source_callback=source_callback,
-                synthesis_callback=synthesis_callback
+                synthesis_callback=synthesis_callback,
+                source_store=source_store,
+                cancel_token=token,
+                options=mode["options"]
             )
         else:
             # If no context, use regular research
-            result = agent_instance.research(
+            result = get_agent().research(
                 query, 
                 query_analysis_callback=query_analysis_callback,
                 search_callback=search_callback,
                 source_callback=source_callback,
-                synthesis_callback=synthesis_callback
+                synthesis_callback=synthesis_callback,
+                source_store=source_store,
+                cancel_token=token,
+                options=mode["options"]
             )
         
-        # Update final state
-        research_progress[session_id]["status"] = "complete"
-        research_progress[session_id]["progress_pct"] = 100
-        research_progress[session_id]["message"] = "Research complete"
-        research_progress[session_id]["result"] = result
+        if cache_hit:
+            # A cached answer shares the permalink of the report it was cached from
+            report_id = cache_hit.get("report_id")
+        elif is_failed_report(result):
+            # Nothing was synthesized, so there is no report to keep
+            report_id = None
+        else:
+            report_id = save_report(session_id, query, result, started_at, mode)
+            if report_id:
+                get_agent().query_cache.link_report(result, report_id)
+        
+        # Every user who joined this run gets the turn in their own history,
+        # recorded before completion is announced so their history panel shows it
+        for attached_user in research_flights.finish(key) or [user_id]:
+            record_turn(attached_user, query, result, report_id)
         
-        # Store in conversation history
-        if user_id in conversation_history:
-            # Extract a summary for context (first 200 chars)
-            summary = result[:200] + "..." if len(result) > 200 else result
-            conversation_history[user_id].append({
-                "query": query,
-                "summary": summary,
-                "timestamp": time.time()
-            })
-            # Keep history to a reasonable size
-            if len(conversation_history[user_id]) > 10:
-                conversation_history[user_id] = conversation_history[user_id][-10:]
+        # Update final state
+        update_progress(session_id, status="complete", progress_pct=100,
+                        message="Research complete", result=result, report_id=report_id)
         
+    except ResearchCancelled as e:
+        research_flights.finish(key)
+        logger.info("Research cancelled", extra={'reason': str(e)})
+        mark_cancelled(session_id, str(e))
+    except ResearchUnavailable as e:
+        research_flights.finish(key)
+        update_progress(session_id, status="error", error=str(e), message=str(e))
     except Exception as e:
-        logger.error(f"Research error: {e}", exc_info=True)
-        research_progress[session_id]["status"] = "error"
-        research_progress[session_id]["error"] = str(e)
-        research_progress[session_id]["message"] = f"An error occurred during research: {e}"
+        research_flights.finish(key)
+        logger.exception("Research failed")
+        update_progress(session_id, status="error", error=str(e),
+                        message=f"An error occurred during research: {e}")
+    finally:
+        with running_tokens_lock:
+            running_tokens.pop(session_id, None)
+        unbind(log_token)
 
-@app.route('/research', methods=['POST'])
-def research_endpoint():
-    """Handles the research query POST request."""
-    if not agent_instance:
-        return jsonify({"error": initialization_error or "Agent not available."}), 500
+def start_research(query, user_id, client=None, profile=False):
+    """
+    Starts (or joins) a research session for a user's query.
     
-    query = request.form.get('query')
+    Shared by the Flask route and the asyncio entry point in asgi.py.
+    
+    Args:
+        query: The research question.
+        user_id: The user asking it.
+        client: Who rate limits and fair queueing apply to (see client_key); defaults to user_id.
+        profile: Whether the research runs under cProfile (see /admin/profile/<session_id>).
+    
+    Returns:
+        A (payload, HTTP status, extra headers) tuple.
+    """
+    if not get_agent():
+        return {"error": initialization_error or "Agent not available."}, 500, {}
     if not query:
-        return jsonify({"error": "No query provided."}), 400
+        return {"error": "No query provided."}, 400, {}
+    client = client or user_id
+    try:
+        rate_limiter.acquire(client)
+    except RateLimitedError as e:
+        return ({"error": "You're sending research requests too quickly. Please wait a moment.",
+                 "retry_after": e.retry_after},
+                429, {"Retry-After": str(e.retry_after)})
 
+    key, is_leader = None, False
     try:
-        print(f"Received research request for: {query}")
+        logger.info("Research requested", extra={'query': query})
         
-        # Get or create user session ID
-        user_id = session.get('user_id', str(uuid.uuid4()))
-        if 'user_id' not in session:
-            session['user_id'] = user_id
-            conversation_history[user_id] = []
+        # Get the rolling conversation summary for this user (empty for a first question)
+        context = load_memory(user_id).get_context()
         
-        # Create a unique session ID for this research query
-        session_id = f"research_{int(time.time() * 1000)}"
+        # Create a unique session ID for this research query, unless the same
+        # research is already running, in which case this request follows it
+        key = flight_key(query, context)
+        session_id, is_leader = research_flights.join(
+            key, user_id, f"research_{int(time.time() * 1000)}_{uuid.uuid4().hex[:6]}")
         
-        # Get conversation context for this user
-        context = []
-        if user_id in conversation_history:
-            # Get the last 3 conversations for context (can be adjusted)
-            context = conversation_history[user_id][-3:]
+        # A new question supersedes the user's previous one if that is still running
+        previous_session = state_store.get_json(f"active:{user_id}")
+        state_store.set_json(f"active:{user_id}", session_id, ttl_seconds=PROGRESS_TTL)
+        if previous_session and previous_session != session_id:
+            request_cancel(previous_session, user_id)
+        if not is_leader:
+            withdraw_cancel(session_id, user_id)
+            progress = state_store.get_progress(session_id) or {}
+            return {"session_id": session_id, "queue_position": progress.get("queue_position"),
+                    "coalesced": True}, 200, {}
         
-        # Start a thread to run the research
-        thread = Thread(target=run_research_task, args=(query, session_id, user_id, context))
-        thread.daemon = True
-        thread.start()
+        # Visible to the progress endpoints while the job waits for a worker
+        state_store.create_progress(session_id, {
+            "status": "queued",
+            "phase": "queued",
+            "message": "Waiting for a free research worker...",
+            "sources": [],
+            "progress_pct": 0,
+            "queue_position": None,
+            "result": None,
+            "error": None
+        })
+        
+        # Queue the research on the worker pool
+        try:
+            task = request_profiles.wrap(session_id, run_research_task) if profile else run_research_task
+            position = research_pool.submit(session_id, task, query, session_id, user_id, context, key,
+                                            owner=client)
+        except QueueFullError as e:
+            research_flights.finish(key)
+            state_store.delete_progress(session_id)
+            if isinstance(e, OwnerLimitError):
+                return ({"error": "You already have research waiting. Please wait for it to start.",
+                         "retry_after": e.retry_after},
+                        429, {"Retry-After": str(e.retry_after)})
+            return ({"error": "WebSight is busy right now. Please try again shortly.",
+                     "retry_after": e.retry_after},
+                    503, {"Retry-After": str(e.retry_after)})
+        if (state_store.get_progress(session_id) or {}).get("status") == "queued":
+            on_queue_position_change(session_id, position)
         
         # Return the session ID for progress tracking
-        return jsonify({"session_id": session_id})
+        return {"session_id": session_id, "queue_position": position}, 200, {}
     except Exception as e:
-        print(f"Error starting research for query '{query}': {e}")
-        return jsonify({"error": f"An error occurred starting research: {e}"}), 500
+        if is_leader:
+            research_flights.finish(key)
+        logger.exception("Could not start research", extra={'query': query})
+        return {"error": f"An error occurred starting research: {e}"}, 500, {}
+
+@app.route('/research', methods=['POST'])
+def research_endpoint():
+    """Handles the research query POST request."""
+    # Get or create user session ID
+    has_session = 'user_id' in session
+    user_id = session.get('user_id', str(uuid.uuid4()))
+    if not has_session:
+        session['user_id'] = user_id
+        # Undone with the rest of the request's log context at teardown
+        bind(user_id=user_id)
+    
+    # Admins can have a session profiled by posting profile=1
+    profile = request.form.get('profile') == '1' and is_admin(request.headers)
+    payload, status, headers = start_research(request.form.get('query'), user_id,
+                                              client_key(user_id, has_session, request.remote_addr), profile)
+    response = jsonify(payload)
+    response.headers.update(headers)
+    return response, status
 
 @app.route('/research_progress/<session_id>', methods=['GET'])
 def research_progress_endpoint(session_id):
     """Returns the current progress of a research session."""
-    if session_id not in research_progress:
+    progress = state_store.get_progress(session_id)
+    if progress is None:
         return jsonify({"error": "Invalid session ID"}), 404
     
-    return jsonify(research_progress[session_id])
+    return jsonify(progress)
 
 @app.route('/research_stream/<session_id>')
 def research_stream(session_id):
-    """Stream the research progress as server-sent events."""
+    """
+    Stream the research progress as server-sent events.
+    
+    The first event is a snapshot of the full progress; after that only deltas
+    are sent: "update" events with the changed fields and "source" events with
+    one added or updated source.
+    
+    Closing the stream before the research ends counts as leaving it: unless
+    the client reconnects within a short grace period, the research is
+    cancelled once no other client is waiting for it.
+    """
+    user_id = session.get('user_id')
+    
     def generate():
-        last_progress = None
-        
-        # Check progress every second until complete or error
-        while session_id in research_progress:
-            current_progress = research_progress[session_id]
+        finished = False
+        try:
+            # Take the sequence number before the snapshot so no delta can fall in between
+            last_seq = state_store.last_event_seq(session_id)
+            progress = state_store.get_progress(session_id)
+            if progress is None:
+                finished = True
+                return
+            if user_id:
+                # A reconnecting client takes back the leave its dropped stream recorded
+                withdraw_cancel(session_id, user_id)
+            yield f"data: {json.dumps({'type': 'snapshot', 'progress': progress})}\n\n"
+            if progress.get("status") in TERMINAL_STATUSES:
+                finished = True
+                return
             
-            # Only send updates when there's a change
-            if current_progress != last_progress:
-                last_progress = current_progress.copy()
-                yield f"data: {json.dumps(current_progress)}\n\n"
-            
-            # If research is complete or errored, send one last update and stop
-            if current_progress.get("status") in ["complete", "error"]:
-                if current_progress.get("status") == "complete" and current_progress.get("result"):
-                    # Clean up, but keep session data for 5 minutes for client to fetch the result
-                    # We'll use a timer to remove it later
-                    def remove_session():
-                        if session_id in research_progress:
-                            del research_progress[session_id]
-                    
-                    # Schedule cleanup after 5 minutes
-                    cleanup_thread = Thread(target=lambda: (time.sleep(300), remove_session()))
-                    cleanup_thread.daemon = True
-                    cleanup_thread.start()
-                    
-                break
-            
-            time.sleep(1)
+            while True:
+                events = state_store.wait_events(session_id, last_seq, timeout=15)
+                if not events:
+                    if state_store.get_progress(session_id) is None:
+                        finished = True
+                        break
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                for event in events:
+                    last_seq = event["seq"]
+                    yield f"data: {json.dumps(event)}\n\n"
+                
+                # If research is complete, errored or cancelled, stop after the final update
+                # (the session itself expires from the state store; see the reaper)
+                if any(e.get("changes", {}).get("status") in TERMINAL_STATUSES for e in events):
+                    finished = True
+                    break
+        finally:
+            # Reached only without finishing when the client went away mid-research
+            if not finished and user_id:
+                request_cancel(session_id, user_id, grace=DISCONNECT_GRACE_SECONDS)
     
     return Response(stream_with_context(generate()), content_type='text/event-stream')
 
+def cancel_research_for_user(session_id, user_id):
+    """
+    Cancels a research session on behalf of a user.
+    
+    Returns:
+        A (payload, HTTP status) tuple.
+    """
+    progress = state_store.get_progress(session_id)
+    if progress is None:
+        return {"error": "Invalid session ID"}, 404
+    if progress.get("status") in TERMINAL_STATUSES:
+        return {"status": progress["status"]}, 200
+    if not user_id:
+        return {"error": "No user session."}, 400
+    request_cancel(session_id, user_id)
+    return {"status": "cancel_requested"}, 200
+
+@app.route('/research/<session_id>/cancel', methods=['POST'])
+def cancel_research(session_id):
+    """Cancels a research session for the current user; coalesced sessions stop once every user has cancelled."""
+    payload, status = cancel_research_for_user(session_id, session.get('user_id'))
+    return jsonify(payload), status
+
+@app.route('/metrics')
+def metrics():
+    """Returns operational metrics as JSON."""
+    return jsonify({
+        "worker_pool": research_pool.metrics(),
+        "state_store": state_store.stats(),
+        "source_stores": source_stores.stats(),
+        "single_flight": research_flights.stats(),
+        "report_store": report_store.stats(),
+        "domain_stats": domain_stats.stats() if domain_stats is not None else None,
+        "rate_limit": rate_limiter.stats(),
+        "degradation": degradation.stats(),
+        "llm": llm_stats.stats(),
+        "reaper": {"runs": reaper.runs, "last_run": reaper.last_run, "interval_s": reaper.interval},
+        "memory": process_memory(),
+        "logging": logging_stats(),
+        "profiling": {"memory": memory_tracer.status(), "sessions": request_profiles.stats()},
+        "query_cache": agent_instance.query_cache.stats() if agent_instance else None
+    })
+
+@app.route('/report/<report_id>')
+def get_report(report_id):
+    """Returns a saved report. Reports never change, so browsers and proxies may cache them."""
+    headers = {"Cache-Control": "public, max-age=86400, immutable"}
+    # A revalidation only needs the ETag, not the report
+    if request.if_none_match:
+        etag = report_store.etag(report_id)
+        if etag and etag in request.if_none_match:
+            return Response(status=304, headers={**headers, "ETag": f'"{etag}"'})
+    
+    etag, report = report_store.get(report_id)
+    if report is None:
+        return jsonify({"error": "Report not found. It may have expired."}), 404
+    response = jsonify(report)
+    response.set_etag(etag)
+    response.headers.update(headers)
+    return response
+
+@app.route('/usage')
+def usage():
+    """Returns the current user's request allowance and research usage."""
+    user_id = session.get('user_id')
+    client = client_key(user_id, user_id is not None, request.remote_addr)
+    return jsonify({"requests": rate_limiter.usage(client), "research": research_pool.usage(client)})
+
+@app.route('/cache/false_hit', methods=['POST'])
+def report_cache_false_hit():
+    """
+    Flags a cached answer as not matching the question asked, evicting it from the cache.
+    
+    Only the user who was just served that cached answer may report it, once, so
+    other clients can't evict shared entries by posting queries.
+    """
+    query = request.form.get('query')
+    if not query:
+        return jsonify({"error": "No query provided."}), 400
+    user_id = session.get('user_id')
+    last_hit = state_store.get_json(cache_hit_key(user_id)) if user_id else None
+    if not last_hit or last_hit.get("query") != query:
+        return jsonify({"error": "No cached answer was served to you for this query."}), 403
+    if not get_agent():
+        return jsonify({"error": initialization_error or "Agent not available."}), 500
+    
+    state_store.delete_json(cache_hit_key(user_id))
+    found = get_agent().query_cache.report_false_hit(query)
+    return jsonify({"status": "success" if found else "not_found"})
+
 @app.route('/conversation_history')
 def get_conversation_history():
     """Get the conversation history for the current user"""
     user_id = session.get('user_id')
-    if not user_id or user_id not in conversation_history:
+    if not user_id:
         return jsonify([])
     
-    return jsonify(conversation_history[user_id])
+    return jsonify(state_store.get_history(user_id))
 
 @app.route('/clear_history', methods=['POST'])
 def clear_history():
     """Clear the conversation history for the current user"""
     user_id = session.get('user_id')
-    if user_id and user_id in conversation_history:
-        conversation_history[user_id] = []
+    if user_id:
+        state_store.clear_history(user_id)
+        state_store.delete_json(memory_key(user_id))
+    source_stores.pop(user_id, None)
     
     return jsonify({"status": "success"})
 
+def admin_only(view):
+    """Restricts a route to requests carrying WEBSIGHT_ADMIN_TOKEN; without the setting the route doesn't exist."""
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        if not admin_token():
+            return jsonify({"error": "Not found."}), 404
+        if not is_admin(request.headers):
+            return jsonify({"error": "Admin token required."}), 403
+        return view(*args, **kwargs)
+    return guarded
+
+def _download(body, filename, mimetype):
+    return Response(body, mimetype=mimetype, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.route('/admin/profile/stacks')
+@admin_only
+def sample_stacks():
+    """Samples the stacks of the research threads for a few seconds; collapsed stacks or the top functions."""
+    sampler = StackSampler(seconds=request.args.get('seconds', 5, type=float),
+                           interval=request.args.get('interval', 0.01, type=float),
+                           thread_prefix=request.args.get('threads', 'research-worker')).run()
+    if request.args.get('format') == 'json':
+        return jsonify(sampler.top(request.args.get('limit', 30, type=int)))
+    return _download(sampler.collapsed(), f"stacks-{int(time.time())}.txt", "text/plain")
+
+@app.route('/admin/profile/<session_id>')
+@admin_only
+def download_session_profile(session_id):
+    """Returns a profiled research session's cProfile stats, as a pstats file or (format=text) a table."""
+    if request.args.get('format') == 'text':
+        report = request_profiles.report(session_id, sort=request.args.get('sort', 'cumulative'),
+                                         limit=request.args.get('limit', 40, type=int))
+        return (Response(report, mimetype="text/plain") if report is not None
+                else (jsonify({"error": "No profile for this session."}), 404))
+    dump = request_profiles.dump(session_id)
+    if dump is None:
+        return jsonify({"error": "No profile for this session."}), 404
+    return _download(dump, f"{session_id}.prof", "application/octet-stream")
+
+@app.route('/admin/memory/start', methods=['POST'])
+@admin_only
+def start_memory_tracing():
+    """Starts tracemalloc; it slows every allocation down until stopped."""
+    return jsonify(memory_tracer.start(request.args.get('frames', 10, type=int)))
+
+@app.route('/admin/memory/stop', methods=['POST'])
+@admin_only
+def stop_memory_tracing():
+    return jsonify(memory_tracer.stop())
+
+@app.route('/admin/memory/snapshot')
+@admin_only
+def memory_snapshot():
+    """Takes a tracemalloc snapshot and returns the allocation sites that grew since the previous (or first) one."""
+    try:
+        if request.args.get('format') == 'dump':
+            memory_tracer.snapshot(limit=0)
+            return _download(memory_tracer.dump(), f"memory-{int(time.time())}.snapshot", "application/octet-stream")
+        return jsonify(memory_tracer.snapshot(limit=request.args.get('limit', 25, type=int),
+                                              key_type=request.args.get('key', 'lineno'),
+                                              since=request.args.get('since', 'previous')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
+@app.route('/admin/cache/hits')
+@admin_only
+def query_cache_hits():
+    """Returns the semantic cache's recent hits: each query and the cached query it was answered from."""
+    if not agent_instance:
+        return jsonify([])
+    return jsonify(agent_instance.query_cache.recent_hits(request.args.get('limit', 20, type=int)))
+
+# Build the agent in the background once the app is up; WEBSIGHT_WARMUP=0 defers it to the first research
+if os.environ.get('WEBSIGHT_WARMUP', '1') != '0':
+    warm_up()
+
 if __name__ == '__main__':
     # Use environment variable for port, default to 5001 if not set
     port = int(os.environ.get('PORT', 5001))
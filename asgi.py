@@ -0,0 +1,296 @@
+"""
+Asyncio-native entry point for WebSight.
+
+Serve it with any ASGI server, for example:
+
+    uvicorn asgi:application --port 5001
+
+Research submission, the progress and cancel endpoints and the progress
+stream are handled on the event loop: an open stream is a coroutine parked
+on an asyncio.Event that the state store wakes when progress is published,
+so idle clients hold no thread. All other routes (the page, static files,
+history, metrics, ...) are passed to the Flask app in `app.py`, which also
+does the actual work behind the native routes. Research itself still runs
+on the bounded worker pool, since the search, scraping and Gemini SDK calls
+block.
+"""
+import asyncio
+import io
+import json
+import re
+import sys
+import uuid
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from itsdangerous import BadSignature
+
+import app as websight
+from agent.structured_log import log_context
+from server.profiling import is_admin
+
+_PROGRESS_RE = re.compile(r'^/research_progress/([\w-]+)$')
+_STREAM_RE = re.compile(r'^/research_stream/([\w-]+)$')
+_CANCEL_RE = re.compile(r'^/research/([\w-]+)/cancel$')
+KEEP_ALIVE_SECONDS = 15
+
+
+# --- Flask-compatible session cookie ---
+
+def _serializer():
+    return websight.app.session_interface.get_signing_serializer(websight.app)
+
+
+def read_user_id(scope) -> str:
+    """Returns the user_id from the Flask session cookie of a request, or None."""
+    cookie_name = websight.app.config['SESSION_COOKIE_NAME']
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            morsel = SimpleCookie(value.decode('latin-1')).get(cookie_name)
+            if morsel is None:
+                continue
+            try:
+                return _serializer().loads(morsel.value).get('user_id')
+            except (BadSignature, AttributeError):
+                return None
+    return None
+
+
+def session_cookie(user_id: str) -> bytes:
+    """Builds a Set-Cookie value the Flask routes accept as the same session."""
+    value = _serializer().dumps({'user_id': user_id})
+    return f"{websight.app.config['SESSION_COOKIE_NAME']}={value}; HttpOnly; Path=/".encode('latin-1')
+
+
+# --- Small ASGI helpers ---
+
+async def _read_body(receive) -> bytes:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _send_json(send, payload, status=200, headers=None):
+    body = json.dumps(payload).encode('utf-8')
+    response_headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    response_headers += [(k.lower().encode('latin-1'), v if isinstance(v, bytes) else str(v).encode('latin-1'))
+                         for k, v in (headers or {}).items()]
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _wait_any(events, timeout):
+    waiters = [asyncio.ensure_future(event.wait()) for event in events]
+    try:
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+
+# --- Native routes ---
+
+async def _research(scope, receive, send):
+    form = parse_qs((await _read_body(receive)).decode('utf-8'))
+    query = (form.get('query') or [None])[0]
+    user_id = read_user_id(scope)
+    has_session = user_id is not None
+    headers = {}
+    if not has_session:
+        user_id = str(uuid.uuid4())
+        headers['set-cookie'] = session_cookie(user_id)
+
+    client = websight.client_key(user_id, has_session, (scope.get('client') or ('',))[0])
+    request_headers = {name.decode('latin-1').title(): value.decode('latin-1')
+                       for name, value in scope.get('headers', [])}
+    request_id = request_headers.get('X-Request-Id') or uuid.uuid4().hex[:12]
+    headers['x-request-id'] = request_id
+    profile = (form.get('profile') or [None])[0] == '1' and is_admin(request_headers)
+    # to_thread copies the context, so the research queued from there is tagged too
+    with log_context(request_id=request_id, user_id=user_id):
+        payload, status, extra_headers = await asyncio.to_thread(websight.start_research, query, user_id, client,
+                                                                 profile)
+    await _send_json(send, payload, status, {**extra_headers, **headers})
+
+
+async def _progress(scope, receive, send, session_id):
+    progress = await asyncio.to_thread(websight.state_store.get_progress, session_id)
+    if progress is None:
+        await _send_json(send, {"error": "Invalid session ID"}, 404)
+    else:
+        await _send_json(send, progress)
+
+
+async def _cancel(scope, receive, send, session_id):
+    await _read_body(receive)
+    payload, status = await asyncio.to_thread(websight.cancel_research_for_user, session_id, read_user_id(scope))
+    await _send_json(send, payload, status)
+
+
+async def _stream(scope, receive, send, session_id):
+    """Server-sent progress events: the same snapshot-then-deltas protocol as the Flask route."""
+    store = websight.state_store
+    user_id = read_user_id(scope)
+    loop = asyncio.get_running_loop()
+
+    last_seq = await asyncio.to_thread(store.last_event_seq, session_id)
+    progress = await asyncio.to_thread(store.get_progress, session_id)
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache')]})
+    if progress is None:
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    woken = asyncio.Event()
+    disconnected = asyncio.Event()
+    unsubscribe = store.subscribe(session_id, lambda: loop.call_soon_threadsafe(woken.set))
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    finished = False
+
+    async def emit(text):
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+    try:
+        if user_id:
+            # A reconnecting client takes back the leave its dropped stream recorded
+            await asyncio.to_thread(websight.withdraw_cancel, session_id, user_id)
+        await emit(f"data: {json.dumps({'type': 'snapshot', 'progress': progress})}\n\n")
+        if progress.get("status") in websight.TERMINAL_STATUSES:
+            finished = True
+            return
+
+        last_sent = loop.time()
+        while not disconnected.is_set():
+            # Clear before looking, so a publish in between still wakes the next wait
+            woken.clear()
+            events = await asyncio.to_thread(store.wait_events, session_id, last_seq, 0)
+            if events:
+                for event in events:
+                    last_seq = event["seq"]
+                    await emit(f"data: {json.dumps(event)}\n\n")
+                last_sent = loop.time()
+                if any(e.get("changes", {}).get("status") in websight.TERMINAL_STATUSES for e in events):
+                    finished = True
+                    break
+                continue
+
+            idle = loop.time() - last_sent
+            if idle >= KEEP_ALIVE_SECONDS:
+                if await asyncio.to_thread(store.get_progress, session_id) is None:
+                    finished = True
+                    break
+                # Comment line keeps proxies from closing an idle stream
+                await emit(": keep-alive\n\n")
+                last_sent = loop.time()
+                continue
+            await _wait_any([woken, disconnected],
+                            min(store.event_poll_interval, KEEP_ALIVE_SECONDS - idle))
+    except OSError:
+        # The server could not write to a client that went away
+        pass
+    finally:
+        unsubscribe()
+        watcher.cancel()
+        if not finished and user_id:
+            await asyncio.to_thread(websight.request_cancel, session_id, user_id,
+                                    websight.DISCONNECT_GRACE_SECONDS)
+        if not disconnected.is_set():
+            try:
+                await send({'type': 'http.response.body', 'body': b''})
+            except OSError:
+                pass
+
+
+# --- Everything else goes to Flask ---
+
+def _wsgi_environ(scope, body: bytes) -> dict:
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif key != 'CONTENT_LENGTH':
+            key = 'HTTP_' + key
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _run_wsgi(environ) -> tuple:
+    response = {'chunks': []}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+        return response['chunks'].append
+
+    result = websight.app(environ, start_response)
+    try:
+        for chunk in result:
+            response['chunks'].append(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], b''.join(response['chunks'])
+
+
+async def _flask(scope, receive, send):
+    environ = _wsgi_environ(scope, await _read_body(receive))
+    status, headers, body = await asyncio.to_thread(_run_wsgi, environ)
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def application(scope, receive, send):
+    """The ASGI application."""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    path, method = scope['path'], scope['method']
+    if path == '/research' and method == 'POST':
+        return await _research(scope, receive, send)
+    match = _STREAM_RE.match(path)
+    if match and method == 'GET':
+        return await _stream(scope, receive, send, match.group(1))
+    match = _PROGRESS_RE.match(path)
+    if match and method == 'GET':
+        return await _progress(scope, receive, send, match.group(1))
+    match = _CANCEL_RE.match(path)
+    if match and method == 'POST':
+        return await _cancel(scope, receive, send, match.group(1))
+    return await _flask(scope, receive, send)
@@ -0,0 +1,257 @@
+"""
+Micro-benchmark of the CPU-bound parsing steps, with a regression gate.
+
+Measures, over checked-in fixtures:
+  - WebScraperTool.extract_text per page and per BeautifulSoup parser backend:
+    time, extracted text size and peak memory allocated while parsing
+  - ContentAnalyzerTool._parse_response on well-formed and malformed model
+    outputs (fenced, prose-wrapped, truncated, free text, ...): time, peak
+    allocation and whether the output passed schema validation (malformed
+    ones are rejected, and the analyzer asks the model to correct them)
+
+Pages are the edge cases in benchmarks/fixtures/extraction_cases.json.gz
+(unclosed tags, table layouts, huge inline scripts, deep nesting, ...) plus
+the pages of the research corpus.
+
+Usage:
+    python benchmarks/extraction_bench.py [--parsers html.parser,lxml] [--repeat 5]
+        [--thresholds benchmarks/extraction_thresholds.json]
+        [--baseline previous.json --tolerance 0.25] [--output results.json]
+
+Exits with status 1 if a threshold is exceeded or a metric regressed against
+the baseline by more than the tolerance.
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import Corpus  # noqa: E402
+from benchmarks.research_bench import DEFAULT_CORPUS, percentile  # noqa: E402
+from tools.analyzer import AnalysisParseError, ContentAnalyzerTool  # noqa: E402
+from tools.scraper import WebScraperTool  # noqa: E402
+
+CASES_PATH = os.path.join(ROOT, 'benchmarks', 'fixtures', 'extraction_cases.json.gz')
+DEFAULT_THRESHOLDS = os.path.join(ROOT, 'benchmarks', 'extraction_thresholds.json')
+
+
+# Summary metrics compared against a baseline, and whether a higher value is better
+BASELINE_METRICS = {'p50_ms': False, 'p95_ms': False, 'peak_alloc_kb_max': False, 'text_chars_total': True}
+
+
+def load_cases(corpus_pages: int = None) -> tuple:
+    """Returns (pages, llm_outputs): name -> HTML and name -> raw model output."""
+    with gzip.open(CASES_PATH, 'rt', encoding='utf-8') as f:
+        cases = json.load(f)
+    pages = dict(cases['pages'])
+    corpus = Corpus.load(DEFAULT_CORPUS)
+    for url, html in list(corpus.pages.items())[:corpus_pages]:
+        pages['corpus:' + url.split('://', 1)[-1]] = html
+    return pages, cases['llm_outputs']
+
+
+def measure(fn, repeat: int) -> tuple:
+    """Runs fn `repeat` times; returns (its result, median seconds, peak KB allocated by one run)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    # A separate traced run: tracing slows everything down, so it is not timed
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, statistics.median(timings), peak / 1024
+
+
+def _summarize(rows: list[dict]) -> dict:
+    timings = sorted(row['ms'] for row in rows)
+    allocations = sorted(row['peak_alloc_kb'] for row in rows)
+    slowest = max(rows, key=lambda row: row['ms'])
+    return {
+        'cases': len(rows),
+        'total_ms': round(sum(timings), 3),
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'max_ms': round(slowest['ms'], 3),
+        'slowest': slowest['name'],
+        'peak_alloc_kb_p95': round(percentile(allocations, 0.95), 1),
+        'peak_alloc_kb_max': round(allocations[-1], 1),
+    }
+
+
+def bench_parsers(pages: dict, parsers: list, repeat: int) -> dict:
+    """Times text extraction of every page with every parser backend."""
+    results = {}
+    for parser in parsers:
+        scraper = WebScraperTool(parser=parser)
+        if scraper.parser != parser:
+            print(f"Skipping parser {parser}: not installed")
+            continue
+        rows = []
+        for name, html in pages.items():
+            text, seconds, peak_kb = measure(lambda: scraper.extract_text(html), repeat)
+            rows.append({'name': name, 'html_kb': round(len(html) / 1024, 1), 'ms': round(seconds * 1000, 3),
+                         'text_chars': len(text), 'peak_alloc_kb': round(peak_kb, 1)})
+        summary = _summarize(rows)
+        total_html_mb = sum(len(html) for html in pages.values()) / (1024 * 1024)
+        summary['mb_per_s'] = round(total_html_mb / (summary['total_ms'] / 1000), 2) if summary['total_ms'] else 0.0
+        summary['text_chars_total'] = sum(row['text_chars'] for row in rows)
+        results[parser] = {'summary': summary, 'pages': rows}
+    return results
+
+
+def _parse_outcome(analyzer, raw: str) -> tuple:
+    """Returns (the analysis or None, 'valid' or the reason the output was rejected)."""
+    try:
+        return analyzer._parse_response(raw), 'valid'
+    except AnalysisParseError as e:
+        return None, e.reason
+
+
+def bench_llm_outputs(outputs: dict, repeat: int) -> dict:
+    """Times validation of every recorded model output and records whether it passed."""
+    analyzer = ContentAnalyzerTool(model=object())
+    rows = []
+    for name, raw in outputs.items():
+        (result, outcome), seconds, peak_kb = measure(lambda: _parse_outcome(analyzer, raw), repeat)
+        result = result or {}
+        rows.append({'name': name, 'chars': len(raw), 'ms': round(seconds * 1000, 4),
+                     'peak_alloc_kb': round(peak_kb, 1), 'outcome': outcome,
+                     'summary_chars': len(result.get('summary') or ''),
+                     'key_points': len(result.get('key_points') or []),
+                     'relevance_score': result.get('relevance_score')})
+    summary = _summarize(rows)
+    summary['outcomes'] = dict(Counter(row['outcome'] for row in rows))
+    return {'summary': summary, 'outputs': rows}
+
+
+def check_thresholds(results: dict, thresholds: dict) -> list[str]:
+    """
+    Checks summaries against configured limits.
+
+    Limits are keyed like the summary metrics; a 'min_' prefix makes the
+    limit a lower bound (e.g. min_text_chars_total), otherwise it is an
+    upper bound. Parsers without limits, or not measured, are not checked.
+
+    Returns:
+        A description of every exceeded limit.
+    """
+    violations = []
+    sections = [(f"parser {parser}", results['parsers'].get(parser, {}).get('summary'), limits)
+                for parser, limits in thresholds.get('parsers', {}).items()]
+    sections.append(('llm outputs', results['llm_outputs']['summary'], thresholds.get('llm_outputs', {})))
+    for label, summary, limits in sections:
+        if summary is None:
+            continue
+        for key, limit in limits.items():
+            metric = key[len('min_'):] if key.startswith('min_') else key
+            value = summary.get(metric)
+            if value is None:
+                continue
+            if key.startswith('min_') and value < limit:
+                violations.append(f"{label}: {metric} = {value} is below the minimum of {limit}")
+            elif not key.startswith('min_') and value > limit:
+                violations.append(f"{label}: {metric} = {value} exceeds the limit of {limit}")
+    return violations
+
+
+def compare_baseline(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Returns a description of every metric that got worse than the baseline by more than `tolerance`."""
+    violations = []
+    pairs = [(f"parser {parser}", baseline['parsers'].get(parser), current)
+             for parser, current in results['parsers'].items()]
+    pairs.append(('llm outputs', baseline.get('llm_outputs'), results['llm_outputs']))
+    for label, old, new in pairs:
+        if not old:
+            continue
+        for metric, higher_is_better in BASELINE_METRICS.items():
+            before, after = old['summary'].get(metric), new['summary'].get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (-change if higher_is_better else change) > tolerance:
+                violations.append(f"{label}: {metric} went from {before} to {after} ({change * 100:+.1f}%)")
+    return violations
+
+
+def run(parsers: list, repeat: int = 5, corpus_pages: int = None) -> dict:
+    pages, outputs = load_cases(corpus_pages)
+    return {
+        'benchmark': 'extraction',
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'parsers': bench_parsers(pages, parsers, repeat),
+        'llm_outputs': bench_llm_outputs(outputs, repeat),
+    }
+
+
+def print_results(results: dict, details: bool = False):
+    print(f"{'parser':<13}{'pages':>6}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'MB/s':>7}{'text chars':>12}"
+          f"{'alloc KB p95':>14}  slowest")
+    for parser, result in results['parsers'].items():
+        s = result['summary']
+        print(f"{parser:<13}{s['cases']:>6}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['max_ms']:>9.2f}"
+              f"{s['mb_per_s']:>7.1f}{s['text_chars_total']:>12}{s['peak_alloc_kb_p95']:>14.0f}  {s['slowest']}")
+        if details:
+            for row in result['pages']:
+                print(f"    {row['name'][:50]:<50}{row['html_kb']:>8.1f} KB{row['ms']:>9.2f} ms"
+                      f"{row['text_chars']:>9} chars{row['peak_alloc_kb']:>9.0f} KB")
+    s = results['llm_outputs']['summary']
+    print(f"LLM outputs: {s['cases']} parsed, p50 {s['p50_ms']:.3f} ms, p95 {s['p95_ms']:.3f} ms, "
+          f"max {s['max_ms']:.3f} ms ({s['slowest']}), outcomes {s['outcomes']}")
+    if details:
+        for row in results['llm_outputs']['outputs']:
+            print(f"    {row['name']:<24}{row['chars']:>7} chars{row['ms']:>9.3f} ms  {row['outcome']:<14}"
+                  f"summary {row['summary_chars']:>4} chars, {row['key_points']} points, "
+                  f"relevance {row['relevance_score']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark of HTML extraction and LLM output parsing.")
+    parser.add_argument('--parsers', default='html.parser,lxml', help="Comma-separated BeautifulSoup parsers.")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per case (the median is kept).")
+    parser.add_argument('--corpus-pages', type=int, default=None, help="Limit the research corpus pages used.")
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS, help="Limits file; 'none' to skip.")
+    parser.add_argument('--baseline', help="Earlier results to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Relative change against the baseline counted as a regression.")
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    parser.add_argument('--details', action='store_true', help="Show every page and output.")
+    args = parser.parse_args()
+
+    results = run([p.strip() for p in args.parsers.split(',') if p.strip()], args.repeat, args.corpus_pages)
+    print_results(results, args.details)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    violations = []
+    if args.thresholds != 'none':
+        with open(args.thresholds) as f:
+            violations += check_thresholds(results, json.load(f))
+    if args.baseline:
+        with open(args.baseline) as f:
+            violations += compare_baseline(results, json.load(f), args.tolerance)
+    for violation in violations:
+        print(f"REGRESSION: {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
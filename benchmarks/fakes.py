@@ -0,0 +1,308 @@
+"""
+Offline stand-ins for everything the research agent reaches over the network.
+
+They replay a recorded corpus (search results and page HTML) and fake the
+Gemini model with configurable latency, error and malformed-output rates, so
+the agent's own work (parsing, dedup, ranking, prompt building) and its
+behaviour under slow or failing dependencies can be measured without
+DuckDuckGo, the sites or Gemini.
+"""
+import gzip
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+from agent.cancellation import check_cancelled
+from tools.scraper import WebScraperTool
+from tools.search import WebSearchTool
+from tools.text_utils import estimate_tokens, split_sentences, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class Corpus:
+    """
+    Recorded search results and pages.
+
+    The corpus file is JSON (optionally gzipped) with:
+      - conversations: lists of questions asked one after the other
+      - analyses: question -> the query analysis (analysis, search_query) to replay
+      - searches: search query -> list of results (title, url, snippet)
+      - pages: url -> the page's HTML; results without a page fail to fetch
+    """
+
+    def __init__(self, data: dict):
+        self.conversations = data.get('conversations', [])
+        self.analyses = data.get('analyses', {})
+        self.searches = data.get('searches', {})
+        self.pages = data.get('pages', {})
+        self._search_terms = {query: set(tokenize(query)) for query in self.searches}
+
+    @classmethod
+    def load(cls, path: str):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def save(self, path: str):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as f:
+            json.dump({'conversations': self.conversations, 'analyses': self.analyses,
+                       'searches': self.searches, 'pages': self.pages}, f)
+
+    def search(self, query: str) -> list[dict]:
+        """Recorded results for the query, or for the recorded query sharing most of its terms."""
+        if query in self.searches:
+            return self.searches[query]
+        terms = set(tokenize(query))
+        best, best_overlap = None, 0
+        for recorded, recorded_terms in self._search_terms.items():
+            overlap = len(terms & recorded_terms)
+            if overlap > best_overlap:
+                best, best_overlap = recorded, overlap
+        return self.searches[best] if best else []
+
+
+class LatencyModel:
+    """
+    Log-normally distributed latencies plus a failure rate.
+
+    Log-normal matches real network and model latencies well enough: most
+    calls are near the median and a few are several times slower.
+    """
+
+    def __init__(self, median_s: float = 0.0, sigma: float = 0.5, error_rate: float = 0.0, seed: int = None):
+        """
+        Initializes the LatencyModel.
+
+        Args:
+            median_s: Median latency in seconds (0 for no delay).
+            sigma: Spread of the log-normal distribution; 0.5 puts p99 at about 3x the median.
+            error_rate: Share of calls that fail.
+            seed: Seed for reproducible sequences.
+        """
+        self.median_s = median_s
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> tuple:
+        """Returns (latency in seconds, whether the call fails)."""
+        with self._lock:
+            latency = self.median_s * self._random.lognormvariate(0, self.sigma) if self.median_s > 0 else 0.0
+            return latency, self._random.random() < self.error_rate
+
+    def chance(self, rate: float) -> bool:
+        with self._lock:
+            return self._random.random() < rate
+
+    def pick(self, options):
+        with self._lock:
+            return self._random.choice(options)
+
+
+def _wait(seconds: float, cancel_token=None):
+    if seconds <= 0:
+        return
+    if cancel_token is not None:
+        cancel_token.wait(seconds)
+    else:
+        time.sleep(seconds)
+
+
+class ReplaySearchTool(WebSearchTool):
+    """WebSearchTool answering from the corpus; the query simplification retry still applies."""
+
+    def __init__(self, corpus: Corpus, latency: LatencyModel = None):
+        self.corpus = corpus
+        self.latency = latency or LatencyModel()
+        self.calls = 0
+
+    def _perform_search(self, query: str, num_results: int, cancel_token=None) -> list[dict]:
+        self.calls += 1
+        delay, fails = self.latency.sample()
+        _wait(delay, cancel_token)
+        if fails:
+            logger.warning("Web search failed", extra={'error': "replayed search error"})
+            return []
+        return [dict(result) for result in self.corpus.search(query)[:num_results]]
+
+
+class ReplayScraperTool(WebScraperTool):
+    """WebScraperTool serving recorded HTML; text extraction is the real one."""
+
+    def __init__(self, corpus: Corpus, latency: LatencyModel = None, parser: str = None):
+        super().__init__(parser)
+        self.corpus = corpus
+        self.latency = latency or LatencyModel()
+        self.calls = 0
+        self.errors = 0
+
+    def scrape(self, url: str, timeout: int = 10, cancel_token=None) -> dict:
+        self.calls += 1
+        delay, fails = self.latency.sample()
+        _wait(min(delay, timeout), cancel_token)
+        check_cancelled(cancel_token)
+        html = self.corpus.pages.get(url)
+        if fails or html is None:
+            self.errors += 1
+            return {'url': url, 'raw_text': None,
+                    'error': "Request failed: replayed fetch error" if html else "Request failed: 404 Not Found"}
+        return {'url': url, 'raw_text': self.extract_text(html), 'error': None}
+
+
+class FakeLLMError(Exception):
+    """Raised by FakeGeminiModel for simulated failures (quota, timeouts)."""
+
+
+class _FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class _FakeResponse:
+    def __init__(self, text, usage):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeGeminiModel:
+    """
+    Answers the agent's and the analyzer's prompts without calling Gemini.
+
+    Responses are derived from the prompt itself (query analyses from the
+    corpus, content analyses from the page's sentences that mention the
+    query, reports from the source summaries), so they have realistic sizes
+    and keep the pipeline's data flowing. Token counts use the same ~4
+    characters per token estimate as the rest of the app.
+    """
+
+    KINDS = ('query_analysis', 'content_analysis', 'analysis_repair', 'synthesis', 'other')
+
+    def __init__(self, corpus: Corpus = None, latency: LatencyModel = None, malformed_rate: float = 0.0,
+                 latency_scale: dict = None):
+        """
+        Initializes the FakeGeminiModel.
+
+        Args:
+            corpus: Corpus whose recorded query analyses are replayed.
+            latency: Latency and error model of a call.
+            malformed_rate: Share of content analyses returned as not-quite-JSON
+                (wrapped in prose or code fences, or truncated), as real models sometimes do.
+                With a response_schema in the generation config only truncation happens,
+                as with Gemini's constrained output.
+            latency_scale: Optional per-kind latency multipliers, e.g. {'synthesis': 3.0}.
+        """
+        self.corpus = corpus or Corpus({})
+        self.latency = latency or LatencyModel()
+        self.malformed_rate = malformed_rate
+        self.latency_scale = latency_scale or {'synthesis': 3.0}
+        self._lock = threading.Lock()
+        self.counts = {kind: {'calls': 0, 'errors': 0, 'prompt_tokens': 0, 'output_tokens': 0}
+                       for kind in self.KINDS}
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        constrained = bool((generation_config or {}).get('response_schema'))
+        kind, text = self._respond(prompt, constrained)
+        delay, fails = self.latency.sample()
+        time.sleep(delay * self.latency_scale.get(kind, 1.0))
+        usage = _FakeUsage(estimate_tokens(prompt), 0 if fails else estimate_tokens(text))
+        with self._lock:
+            counts = self.counts[kind]
+            counts['calls'] += 1
+            counts['errors'] += 1 if fails else 0
+            counts['prompt_tokens'] += usage.prompt_token_count
+            counts['output_tokens'] += usage.candidates_token_count
+        if fails:
+            raise FakeLLMError("429 Resource has been exhausted (e.g. check quota).")
+        return _FakeResponse(text, usage)
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_kind = {kind: dict(counts) for kind, counts in self.counts.items() if counts['calls']}
+        return {
+            'calls': sum(c['calls'] for c in by_kind.values()),
+            'errors': sum(c['errors'] for c in by_kind.values()),
+            'prompt_tokens': sum(c['prompt_tokens'] for c in by_kind.values()),
+            'output_tokens': sum(c['output_tokens'] for c in by_kind.values()),
+            'by_kind': by_kind
+        }
+
+    def _respond(self, prompt: str, constrained: bool = False) -> tuple:
+        if 'CONTENT ANALYSIS TASK' in prompt:
+            return 'content_analysis', self._content_analysis(prompt, constrained)
+        if 'PREVIOUS ANSWER:' in prompt:
+            return 'analysis_repair', self._repair(prompt)
+        if 'Analyze the following research query' in prompt:
+            return 'query_analysis', self._query_analysis(prompt)
+        if 'synthesize a comprehensive' in prompt:
+            return 'synthesis', self._synthesis(prompt)
+        return 'other', "OK"
+
+    def _query_analysis(self, prompt: str) -> str:
+        match = re.search(r'Research Query: "(.*?)"', prompt, re.DOTALL)
+        query = match.group(1) if match else ''
+        recorded = self.corpus.analyses.get(query)
+        if recorded is None:
+            recorded = {'analysis': f"The user wants to know: {query}",
+                        'search_query': ' '.join(tokenize(query)[:5]) or query}
+        return json.dumps(recorded)
+
+    def _content_analysis(self, prompt: str, constrained: bool = False) -> str:
+        match = re.search(r'WEB CONTENT:\n(.*?)\n\nSEARCH QUERY:\n"(.*?)"', prompt, re.DOTALL)
+        content, query = (match.group(1), match.group(2)) if match else ('', '')
+        query_terms = set(tokenize(query))
+        scored = []
+        for sentence in split_sentences(content.replace('\n', ' '))[:400]:
+            overlap = len(query_terms & set(tokenize(sentence)))
+            if overlap and len(sentence) > 40:
+                scored.append((overlap, sentence))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        covered = set()
+        for _, sentence in scored[:10]:
+            covered |= query_terms & set(tokenize(sentence))
+        relevance = len(covered) / len(query_terms) if query_terms else 0.5
+        result = json.dumps({
+            'summary': ' '.join(sentence for _, sentence in scored[:2]),
+            'key_points': [sentence for _, sentence in scored[2:6]],
+            'relevance_score': round(min(0.95, max(0.05, relevance)), 2)
+        })
+        if self.malformed_rate and self.latency.chance(self.malformed_rate):
+            result = self._malform(result, constrained)
+        return result
+
+    @staticmethod
+    def _repair(prompt: str) -> str:
+        """Answers a corrective retry with the previous answer's fields as valid JSON."""
+        match = re.search(r'PREVIOUS ANSWER:\n(.*?)\n\nReturn ONLY', prompt, re.DOTALL)
+        previous = match.group(1) if match else ''
+        start, end = previous.find('{'), previous.rfind('}')
+        try:
+            return json.dumps(json.loads(previous[start:end + 1]))
+        except ValueError:
+            summary = re.search(r'"summary":\s*"((?:[^"\\]|\\.)*)', previous)
+            return json.dumps({'summary': summary.group(1) if summary else '', 'key_points': [],
+                               'relevance_score': 0.3})
+
+    def _malform(self, text: str, constrained: bool = False) -> str:
+        variant = 'truncated' if constrained else self.latency.pick(('fenced', 'prose', 'truncated'))
+        if variant == 'fenced':
+            return f"```json\n{text}\n```"
+        if variant == 'prose':
+            return f"Here is the analysis you asked for:\n{text}\nLet me know if you need more."
+        return text[:max(1, len(text) * 2 // 3)]
+
+    @staticmethod
+    def _synthesis(prompt: str) -> str:
+        summaries = re.findall(r'^\s*Summary: (.+)$', prompt, re.MULTILINE)
+        points = re.findall(r'^\s*- (.+)$', prompt, re.MULTILINE)
+        paragraphs = ["Overview:"] + [s for s in summaries if s and s != 'N/A']
+        if points:
+            paragraphs += ["Details:", ' '.join(points[:8])]
+        return '\n\n'.join(paragraphs)
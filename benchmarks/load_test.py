@@ -0,0 +1,452 @@
+"""
+HTTP load test of the WebSight server, fully offline.
+
+Boots app.py in a separate process with the research agent wired to local
+stand-ins. Pages are served from the recorded corpus by a local HTTP server
+and fetched by the real scraper. Search and Gemini are the in-process fakes
+of benchmarks/fakes.py, since both are reached through SDKs rather than
+plain URLs. Then N simulated users each load the page, POST /research and
+hold /research_stream open until their research ends.
+
+Reported: latency per endpoint, time to the first stream event, delivery
+delay of progress events (receive time minus the 'ts' the server stamped
+them with), research durations and final statuses, error rates by status
+code, and the server's thread count, memory and queue depth over time.
+
+Usage:
+    python benchmarks/load_test.py [--users 20] [--rounds 1] [--server gunicorn|werkzeug]
+                                   [--threads 8] [--env WEBSIGHT_MAX_WORKERS=8] [--output load.json]
+"""
+import argparse
+import http.server
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import Corpus, FakeGeminiModel, LatencyModel, ReplaySearchTool  # noqa: E402
+from benchmarks.research_bench import DEFAULT_CORPUS, percentile  # noqa: E402
+
+TERMINAL_STATUSES = ('complete', 'error', 'cancelled')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def local_url(base: str, url: str) -> str:
+    """Maps a recorded page URL (https://host/path) onto the local page server."""
+    return f"{base}/{url.split('://', 1)[-1]}"
+
+
+class PageServer:
+    """Serves the corpus's pages at http://127.0.0.1:<port>/<host>/<path>, with fetch latency."""
+
+    def __init__(self, corpus: Corpus, latency: LatencyModel = None):
+        self.corpus = corpus
+        self.latency = latency or LatencyModel()
+        pages = {url.split('://', 1)[-1]: html for url, html in corpus.pages.items()}
+        latency_model = self.latency
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                delay, fails = latency_model.sample()
+                time.sleep(delay)
+                html = pages.get(self.path.lstrip('/'))
+                if fails or html is None:
+                    self.send_error(503 if fails else 404)
+                    return
+                body = html.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, name="page-server", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class LocalSearchTool(ReplaySearchTool):
+    """ReplaySearchTool whose results point at the local page server."""
+
+    def __init__(self, corpus: Corpus, page_base: str, latency: LatencyModel = None):
+        super().__init__(corpus, latency)
+        self.page_base = page_base
+
+    def _perform_search(self, query, num_results, cancel_token=None):
+        results = super()._perform_search(query, num_results, cancel_token)
+        return [{**result, 'url': local_url(self.page_base, result['url'])} for result in results]
+
+
+# --- Server process -------------------------------------------------------------------------
+
+def serve(args):
+    """Runs the app with a stand-in agent; this is the process the load test boots."""
+    corpus = Corpus.load(args.corpus)
+
+    def install_agent():
+        import app as websight
+        from agent.agent import WebResearchAgent
+        from tools.analyzer import ContentAnalyzerTool
+        llm = FakeGeminiModel(corpus, LatencyModel(args.llm_latency, 0.5, args.llm_errors, seed=args.seed))
+        websight.agent_instance = WebResearchAgent(
+            llm_model=llm,
+            search_tool=LocalSearchTool(corpus, args.page_base, LatencyModel(args.search_latency, seed=args.seed)),
+            analyzer_tool=ContentAnalyzerTool(model=llm)
+        )
+        return websight.app
+
+    if args.server == 'werkzeug':
+        from werkzeug.serving import make_server
+        make_server('127.0.0.1', args.port, install_agent(), threaded=True).serve_forever()
+        return
+
+    # Same worker type and thread count as the Dockerfile's gunicorn command
+    from gunicorn.app.base import BaseApplication
+
+    class StandInApplication(BaseApplication):
+        def load_config(self):
+            for key, value in {'bind': f"127.0.0.1:{args.port}", 'workers': 1, 'threads': args.threads,
+                               'worker_class': 'gthread', 'timeout': 0, 'loglevel': 'warning'}.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return install_agent()
+
+    StandInApplication().run()
+
+
+# --- Load generator -------------------------------------------------------------------------
+
+def read_events(response):
+    """Yields the JSON events of a server-sent event stream, with the time each was received."""
+    for line in response.iter_lines(decode_unicode=True):
+        if line and line.startswith('data: '):
+            yield time.time(), json.loads(line[len('data: '):])
+
+
+class Recorder:
+    """Thread-safe collection of the load test's measurements."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)  # endpoint -> seconds
+        self.statuses = defaultdict(Counter)  # endpoint -> status code (or exception name) -> count
+        self.first_event = []
+        self.event_delays = []
+        self.durations = []
+        self.outcomes = Counter()
+        self.modes = Counter()
+        self.open_streams = 0
+        self.timeline = []
+
+    def request(self, endpoint, status, seconds):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][str(status)] += 1
+
+    def add(self, name, value):
+        with self._lock:
+            getattr(self, name).append(value)
+
+    def count(self, name, key):
+        with self._lock:
+            getattr(self, name)[key] += 1
+
+    def streams(self, change):
+        with self._lock:
+            self.open_streams += change
+
+
+def run_user(base_url, questions, rounds, think_s, recorder: Recorder, stop: threading.Event):
+    """One simulated user: loads the page, then researches its questions one after the other."""
+    http = requests.Session()
+
+    def timed(endpoint, method, url, **kwargs):
+        started = time.time()
+        try:
+            response = http.request(method, url, timeout=kwargs.pop('timeout', 30), **kwargs)
+        except requests.RequestException as e:
+            recorder.request(endpoint, type(e).__name__, time.time() - started)
+            return None
+        recorder.request(endpoint, response.status_code, time.time() - started)
+        return response
+
+    timed('GET /', 'GET', f"{base_url}/")
+    for round_number in range(rounds):
+        for question in questions:
+            if stop.is_set():
+                return
+            response = timed('POST /research', 'POST', f"{base_url}/research", data={'query': question})
+            if response is None or response.status_code != 200:
+                if response is not None and response.status_code in (429, 503):
+                    # Back off like the page does, but never longer than the test
+                    stop.wait(min(float(response.headers.get('Retry-After', 1)), 10))
+                continue
+            session_id = response.json()['session_id']
+            follow_stream(http, base_url, session_id, recorder)
+            stop.wait(think_s)
+
+
+def follow_stream(http, base_url, session_id, recorder: Recorder):
+    """Holds a research's progress stream open until it ends, recording event timings."""
+    started = time.time()
+    recorder.streams(+1)
+    status = 'disconnected'
+    try:
+        with http.get(f"{base_url}/research_stream/{session_id}", stream=True, timeout=(10, 120)) as response:
+            recorder.request('GET /research_stream', response.status_code, 0.0)
+            for i, (received, event) in enumerate(read_events(response)):
+                if i == 0:
+                    recorder.add('first_event', received - started)
+                if event.get('type') == 'snapshot':
+                    progress = event['progress']
+                    recorder.count('modes', (progress.get('degradation') or {}).get('mode', 'full'))
+                    status = progress.get('status', status)
+                else:
+                    if 'ts' in event:
+                        recorder.add('event_delays', max(0.0, received - event['ts']))
+                    status = event.get('changes', {}).get('status', status)
+                if status in TERMINAL_STATUSES:
+                    break
+    except requests.RequestException as e:
+        status = type(e).__name__
+    finally:
+        recorder.streams(-1)
+    recorder.count('outcomes', status)
+    recorder.add('durations', time.time() - started)
+
+
+def process_stats(pid: int) -> dict:
+    """Thread count and RSS of a local process, from /proc (empty where unavailable)."""
+    stats = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('Threads:'):
+                    stats['threads'] = int(line.split()[1])
+                elif line.startswith('VmRSS:'):
+                    stats['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return stats
+
+
+def server_pid(proc) -> int:
+    """The pid serving requests: gunicorn's single worker when there is one, else the process itself."""
+    try:
+        with open(f'/proc/{proc.pid}/task/{proc.pid}/children') as f:
+            children = [int(pid) for pid in f.read().split()]
+        return children[0] if children else proc.pid
+    except OSError:
+        return proc.pid
+
+
+def sample_server(base_url, proc, recorder: Recorder, stop: threading.Event, interval: float):
+    """Records the server's threads, memory and queue every `interval` seconds."""
+    started = time.time()
+    while not stop.wait(interval):
+        sample = {'t': round(time.time() - started, 2), 'open_streams': recorder.open_streams,
+                  **process_stats(server_pid(proc))}
+        try:
+            metrics = requests.get(f"{base_url}/metrics", timeout=5).json()
+            pool = metrics['worker_pool']
+            sample.update(queue_depth=pool['queue_depth'], active_jobs=pool['active'],
+                          degradation=metrics['degradation']['mode'])
+            sample.setdefault('rss_mb', round((metrics['memory']['rss_bytes'] or 0) / 1024 / 1024, 1))
+        except (requests.RequestException, ValueError, KeyError):
+            sample['metrics_error'] = True
+        recorder.add('timeline', sample)
+
+
+def summarize(recorder: Recorder, wall_s: float) -> dict:
+    def spread(values):
+        values = sorted(values)
+        return {'count': len(values), 'p50': round(percentile(values, 0.5), 4),
+                'p95': round(percentile(values, 0.95), 4), 'p99': round(percentile(values, 0.99), 4),
+                'max': round(values[-1], 4) if values else 0.0}
+
+    endpoints = {}
+    for endpoint, counts in recorder.statuses.items():
+        total = sum(counts.values())
+        errors = sum(n for status, n in counts.items() if not status.startswith('2'))
+        endpoints[endpoint] = {'latency_s': spread(recorder.latencies[endpoint]), 'statuses': dict(counts),
+                               'error_rate': round(errors / total, 4) if total else 0.0}
+    # Stream connections are held for the whole research; their latency is the research duration
+    endpoints.get('GET /research_stream', {}).pop('latency_s', None)
+    timeline = recorder.timeline
+    return {
+        'wall_s': round(wall_s, 2),
+        'endpoints': endpoints,
+        'time_to_first_event_s': spread(recorder.first_event),
+        'event_delay_s': spread(recorder.event_delays),
+        'research_duration_s': spread(recorder.durations),
+        'outcomes': dict(recorder.outcomes),
+        'degradation_modes': dict(recorder.modes),
+        'peak_threads': max((s.get('threads', 0) for s in timeline), default=None),
+        'peak_rss_mb': max((s.get('rss_mb', 0) for s in timeline), default=None),
+        'peak_queue_depth': max((s.get('queue_depth', 0) for s in timeline), default=None),
+        'timeline': timeline,
+    }
+
+
+def start_server(args, page_base: str, port: int):
+    env = dict(os.environ)
+    env.update({
+        'WEBSIGHT_WARMUP': '0',
+        'WEBSIGHT_STATE_BACKEND': 'memory',
+        'WEBSIGHT_REPORT_PATH': os.path.join(tempfile.mkdtemp(), 'load_test_reports.db'),
+        'PYTHONPATH': ROOT + os.pathsep + env.get('PYTHONPATH', ''),
+        'PYTHONWARNINGS': 'ignore',
+    })
+    # app.py wants a key at import; the stand-in agent never uses it
+    env['GEMINI_API_KEY'] = 'load-test-placeholder'
+    env.update(dict(item.split('=', 1) for item in args.env))
+    command = [sys.executable, os.path.abspath(__file__), 'serve', '--port', str(port), '--page-base', page_base,
+               '--corpus', args.corpus, '--server', args.server, '--threads', str(args.threads),
+               '--llm-latency', str(args.llm_latency), '--llm-errors', str(args.llm_errors),
+               '--search-latency', str(args.search_latency), '--seed', str(args.seed)]
+    proc = subprocess.Popen(command, cwd=ROOT, env=env,
+                            stdout=None if args.verbose else subprocess.DEVNULL,
+                            stderr=None if args.verbose else subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("The server exited during startup; rerun with --verbose to see why.")
+        try:
+            requests.get(f"{base_url}/metrics", timeout=1)
+            return proc, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("The server did not come up within 30s.")
+
+
+def run_load_test(args) -> dict:
+    corpus = Corpus.load(args.corpus)
+    recorder = Recorder()
+    stop = threading.Event()
+    with PageServer(corpus, LatencyModel(args.fetch_latency, 0.8, args.fetch_errors, seed=args.seed)) as pages:
+        proc, base_url = start_server(args, pages.base_url, _free_port())
+        try:
+            sampler = threading.Thread(target=sample_server, args=(base_url, proc, recorder, stop, args.sample_every),
+                                       name="server-sampler", daemon=True)
+            sampler.start()
+            started = time.time()
+            users = []
+            for i in range(args.users):
+                questions = corpus.conversations[i % len(corpus.conversations)]
+                user = threading.Thread(target=run_user, name=f"user-{i}", daemon=True,
+                                        args=(base_url, questions, args.rounds, args.think, recorder, stop))
+                user.start()
+                users.append(user)
+                # Users arrive spread over the ramp-up period
+                time.sleep(args.ramp / max(1, args.users))
+            for user in users:
+                user.join(max(0.0, started + args.max_duration - time.time()))
+            stop.set()
+            wall = time.time() - started
+            sampler.join()
+        finally:
+            stop.set()
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    config = {key: value for key, value in vars(args).items() if key not in ('command', 'verbose', 'output')}
+    return {
+        'benchmark': 'load',
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': config,
+        **summarize(recorder, wall),
+    }
+
+
+def print_summary(report: dict):
+    print(f"Load test: {report['config']['users']} users x {report['config']['rounds']} rounds "
+          f"on {report['config']['server']}, {report['wall_s']}s")
+    print(f"  {'endpoint':<22}{'count':>6}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'errors':>8}  statuses")
+    for endpoint, stats in report['endpoints'].items():
+        latency = stats.get('latency_s')
+        columns = ''.join(f"{latency[p]:>8.3f}" for p in ('p50', 'p95', 'p99')) if latency else f"{'-':>8}" * 3
+        print(f"  {endpoint:<22}{sum(stats['statuses'].values()):>6}{columns}{stats['error_rate'] * 100:>7.1f}%  "
+              f"{stats['statuses']}")
+    for name in ('time_to_first_event_s', 'event_delay_s', 'research_duration_s'):
+        stats = report[name]
+        print(f"  {name:<22}{stats['count']:>6}{stats['p50']:>8.3f}{stats['p95']:>8.3f}{stats['p99']:>8.3f}"
+              f"   max {stats['max']:.3f}")
+    print(f"  outcomes: {report['outcomes']}  degradation: {report['degradation_modes']}")
+    print(f"  peak threads: {report['peak_threads']}  peak RSS: {report['peak_rss_mb']} MB  "
+          f"peak queue: {report['peak_queue_depth']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline HTTP load test of the WebSight server.")
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'serve'],
+                        help="'serve' is the server process the load test starts.")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--users', type=int, default=20, help="Simulated users.")
+    parser.add_argument('--rounds', type=int, default=1, help="Times each user asks its conversation.")
+    parser.add_argument('--think', type=float, default=1.0, help="Seconds a user waits between questions.")
+    parser.add_argument('--ramp', type=float, default=5.0, help="Seconds over which users arrive.")
+    parser.add_argument('--max-duration', type=float, default=600.0, help="Stop the test after this long.")
+    parser.add_argument('--server', choices=['gunicorn', 'werkzeug'], default='gunicorn')
+    parser.add_argument('--threads', type=int, default=8, help="gunicorn threads (the Dockerfile uses 8).")
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help="Extra environment for the server, e.g. WEBSIGHT_MAX_WORKERS=8.")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="Median Gemini call latency (s).")
+    parser.add_argument('--llm-errors', type=float, default=0.0)
+    parser.add_argument('--search-latency', type=float, default=0.3)
+    parser.add_argument('--fetch-latency', type=float, default=0.1, help="Median page server latency (s).")
+    parser.add_argument('--fetch-errors', type=float, default=0.02)
+    parser.add_argument('--sample-every', type=float, default=0.5, help="Server sampling interval (s).")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Write the report as JSON to this file.")
+    parser.add_argument('--verbose', action='store_true', help="Show the server's output.")
+    # Internal options of the 'serve' process
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--page-base', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args)
+        return
+    report = run_load_test(args)
+    print_summary(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""
+End-to-end research benchmark, fully offline.
+
+Drives WebResearchAgent.research() and research_with_context() over a
+recorded corpus (benchmarks/fixtures/corpus.json.gz) with fake search,
+fetch and Gemini latencies, at several concurrency levels, and reports per
+turn latency percentiles, throughput, LLM calls, tokens and peak RSS.
+
+Usage:
+    python benchmarks/research_bench.py run [--concurrency 1,4,8] [--turns 40] [--output results.json]
+    python benchmarks/research_bench.py compare baseline.json results.json [--threshold 0.1]
+    python benchmarks/research_bench.py record questions.txt --output corpus.json.gz
+
+`run` saves its results as JSON; `compare` prints the change of every
+metric between two result files and exits with status 1 if any got worse
+by more than the threshold. `record` builds a corpus from live searches and
+pages (one question per line, conversations separated by blank lines).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent.agent import WebResearchAgent  # noqa: E402
+from agent.memory import ConversationMemory  # noqa: E402
+from agent.source_store import SourceStore  # noqa: E402
+from agent.structured_log import configure_logging  # noqa: E402
+from benchmarks.fakes import (Corpus, FakeGeminiModel, LatencyModel, ReplayScraperTool,  # noqa: E402
+                              ReplaySearchTool)
+from tools.analyzer import ContentAnalyzerTool  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(ROOT, 'benchmarks', 'fixtures', 'corpus.json.gz')
+
+# Metrics compared between runs, and whether a higher value is better
+COMPARED_METRICS = {
+    'latency_p50_s': False,
+    'latency_p95_s': False,
+    'latency_p99_s': False,
+    'throughput_turns_per_s': True,
+    'llm_calls_per_turn': False,
+    'tokens_per_turn': False,
+    'peak_rss_mb': False,
+}
+
+
+def percentile(sorted_values: list, share: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 if empty)."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(share * len(sorted_values)))]
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process, in MB."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    # Peak rather than current outside Linux; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class RssSampler:
+    """Samples the process's RSS in the background and keeps the peak."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_mb = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+def build_agent(corpus: Corpus, config: dict, seed: int) -> tuple:
+    """Builds an agent wired to fresh fakes; returns (agent, llm, search tool, scraper tool)."""
+    llm = FakeGeminiModel(
+        corpus,
+        LatencyModel(config['llm_latency'], config['llm_sigma'], config['llm_errors'], seed=seed),
+        malformed_rate=config['llm_malformed']
+    )
+    search_tool = ReplaySearchTool(corpus, LatencyModel(config['search_latency'], seed=seed + 1))
+    scraper_tool = ReplayScraperTool(corpus, LatencyModel(config['fetch_latency'], config['fetch_sigma'],
+                                                          config['fetch_errors'], seed=seed + 2))
+    agent = WebResearchAgent(llm_model=llm, search_tool=search_tool, scraper_tool=scraper_tool,
+                             analyzer_tool=ContentAnalyzerTool(model=llm))
+    agent.analysis_mode = config.get('analysis', 'llm')
+    return agent, llm, search_tool, scraper_tool
+
+
+def run_conversation(agent, questions: list, use_cache: bool) -> list:
+    """Asks a conversation's questions in order, like one user would; returns one record per turn."""
+    source_store = SourceStore()
+    memory = ConversationMemory()
+    turns = []
+    for i, question in enumerate(questions):
+        started = time.perf_counter()
+        error = None
+        try:
+            if i == 0:
+                report = agent.research(question, source_store=source_store, use_cache=use_cache)
+            else:
+                report = agent.research_with_context(question, memory.get_context(), source_store=source_store)
+            memory.add_turn(question, report)
+            if report.startswith("Error during synthesis"):
+                error = report
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        turns.append({'kind': 'research' if i == 0 else 'follow_up',
+                      'latency_s': time.perf_counter() - started, 'error': error})
+    return turns
+
+
+def run_level(corpus: Corpus, config: dict, concurrency: int) -> dict:
+    """Runs at least config['turns'] turns with `concurrency` conversations at a time."""
+    agent, llm, search_tool, scraper_tool = build_agent(corpus, config, config['seed'])
+    workload = []
+    planned = 0
+    while planned < config['turns']:
+        conversation = corpus.conversations[len(workload) % len(corpus.conversations)]
+        workload.append(conversation)
+        planned += len(conversation)
+
+    started = time.perf_counter()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        conversations = list(pool.map(lambda questions: run_conversation(agent, questions, config['cache']),
+                                      workload))
+    wall = time.perf_counter() - started
+
+    turns = [turn for conversation in conversations for turn in conversation]
+    latencies = sorted(turn['latency_s'] for turn in turns)
+    llm_stats = llm.stats()
+    return {
+        'concurrency': concurrency,
+        'turns': len(turns),
+        'failed_turns': sum(1 for turn in turns if turn['error']),
+        'wall_s': round(wall, 3),
+        'throughput_turns_per_s': round(len(turns) / wall, 3) if wall else 0.0,
+        'latency_mean_s': round(sum(latencies) / len(latencies), 4),
+        'latency_p50_s': round(percentile(latencies, 0.50), 4),
+        'latency_p95_s': round(percentile(latencies, 0.95), 4),
+        'latency_p99_s': round(percentile(latencies, 0.99), 4),
+        'latency_max_s': round(latencies[-1], 4),
+        'llm_calls': llm_stats['calls'],
+        'llm_errors': llm_stats['errors'],
+        'llm_calls_per_turn': round(llm_stats['calls'] / len(turns), 3),
+        'prompt_tokens': llm_stats['prompt_tokens'],
+        'output_tokens': llm_stats['output_tokens'],
+        'tokens_per_turn': round((llm_stats['prompt_tokens'] + llm_stats['output_tokens']) / len(turns), 1),
+        'llm_by_kind': llm_stats['by_kind'],
+        'searches': search_tool.calls,
+        'fetches': scraper_tool.calls,
+        'fetch_errors': scraper_tool.errors,
+        'peak_rss_mb': round(rss.peak_mb, 1),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmark(config: dict, corpus: Corpus = None, quiet: bool = True) -> dict:
+    """
+    Runs every concurrency level of the benchmark.
+
+    Args:
+        config: Benchmark settings (see the `run` command's options).
+        corpus: The corpus to replay; loaded from config['corpus'] if not given.
+        quiet: Whether the agent's log output is suppressed.
+
+    Returns:
+        The results document: metadata, the config and one result per concurrency level.
+    """
+    corpus = corpus or Corpus.load(os.path.join(ROOT, config['corpus']))
+    results = []
+    if quiet:
+        logging.disable(logging.CRITICAL)
+    try:
+        for concurrency in config['concurrency']:
+            results.append(run_level(corpus, config, concurrency))
+    finally:
+        if quiet:
+            logging.disable(logging.NOTSET)
+    return {
+        'benchmark': 'research',
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': config,
+        'results': results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.1) -> tuple:
+    """
+    Compares two results documents level by level.
+
+    Returns:
+        A tuple of the comparison rows (one per concurrency level and metric) and
+        whether any metric regressed by more than `threshold` (a relative change).
+    """
+    rows = []
+    regressed = False
+    baseline_levels = {result['concurrency']: result for result in baseline['results']}
+    for result in current['results']:
+        base = baseline_levels.get(result['concurrency'])
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            is_regression = worse > threshold
+            regressed = regressed or is_regression
+            rows.append({'concurrency': result['concurrency'], 'metric': metric, 'baseline': old,
+                         'current': new, 'change': round(change, 4), 'regression': is_regression})
+    return rows, regressed
+
+
+def print_results(document: dict):
+    print(f"Research benchmark ({document['git_commit'] or 'no commit'}, {document['created_at']})")
+    print(f"{'conc':>4} {'turns':>5} {'fail':>4} {'turns/s':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+          f"{'llm/turn':>8} {'tok/turn':>9} {'rss MB':>7}")
+    for r in document['results']:
+        print(f"{r['concurrency']:>4} {r['turns']:>5} {r['failed_turns']:>4} {r['throughput_turns_per_s']:>8.2f} "
+              f"{r['latency_p50_s']:>7.3f} {r['latency_p95_s']:>7.3f} {r['latency_p99_s']:>7.3f} "
+              f"{r['llm_calls_per_turn']:>8.2f} {r['tokens_per_turn']:>9.0f} {r['peak_rss_mb']:>7.1f}")
+
+
+def record_corpus(questions_path: str, output_path: str, num_results: int = 10):
+    """Records live search results and pages for the questions in a file."""
+    import requests
+    from tools.search import WebSearchTool
+
+    with open(questions_path, encoding='utf-8') as f:
+        blocks = f.read().strip().split('\n\n')
+    data = {'conversations': [], 'analyses': {}, 'searches': {}, 'pages': {}}
+    search_tool = WebSearchTool()
+    headers = {'User-Agent': 'Mozilla/5.0 (compatible; WebSight-benchmark-recorder)'}
+    for block in blocks:
+        questions = [line.strip() for line in block.splitlines() if line.strip()]
+        data['conversations'].append(questions)
+        for question in questions:
+            data['analyses'][question] = {'analysis': f"Recorded search for: {question}", 'search_query': question}
+            results = search_tool.search(question, num_results=num_results)
+            data['searches'][question] = results
+            for result in results:
+                url = result['url']
+                if url in data['pages']:
+                    continue
+                try:
+                    response = requests.get(url, headers=headers, timeout=10)
+                    response.raise_for_status()
+                    data['pages'][url] = response.text
+                except requests.exceptions.RequestException as e:
+                    # Left out of the corpus, so replays fail to fetch it too
+                    print(f"--- Could not record {url}: {e} ---")
+    Corpus(data).save(output_path)
+    print(f"--- Recorded {len(data['searches'])} searches and {len(data['pages'])} pages to {output_path} ---")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the research agent.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run the benchmark.")
+    run.add_argument('--corpus', default=DEFAULT_CORPUS)
+    run.add_argument('--concurrency', default='1,4,8', help="Comma-separated concurrency levels.")
+    run.add_argument('--turns', type=int, default=30, help="Minimum number of turns per level.")
+    run.add_argument('--llm-latency', type=float, default=0.2, help="Median Gemini call latency (s).")
+    run.add_argument('--llm-sigma', type=float, default=0.5)
+    run.add_argument('--llm-errors', type=float, default=0.0, help="Share of Gemini calls that fail.")
+    run.add_argument('--llm-malformed', type=float, default=0.0,
+                     help="Share of content analyses returned as malformed JSON.")
+    run.add_argument('--search-latency', type=float, default=0.1, help="Median search latency (s).")
+    run.add_argument('--fetch-latency', type=float, default=0.1, help="Median page fetch latency (s).")
+    run.add_argument('--fetch-sigma', type=float, default=0.8)
+    run.add_argument('--fetch-errors', type=float, default=0.05, help="Share of fetches that fail.")
+    run.add_argument('--analysis', choices=('llm', 'extractive'), default='llm',
+                     help="Analyze sources with the (fake) LLM or the local extractive summarizer.")
+    run.add_argument('--cache', action='store_true', help="Let research() use the semantic query cache.")
+    run.add_argument('--seed', type=int, default=1)
+    run.add_argument('--output', help="Write the results as JSON to this file.")
+    run.add_argument('--verbose', action='store_true', help="Show the agent's log output.")
+
+    compare = commands.add_parser('compare', help="Compare two result files.")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.1,
+                         help="Relative change counted as a regression (default 0.1 = 10%%).")
+
+    record = commands.add_parser('record', help="Record a corpus from live searches and pages.")
+    record.add_argument('questions')
+    record.add_argument('--output', default=DEFAULT_CORPUS)
+    record.add_argument('--results', type=int, default=10, help="Search results per question.")
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record_corpus(args.questions, args.output, args.results)
+        return
+
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        if baseline['config'] != current['config']:
+            print("Warning: the runs used different settings; differences may not be regressions.")
+        rows, regressed = compare_results(baseline, current, args.threshold)
+        print(f"{'conc':>4}  {'metric':<24}{'baseline':>10}{'current':>10}{'change':>9}")
+        for row in rows:
+            flag = '  REGRESSION' if row['regression'] else ''
+            print(f"{row['concurrency']:>4}  {row['metric']:<24}{row['baseline']:>10.3f}{row['current']:>10.3f}"
+                  f"{row['change'] * 100:>8.1f}%{flag}")
+        sys.exit(1 if regressed else 0)
+
+    config = {
+        'corpus': os.path.relpath(args.corpus, ROOT) if args.corpus == DEFAULT_CORPUS else args.corpus,
+        'concurrency': [int(level) for level in args.concurrency.split(',')],
+        'turns': args.turns,
+        'llm_latency': args.llm_latency,
+        'llm_sigma': args.llm_sigma,
+        'llm_errors': args.llm_errors,
+        'llm_malformed': args.llm_malformed,
+        'search_latency': args.search_latency,
+        'fetch_latency': args.fetch_latency,
+        'fetch_sigma': args.fetch_sigma,
+        'fetch_errors': args.fetch_errors,
+        'analysis': args.analysis,
+        'cache': args.cache,
+        'seed': args.seed,
+    }
+    if args.verbose:
+        configure_logging(fmt='text')
+    document = run_benchmark(config, Corpus.load(args.corpus), quiet=not args.verbose)
+    print_results(document)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Startup profile: where the time goes between starting a worker and serving.
+
+Runs each measurement in a fresh interpreter, so nothing is already imported:
+
+  1. `python -X importtime -c "import app"`, summarized per top-level package
+  2. the phases of a cold start: importing app, serving `/`, building the agent
+
+Usage:
+    python benchmarks/startup_profile.py [--top 15] [--json]
+
+No network calls are made; a placeholder GEMINI_API_KEY is used if none is set.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PHASES_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+served = time.perf_counter()
+agent = app.get_agent()
+built = time.perf_counter()
+print(json.dumps({
+    'import_app_s': imported - started,
+    'first_index_s': served - imported,
+    'index_status': response.status_code,
+    'build_agent_s': built - served,
+    'agent_ok': agent is not None,
+}))
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault('GEMINI_API_KEY', 'startup-profile-placeholder')
+    env['WEBSIGHT_WARMUP'] = '0'
+    env['WEBSIGHT_STATE_BACKEND'] = 'memory'
+    env['WEBSIGHT_REPORT_PATH'] = os.path.join(tempfile.gettempdir(), 'websight_startup_reports.db')
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    env['PYTHONWARNINGS'] = 'ignore'
+    return env
+
+
+def import_times(top: int) -> dict:
+    """Runs `import app` under -X importtime and sums self time per top-level package."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, env=_env(), capture_output=True, text=True)
+    per_package = defaultdict(int)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        per_package[name.split('.')[0]] += int(self_us)
+        if name == 'app':
+            total_us = int(cumulative_us)
+    packages = sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'import_app_ms': total_us / 1000,
+        'packages': [{'package': name, 'self_ms': us / 1000} for name, us in packages]
+    }
+
+
+def startup_phases() -> dict:
+    """Times the phases of a cold start in a fresh interpreter."""
+    result = subprocess.run([sys.executable, '-c', PHASES_SCRIPT], cwd=ROOT, env=_env(),
+                            capture_output=True, text=True)
+    lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"Startup run failed:\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile WebSight's startup time.")
+    parser.add_argument('--top', type=int, default=15, help="Number of packages to list.")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    report = {'phases': startup_phases(), 'imports': import_times(args.top)}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    phases = report['phases']
+    print("Cold start phases")
+    print(f"  import app          {phases['import_app_s'] * 1000:8.1f} ms")
+    print(f"  first GET /         {phases['first_index_s'] * 1000:8.1f} ms  (status {phases['index_status']})")
+    print(f"  build agent (lazy)  {phases['build_agent_s'] * 1000:8.1f} ms  (ok: {phases['agent_ok']})")
+    print()
+    print(f"Import time of app: {report['imports']['import_app_ms']:.1f} ms, by package (self time):")
+    for package in report['imports']['packages']:
+        print(f"  {package['package']:<28}{package['self_ms']:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedStore:
+    """
+    Thread-safe mapping with a size cap and per-entry expiry.
+
+    Entries expire `ttl_seconds` after they were last written, and once
+    `max_entries` is reached the least recently used entry is evicted, so the
+    store cannot grow without bound however many sessions or users come by.
+    Expired entries are dropped lazily on access and in bulk by reap().
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = None):
+        """
+        Initializes the BoundedStore.
+
+        Args:
+            max_entries: Maximum number of entries kept.
+            ttl_seconds: Default lifetime of an entry after its last write (None for no expiry).
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.RLock()
+        self.evicted = 0
+        self.expired = 0
+
+    def _expires_at(self, ttl):
+        ttl = self.ttl_seconds if ttl is None else ttl
+        return time.time() + ttl if ttl is not None else None
+
+    def _live(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            del self._entries[key]
+            self.expired += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._live(key)
+            return entry[0] if entry else default
+
+    def set(self, key, value, ttl: float = None):
+        """Stores a value, refreshing its expiry; ttl overrides the store default."""
+        with self._lock:
+            self._entries[key] = (value, self._expires_at(ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def setdefault(self, key, value, ttl: float = None):
+        with self._lock:
+            entry = self._live(key)
+            if entry:
+                return entry[0]
+            self.set(key, value, ttl)
+            return value
+
+    def touch(self, key) -> bool:
+        """Refreshes an entry's expiry after its value was modified in place."""
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return False
+            self._entries[key] = (entry[0], self._expires_at(None))
+            return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry else default
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._live(key) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def reap(self) -> list:
+        """Drops every expired entry and returns their keys."""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._entries.items()
+                       if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+            self.expired += len(expired)
+            return expired
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'evicted': self.evicted,
+                'expired': self.expired
+            }
+
+
+class Reaper:
+    """
+    Single background thread that periodically runs cleanup tasks.
+
+    Replaces per-session cleanup threads: stores register their reap
+    functions once and one thread sweeps them all every `interval` seconds.
+    """
+
+    def __init__(self, interval: float = 60.0):
+        self.interval = interval
+        self._tasks = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.runs = 0
+        self.last_run = None
+
+    def register(self, name: str, task):
+        """Adds a cleanup callable; it is called with no arguments on every sweep."""
+        with self._lock:
+            self._tasks.append((name, task))
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="reaper", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        with self._lock:
+            tasks = list(self._tasks)
+        for name, task in tasks:
+            try:
+                task()
+            except Exception:
+                logger.exception("Reaper task failed", extra={'task': name})
+        self.runs += 1
+        self.last_run = time.time()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+
+def process_memory() -> dict:
+    """Returns the current and peak resident set size of this process in bytes, where available."""
+    gauges = {'rss_bytes': None, 'peak_rss_bytes': None}
+    try:
+        with open('/proc/self/statm') as f:
+            gauges['rss_bytes'] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        gauges['peak_rss_bytes'] = peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        pass
+    return gauges
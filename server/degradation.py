@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# What each level changes about a research run; passed to the agent as its options.
+# Levels only ever take work away, so a run at a higher level is always cheaper.
+LEVELS = [
+    {'name': 'full', 'options': {}},
+    {'name': 'reduced', 'options': {'max_search_results': 6, 'max_sources_to_process': 4}},
+    {'name': 'snippets', 'options': {'max_search_results': 6, 'skip_query_analysis': True, 'snippets_only': True}},
+    {'name': 'cached_only', 'options': {'cached_only': True}},
+]
+
+LEVEL_MESSAGES = {
+    'reduced': "WebSight is busy, so fewer sources are analyzed for this research.",
+    'snippets': "WebSight is very busy, so this research is answered from search snippets only.",
+    'cached_only': "WebSight is overloaded, so only recently researched questions can be answered.",
+}
+
+
+def _thresholds(name, default):
+    value = os.environ.get(name)
+    return [float(v) for v in value.split(',')] if value else default
+
+
+class DegradationController:
+    """
+    Picks how much work a research run may do from the current load.
+
+    Two signals are watched: the research queue (waiting jobs per worker) and
+    the recent latency and error rate of Gemini calls. Each has one threshold
+    per degraded level; the level is the highest any signal reaches. The
+    level goes up as soon as a threshold is crossed, but only comes down one
+    step at a time, once every signal is below `recover_ratio` of the current
+    level's thresholds and the level has been held for `min_hold_seconds`,
+    so it doesn't flap around a threshold.
+    """
+
+    def __init__(self, pool_metrics, llm_metrics, queue_thresholds=None, latency_thresholds=None,
+                 error_thresholds=None, recover_ratio: float = 0.6, min_hold_seconds: float = 30,
+                 enabled: bool = True):
+        """
+        Initializes the DegradationController.
+
+        Args:
+            pool_metrics: Callable returning the worker pool's metrics (queue_depth, max_workers).
+            llm_metrics: Callable returning recent LLM call stats (p50_s, error_rate, calls).
+            queue_thresholds: Waiting jobs per worker at which levels 1, 2 and 3 start.
+            latency_thresholds: Median Gemini call latency (seconds) at which levels 1, 2 and 3 start.
+            error_thresholds: Gemini error rate (e.g. quota errors) at which levels 1, 2 and 3 start.
+            recover_ratio: Share of a level's thresholds signals must fall below to step down.
+            min_hold_seconds: Minimum time a level is kept before stepping down.
+            enabled: When False the level always stays at full.
+        """
+        self.pool_metrics = pool_metrics
+        self.llm_metrics = llm_metrics
+        self.queue_thresholds = queue_thresholds or [1.0, 2.0, 3.0]
+        self.latency_thresholds = latency_thresholds or [6.0, 12.0, 20.0]
+        self.error_thresholds = error_thresholds or [0.2, 0.4, 0.7]
+        self.recover_ratio = recover_ratio
+        self.min_hold_seconds = min_hold_seconds
+        self.enabled = enabled
+        self.level = 0
+        self._changed_at = time.time()
+        self._signals = {}
+        self._lock = threading.Lock()
+        self.changes = 0
+
+    @classmethod
+    def from_env(cls, pool_metrics, llm_metrics):
+        """Builds a controller configured by the WEBSIGHT_DEGRADE_* environment variables."""
+        return cls(
+            pool_metrics, llm_metrics,
+            queue_thresholds=_thresholds('WEBSIGHT_DEGRADE_QUEUE', None),
+            latency_thresholds=_thresholds('WEBSIGHT_DEGRADE_LATENCY', None),
+            error_thresholds=_thresholds('WEBSIGHT_DEGRADE_ERRORS', None),
+            min_hold_seconds=float(os.environ.get('WEBSIGHT_DEGRADE_HOLD', 30)),
+            enabled=os.environ.get('WEBSIGHT_DEGRADATION', 'on').lower() not in ('off', '0', 'false')
+        )
+
+    def _read_signals(self) -> dict:
+        pool = self.pool_metrics()
+        llm = self.llm_metrics()
+        return {
+            'queue_per_worker': pool['queue_depth'] / max(1, pool['max_workers']),
+            # A couple of slow calls aren't a trend
+            'llm_p50_s': llm['p50_s'] if llm['calls'] >= 3 else 0.0,
+            'llm_error_rate': llm['error_rate'] if llm['calls'] >= 5 else 0.0
+        }
+
+    def _level_for(self, signals: dict, scale: float = 1.0) -> int:
+        level = 0
+        for value, thresholds in ((signals['queue_per_worker'], self.queue_thresholds),
+                                  (signals['llm_p50_s'], self.latency_thresholds),
+                                  (signals['llm_error_rate'], self.error_thresholds)):
+            level = max(level, sum(1 for threshold in thresholds if value >= threshold * scale))
+        return min(level, len(LEVELS) - 1)
+
+    def update(self) -> int:
+        """Re-reads the load signals and returns the (possibly changed) level."""
+        if not self.enabled:
+            return 0
+        signals = self._read_signals()
+        with self._lock:
+            self._signals = signals
+            target = self._level_for(signals)
+            previous = self.level
+            if target > self.level:
+                self.level = target
+            elif target < self.level and time.time() - self._changed_at >= self.min_hold_seconds and \
+                    self._level_for(signals, self.recover_ratio) < self.level:
+                self.level -= 1
+            if self.level != previous:
+                self._changed_at = time.time()
+                self.changes += 1
+                logger.warning("Degradation level changed",
+                               extra={'from_level': previous, 'to_level': self.level,
+                                      'mode': LEVELS[self.level]['name'], 'signals': signals})
+            return self.level
+
+    def current(self) -> dict:
+        """Updates the level and describes it: name, level, agent options and a user-facing message."""
+        level = self.update()
+        return {
+            'level': level,
+            'mode': LEVELS[level]['name'],
+            'options': dict(LEVELS[level]['options']),
+            'message': LEVEL_MESSAGES.get(LEVELS[level]['name'])
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'level': self.level,
+                'mode': LEVELS[self.level]['name'],
+                'held_s': round(time.time() - self._changed_at, 1),
+                'changes': self.changes,
+                'signals': dict(self._signals)
+            }
@@ -0,0 +1,279 @@
+import cProfile
+import hmac
+import io
+import marshal
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from server.bounded_store import BoundedStore
+
+# Longest stack sample an admin request may ask for; it holds a server thread meanwhile
+MAX_SAMPLE_SECONDS = 60
+# Frames inside the profilers themselves are left out of what they report
+_OWN_FILES = (__file__, tracemalloc.__file__)
+
+
+def admin_token() -> str:
+    """The token admin endpoints require (WEBSIGHT_ADMIN_TOKEN); empty if they are disabled."""
+    return os.environ.get('WEBSIGHT_ADMIN_TOKEN', '')
+
+
+def is_admin(headers) -> bool:
+    """Whether a request's headers carry the admin token, as `Authorization: Bearer` or `X-Admin-Token`."""
+    expected = admin_token()
+    if not expected:
+        return False
+    given = headers.get('X-Admin-Token') or ''
+    authorization = headers.get('Authorization') or ''
+    if authorization.startswith('Bearer '):
+        given = authorization[len('Bearer '):]
+    return hmac.compare_digest(given.encode('utf-8'), expected.encode('utf-8'))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Statistical profile of running threads from periodic stack samples.
+
+    Every `interval` seconds the current stack of each matching thread is
+    read with sys._current_frames() and counted, so the cost is one walk
+    over a few stacks per sample however busy the threads are, and nothing
+    has to be enabled in advance. Results come as collapsed stacks
+    ("outer;inner;leaf count" lines, the input of flamegraph.pl and
+    speedscope) or as the functions seen most, on top of the stack (self)
+    and anywhere on it (total).
+    """
+
+    def __init__(self, seconds: float = 5.0, interval: float = 0.01, thread_prefix: str = 'research-worker'):
+        """
+        Initializes the StackSampler.
+
+        Args:
+            seconds: How long to sample, at most MAX_SAMPLE_SECONDS.
+            interval: Seconds between samples.
+            thread_prefix: Only threads whose name starts with this are sampled ('' for all).
+        """
+        self.seconds = min(max(seconds, 0.0), MAX_SAMPLE_SECONDS)
+        self.interval = max(interval, 0.001)
+        self.thread_prefix = thread_prefix
+        self.samples = 0
+        self.stacks = Counter()
+
+    def run(self):
+        """Samples for the configured time in the calling thread (which is never sampled itself)."""
+        own_id = threading.get_ident()
+        deadline = time.perf_counter() + self.seconds
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                name = names.get(thread_id, '')
+                if thread_id == own_id or not name.startswith(self.thread_prefix):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[(name,) + tuple(reversed(stack))] += 1
+            self.samples += 1
+            if time.perf_counter() >= deadline:
+                break
+            time.sleep(self.interval)
+        return self
+
+    def collapsed(self, by_thread: bool = False) -> str:
+        """The samples as collapsed stacks, one "frame;frame;... count" line per distinct stack."""
+        merged = Counter()
+        for stack, count in self.stacks.items():
+            merged[stack if by_thread else stack[1:]] += count
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in merged.most_common())
+
+    def top(self, limit: int = 30) -> dict:
+        """The functions seen in most samples: on top of the stack (self) and anywhere on it (total)."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack[1:]
+            if frames:
+                own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        observed = sum(self.stacks.values())
+        return {
+            'samples': self.samples,
+            'stacks_observed': observed,
+            'threads': sorted({stack[0] for stack in self.stacks}),
+            'self': [{'function': label, 'samples': count, 'share': round(count / observed, 3)}
+                     for label, count in own.most_common(limit)],
+            'total': [{'function': label, 'samples': count, 'share': round(count / observed, 3)}
+                      for label, count in total.most_common(limit)],
+        }
+
+
+class MemoryTracer:
+    """
+    On-demand tracemalloc tracing with snapshots diffed over time.
+
+    Tracing slows every allocation down, so it only runs between start() and
+    stop(). Each snapshot is compared with the previous one: lines whose
+    allocations keep growing from one snapshot to the next point at a leak,
+    e.g. a module-level dict that is written to but never pruned.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous = None
+        self._first = None
+        self._last = None
+        self.snapshots = 0
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10) -> dict:
+        """Starts tracing with `frames` frames kept per allocation; the first snapshot is the baseline."""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, frames))
+                self._previous = self._first = self._last = None
+                self.snapshots = 0
+            return self.status()
+
+    def stop(self) -> dict:
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = self._first = self._last = None
+            return self.status()
+
+    def status(self) -> dict:
+        if not tracemalloc.is_tracing():
+            return {'tracing': False}
+        current, peak = tracemalloc.get_traced_memory()
+        return {'tracing': True, 'frames': tracemalloc.get_traceback_limit(), 'snapshots': self.snapshots,
+                'traced_mb': round(current / (1024 * 1024), 2), 'peak_mb': round(peak / (1024 * 1024), 2)}
+
+    def snapshot(self, limit: int = 25, key_type: str = 'lineno', since: str = 'previous') -> dict:
+        """
+        Takes a snapshot and diffs it against an earlier one.
+
+        Args:
+            limit: Number of allocation sites reported.
+            key_type: 'lineno', 'filename' or 'traceback' (grouped by whole allocation traceback).
+            since: 'previous' snapshot or the 'first' one taken since tracing started.
+
+        Returns:
+            The status, and the allocation sites that grew most (all sites by size for the first snapshot).
+
+        Raises:
+            RuntimeError: If tracing has not been started.
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("Memory tracing is not running; start it first.")
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, filename) for filename in _OWN_FILES])
+            reference = self._first if since == 'first' else self._previous
+            self._first = self._first or snapshot
+            self._previous = snapshot
+            self.snapshots += 1
+            self._last = snapshot
+        if reference is None:
+            sites = [{'site': self._site(stat.traceback, key_type), 'size_kb': round(stat.size / 1024, 1),
+                      'count': stat.count} for stat in snapshot.statistics(key_type)[:limit]]
+        else:
+            sites = [{'site': self._site(stat.traceback, key_type), 'size_kb': round(stat.size / 1024, 1),
+                      'size_diff_kb': round(stat.size_diff / 1024, 1), 'count': stat.count,
+                      'count_diff': stat.count_diff}
+                     for stat in snapshot.compare_to(reference, key_type)[:limit]]
+        return {**self.status(), 'compared_to': since if reference is not None else None, 'sites': sites}
+
+    def dump(self) -> bytes:
+        """The latest snapshot in tracemalloc's file format (load with tracemalloc.Snapshot.load)."""
+        with self._lock:
+            snapshot = self._last
+        if snapshot is None:
+            raise RuntimeError("No snapshot taken yet.")
+        with tempfile.NamedTemporaryFile(suffix='.snapshot') as f:
+            snapshot.dump(f.name)
+            return f.read()
+
+    @staticmethod
+    def _site(traceback, key_type) -> str:
+        if key_type == 'traceback':
+            return ' <- '.join(f"{frame.filename}:{frame.lineno}" for frame in reversed(traceback))
+        frame = traceback[0]
+        return frame.filename if key_type == 'filename' else f"{frame.filename}:{frame.lineno}"
+
+
+class RequestProfiles:
+    """
+    cProfile runs of single research sessions, kept for download.
+
+    cProfile only sees the thread it was enabled on (the research worker);
+    work the agent hands to its own thread pools shows up as time spent
+    waiting for their results. One session is profiled at a time, since
+    newer Pythons allow only one active profiler per process; a session
+    asked for while another is being profiled runs unprofiled.
+    """
+
+    def __init__(self, max_entries: int = 20, ttl_seconds: float = 3600):
+        self._profiles = BoundedStore(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._active = threading.Lock()
+        self.skipped = 0
+
+    def wrap(self, session_id: str, fn):
+        """Returns fn wrapped so that its run is profiled and stored under session_id."""
+        def profiled(*args, **kwargs):
+            if not self._active.acquire(blocking=False):
+                self.skipped += 1
+                return fn(*args, **kwargs)
+            profiler = cProfile.Profile()
+            started = time.time()
+            try:
+                return profiler.runcall(fn, *args, **kwargs)
+            finally:
+                self._active.release()
+                profiler.create_stats()
+                self._profiles.set(session_id, {'stats': profiler.stats, 'started_at': started,
+                                                'elapsed_s': round(time.time() - started, 3)})
+        return profiled
+
+    def get(self, session_id: str) -> dict:
+        return self._profiles.get(session_id)
+
+    def dump(self, session_id: str) -> bytes:
+        """The profile in pstats' file format (python -m pstats, snakeviz), or None if there is none."""
+        profile = self._profiles.get(session_id)
+        return marshal.dumps(profile['stats']) if profile else None
+
+    def report(self, session_id: str, sort: str = 'cumulative', limit: int = 40) -> str:
+        """The profile as pstats' text table of the `limit` top functions, or None if there is none."""
+        profile = self._profiles.get(session_id)
+        if profile is None:
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(_StatsSource(profile['stats']), stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return f"Research session {session_id}, {profile['elapsed_s']}s\n" + output.getvalue()
+
+    def stats(self) -> dict:
+        return {'stored': len(self._profiles), 'skipped_busy': self.skipped}
+
+
+class _StatsSource:
+    """What pstats.Stats needs to load stats collected by cProfile without a file."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
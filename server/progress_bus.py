@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import deque
+
+
+class _Channel:
+    def __init__(self, max_events):
+        self.events = deque(maxlen=max_events)
+        self.last_seq = 0
+        self.closed = False
+        self.cond = threading.Condition()
+        self.updated_at = time.time()
+
+
+class ProgressBus:
+    """
+    In-process publish/subscribe bus for research progress events.
+
+    Research callbacks publish small delta events per session; stream
+    handlers block in wait() and are woken as soon as an event arrives, so
+    updates reach clients immediately instead of on the next poll. Each
+    session keeps a short, sequence-numbered event log so a subscriber can
+    pick up exactly where it left off.
+    """
+
+    def __init__(self, max_events_per_session: int = 500):
+        """
+        Initializes the ProgressBus.
+
+        Args:
+            max_events_per_session: Number of recent events kept per session.
+        """
+        self.max_events_per_session = max_events_per_session
+        self._channels = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def _channel(self, session_id, create=True):
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is None and create:
+                channel = self._channels[session_id] = _Channel(self.max_events_per_session)
+            return channel
+
+    def publish(self, session_id: str, event: dict) -> int:
+        """
+        Publishes an event to a session's subscribers.
+
+        The event is stamped with a per-session 'seq' number and a 'ts' timestamp.
+
+        Returns:
+            The sequence number assigned to the event.
+        """
+        channel = self._channel(session_id)
+        with channel.cond:
+            channel.last_seq += 1
+            channel.updated_at = time.time()
+            channel.events.append({**event, 'seq': channel.last_seq, 'ts': channel.updated_at})
+            channel.cond.notify_all()
+            self.published += 1
+            return channel.last_seq
+
+    def last_seq(self, session_id: str) -> int:
+        """Returns the sequence number of the latest event published for a session."""
+        channel = self._channel(session_id, create=False)
+        return channel.last_seq if channel else 0
+
+    def wait(self, session_id: str, after_seq: int, timeout: float = 15.0) -> list[dict]:
+        """
+        Blocks until events newer than after_seq exist, the session is closed or the timeout passes.
+
+        Returns:
+            The new events in order (empty on timeout or close).
+        """
+        channel = self._channel(session_id)
+        with channel.cond:
+            channel.cond.wait_for(lambda: channel.last_seq > after_seq or channel.closed, timeout)
+            return [e for e in channel.events if e['seq'] > after_seq]
+
+    def close(self, session_id: str):
+        """Drops a session's event log and wakes anyone still waiting on it."""
+        with self._lock:
+            channel = self._channels.pop(session_id, None)
+        if channel:
+            with channel.cond:
+                channel.closed = True
+                channel.cond.notify_all()
+
+    def reap(self, idle_seconds: float) -> int:
+        """Closes sessions with no events for idle_seconds. Returns how many were closed."""
+        cutoff = time.time() - idle_seconds
+        with self._lock:
+            idle = [sid for sid, channel in self._channels.items() if channel.updated_at <= cutoff]
+        for session_id in idle:
+            self.close(session_id)
+        return len(idle)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'sessions': len(self._channels), 'published': self.published}
@@ -0,0 +1,91 @@
+import math
+import threading
+import time
+
+from server.bounded_store import BoundedStore
+
+
+class RateLimitedError(Exception):
+    """Raised when a user has used up their request allowance."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Too many research requests; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class UserRateLimiter:
+    """
+    Per-user token buckets for research requests.
+
+    Each user may burst up to `burst` requests, after which requests are
+    admitted at `per_minute` per minute. Buckets live in a BoundedStore so
+    idle users are forgotten and the number tracked stays capped. Limits are
+    per process: with several workers each one enforces them separately.
+    """
+
+    def __init__(self, per_minute: float = 6, burst: int = 3, max_users: int = 10000):
+        """
+        Initializes the UserRateLimiter.
+
+        Args:
+            per_minute: Sustained number of requests a user may make per minute.
+            burst: Number of requests a user may make back to back.
+            max_users: Maximum number of users whose buckets are kept.
+        """
+        self.per_minute = per_minute
+        self.burst = burst
+        # A bucket is full again burst / rate after its last use; forget it after that
+        self._buckets = BoundedStore(max_entries=max_users, ttl_seconds=max(60.0, 60.0 * burst / per_minute))
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.throttled = 0
+
+    def _bucket(self, user_id) -> dict:
+        now = time.time()
+        bucket = self._buckets.setdefault(user_id, {'tokens': float(self.burst), 'updated': now,
+                                                    'allowed': 0, 'throttled': 0})
+        bucket['tokens'] = min(self.burst, bucket['tokens'] + (now - bucket['updated']) * self.per_minute / 60.0)
+        bucket['updated'] = now
+        return bucket
+
+    def acquire(self, user_id):
+        """
+        Takes one request from a user's bucket.
+
+        Raises:
+            RateLimitedError: If the bucket is empty; retry_after says when a token is back.
+        """
+        with self._lock:
+            bucket = self._bucket(user_id)
+            if bucket['tokens'] < 1:
+                bucket['throttled'] += 1
+                self.throttled += 1
+                self._buckets.touch(user_id)
+                raise RateLimitedError(max(1, math.ceil((1 - bucket['tokens']) * 60.0 / self.per_minute)))
+            bucket['tokens'] -= 1
+            bucket['allowed'] += 1
+            self.allowed += 1
+            self._buckets.touch(user_id)
+
+    def usage(self, user_id) -> dict:
+        """Returns a user's remaining allowance and request counts."""
+        with self._lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is not None:
+                bucket = self._bucket(user_id)
+            return {
+                'remaining': int(bucket['tokens']) if bucket else self.burst,
+                'burst': self.burst,
+                'per_minute': self.per_minute,
+                'allowed': bucket['allowed'] if bucket else 0,
+                'throttled': bucket['throttled'] if bucket else 0
+            }
+
+    def stats(self) -> dict:
+        return {
+            'per_minute': self.per_minute,
+            'burst': self.burst,
+            'users': len(self._buckets),
+            'allowed': self.allowed,
+            'throttled': self.throttled
+        }
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+
+REPORT_MAX_AGE = 30 * 24 * 3600  # seconds a finished report stays reachable
+REPORT_MAX_BYTES = 256 * 1024 * 1024  # total compressed size kept
+
+
+class ReportStore:
+    """
+    Persistent, compressed store of finished research reports.
+
+    Each report (query, sources with their analyses, report HTML and
+    timestamps) is written once as zlib-compressed JSON under a random,
+    unguessable ID, so it can be re-opened or shared by link without running
+    the research again. Reports never change after they are saved, which
+    makes their ETag a content hash and a view a single primary-key read.
+    Reports older than `max_age` go first on reap(), then the oldest ones
+    until the total stored size is under `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_age: float = REPORT_MAX_AGE, max_bytes: int = REPORT_MAX_BYTES):
+        """
+        Initializes the ReportStore.
+
+        Args:
+            path: SQLite database file; several worker processes can share it.
+            max_age: Seconds a report is kept after it was saved.
+            max_bytes: Maximum total size of the stored (compressed) reports.
+        """
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS reports (
+                id TEXT PRIMARY KEY, etag TEXT NOT NULL, created_at REAL NOT NULL,
+                size INTEGER NOT NULL, body BLOB NOT NULL);
+            CREATE INDEX IF NOT EXISTS reports_created ON reports (created_at);
+        """)
+        self.saved = 0
+        self.evicted = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, query: str, report_html: str, sources: list[dict] = None,
+             started_at: float = None, metadata: dict = None) -> str:
+        """
+        Stores a finished report.
+
+        Args:
+            query: The question the report answers.
+            report_html: The report as shown to the user.
+            sources: The sources it was built from, with their analyses.
+            started_at: When the research started (defaults to now).
+            metadata: Optional extra fields kept with the report (e.g. the degradation mode).
+
+        Returns:
+            The report's ID.
+        """
+        now = time.time()
+        document = {
+            'query': query,
+            'report': report_html,
+            'sources': sources or [],
+            'started_at': started_at or now,
+            'completed_at': now,
+            **(metadata or {})
+        }
+        body = zlib.compress(json.dumps(document).encode('utf-8'), 6)
+        report_id = secrets.token_urlsafe(12)
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        self._connect().execute("INSERT INTO reports VALUES (?, ?, ?, ?, ?)",
+                                (report_id, etag, now, len(body), body))
+        self.saved += 1
+        return report_id
+
+    def etag(self, report_id: str) -> str:
+        """Returns a report's ETag without reading its body, or None if it doesn't exist."""
+        row = self._connect().execute("SELECT etag FROM reports WHERE id = ? AND created_at >= ?",
+                                      (report_id, time.time() - self.max_age)).fetchone()
+        return row[0] if row else None
+
+    def get(self, report_id: str) -> tuple:
+        """
+        Reads a report.
+
+        Returns:
+            An (etag, report dict) tuple, or (None, None) if the report doesn't exist (or was evicted).
+        """
+        row = self._connect().execute("SELECT etag, created_at, body FROM reports WHERE id = ?",
+                                      (report_id,)).fetchone()
+        if row is None or row[1] < time.time() - self.max_age:
+            return None, None
+        return row[0], {'id': report_id, **json.loads(zlib.decompress(row[2]).decode('utf-8'))}
+
+    def reap(self) -> dict:
+        """Deletes reports past max_age, then the oldest until the store fits max_bytes."""
+        conn = self._connect()
+        expired = conn.execute("DELETE FROM reports WHERE created_at < ?", (time.time() - self.max_age,)).rowcount
+        over_size = 0
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+        if total > self.max_bytes:
+            doomed = []
+            for report_id, size in conn.execute("SELECT id, size FROM reports ORDER BY created_at").fetchall():
+                if total <= self.max_bytes:
+                    break
+                doomed.append((report_id,))
+                total -= size
+            conn.executemany("DELETE FROM reports WHERE id = ?", doomed)
+            over_size = len(doomed)
+        self.evicted += expired + over_size
+        return {'expired': expired, 'over_size': over_size}
+
+    def stats(self) -> dict:
+        count, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports").fetchone()
+        return {
+            'path': self.path,
+            'reports': count,
+            'stored_bytes': size,
+            'max_bytes': self.max_bytes,
+            'max_age_s': self.max_age,
+            'saved': self.saved,
+            'evicted': self.evicted
+        }
+
+
+def create_report_store() -> ReportStore:
+    """Builds the report store configured by the WEBSIGHT_REPORT_* environment variables."""
+    return ReportStore(
+        os.environ.get('WEBSIGHT_REPORT_PATH', 'websight_reports.db'),
+        max_age=float(os.environ.get('WEBSIGHT_REPORT_MAX_DAYS', 30)) * 24 * 3600,
+        max_bytes=int(float(os.environ.get('WEBSIGHT_REPORT_MAX_MB', 256)) * 1024 * 1024)
+    )
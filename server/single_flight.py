@@ -0,0 +1,86 @@
+import hashlib
+import threading
+
+from tools.text_utils import tokenize
+
+
+def flight_key(query: str, context: str = "") -> str:
+    """
+    Fingerprints a research request by its query and conversation context.
+
+    Requests with the same key would run the same pipeline, so they can share one run.
+    The query is only lowercased and stripped of punctuation and stop words, with its
+    word order kept: unlike the semantic cache's normalization, nothing is folded, as
+    "pros of X" and "cons of X" sharing a run would give one user the other's answer.
+    """
+    digest = hashlib.sha1(' '.join(tokenize(query)).encode('utf-8'))
+    digest.update(b'\0' + (context or '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces identical research requests onto one in-flight session.
+
+    The first request for a key becomes the leader and runs the research;
+    requests with the same key arriving before it finishes join as followers
+    and are handed the leader's session ID, so they watch the same progress
+    stream and no second set of search, scrape and LLM calls is started.
+    """
+
+    def __init__(self):
+        self._flights = {}  # key -> {'session_id': str, 'users': list}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def join(self, key: str, user_id: str, session_id: str) -> tuple:
+        """
+        Joins the in-flight session for a key, or starts one with session_id.
+
+        Returns:
+            A (session_id, is_leader) tuple. Only the leader should start the research.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                if user_id not in flight['users']:
+                    flight['users'].append(user_id)
+                self.followers += 1
+                return flight['session_id'], False
+            self._flights[key] = {'session_id': session_id, 'users': [user_id]}
+            self.leaders += 1
+            return session_id, True
+
+    def finish(self, key: str) -> list:
+        """
+        Ends the flight for a key; later requests start a new run.
+
+        Returns:
+            The IDs of every user attached to the flight, leader first.
+        """
+        with self._lock:
+            flight = self._flights.pop(key, None)
+            return flight['users'] if flight else []
+
+    def users_of(self, session_id: str) -> list:
+        """Returns the users attached to an in-flight session, or None if it isn't in flight here."""
+        with self._lock:
+            for flight in self._flights.values():
+                if flight['session_id'] == session_id:
+                    return list(flight['users'])
+        return None
+
+    def finish_session(self, session_id: str) -> list:
+        """Like finish(), but looks the flight up by its session ID."""
+        with self._lock:
+            key = next((k for k, f in self._flights.items() if f['session_id'] == session_id), None)
+        return self.finish(key) if key is not None else []
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'leaders': self.leaders,
+                'coalesced': self.followers
+            }
@@ -0,0 +1,898 @@
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from server.bounded_store import BoundedStore
+from server.progress_bus import ProgressBus
+
+logger = logging.getLogger(__name__)
+
+# Defaults shared by the backends: progress lives for a while after its last
+# update, history and conversation memory for a week after the user's last turn
+PROGRESS_TTL = 15 * 60
+HISTORY_TTL = 7 * 24 * 3600
+MAX_SESSIONS = 1000
+MAX_USERS = 10000
+
+
+class StateStore:
+    """
+    Interface for the state shared by the web workers.
+
+    Holds research progress, per-user conversation history, small JSON
+    values and the progress event stream. With a backend shared between
+    processes, any gunicorn worker can serve any request: the worker running
+    a research publishes events and whichever worker holds the client's
+    stream receives them.
+
+    Every backend is bounded: progress and events expire PROGRESS_TTL
+    seconds after the last update, history after HISTORY_TTL, and the
+    number of sessions and users kept is capped.
+    """
+
+    # How often event waiters that can't block (asyncio streams) should re-check for
+    # events published by other processes; local publishes wake them immediately
+    event_poll_interval = 15.0
+
+    def __init__(self):
+        self._listeners = {}
+        self._listeners_lock = threading.Lock()
+
+    # --- Research progress ---
+
+    def create_progress(self, session_id: str, progress: dict):
+        raise NotImplementedError
+
+    def get_progress(self, session_id: str) -> dict:
+        """Returns a session's progress, or None if unknown."""
+        raise NotImplementedError
+
+    def update_progress(self, session_id: str, changes: dict) -> bool:
+        """Merges top-level fields into a session's progress. Returns False if the session is unknown."""
+        raise NotImplementedError
+
+    def upsert_source(self, session_id: str, url: str, fields: dict) -> dict:
+        """Adds or updates the source with the given URL. Returns the source, or None if the session is unknown."""
+        raise NotImplementedError
+
+    def delete_progress(self, session_id: str):
+        raise NotImplementedError
+
+    # --- Conversation history ---
+
+    def get_history(self, user_id: str) -> list[dict]:
+        raise NotImplementedError
+
+    def append_history(self, user_id: str, entry: dict, max_entries: int = 10):
+        raise NotImplementedError
+
+    def clear_history(self, user_id: str):
+        raise NotImplementedError
+
+    # --- Small JSON values ---
+
+    def get_json(self, key: str):
+        raise NotImplementedError
+
+    def set_json(self, key: str, value, ttl_seconds: float = None):
+        """Stores a value; with ttl_seconds it expires that long after the write."""
+        raise NotImplementedError
+
+    def setdefault_json(self, key: str, value):
+        """Stores value only if the key is absent; returns whichever value is stored."""
+        raise NotImplementedError
+
+    def update_json(self, key: str, modify, ttl_seconds: float = None):
+        """
+        Atomically replaces a value with modify(current value, or None if absent).
+
+        modify may run more than once if another writer gets in between, so it
+        should not have side effects. Returns the stored value.
+        """
+        raise NotImplementedError
+
+    def delete_json(self, key: str):
+        raise NotImplementedError
+
+    # --- Progress events ---
+
+    def publish_event(self, session_id: str, event: dict) -> int:
+        """Appends an event to a session's stream and wakes its subscribers. Returns its sequence number."""
+        raise NotImplementedError
+
+    def last_event_seq(self, session_id: str) -> int:
+        raise NotImplementedError
+
+    def wait_events(self, session_id: str, after_seq: int, timeout: float = 15.0) -> list[dict]:
+        """Blocks until events newer than after_seq exist or the timeout passes."""
+        raise NotImplementedError
+
+    def close_events(self, session_id: str):
+        raise NotImplementedError
+
+    def subscribe(self, session_id: str, callback):
+        """
+        Registers a callback run (on the publishing thread) whenever this process
+        publishes or closes events for a session.
+
+        Returns:
+            A function that removes the callback again.
+        """
+        with self._listeners_lock:
+            self._listeners.setdefault(session_id, set()).add(callback)
+
+        def unsubscribe():
+            with self._listeners_lock:
+                callbacks = self._listeners.get(session_id)
+                if callbacks is not None:
+                    callbacks.discard(callback)
+                    if not callbacks:
+                        del self._listeners[session_id]
+        return unsubscribe
+
+    def _notify_listeners(self, session_id: str):
+        with self._listeners_lock:
+            callbacks = list(self._listeners.get(session_id, ()))
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Event listener failed", extra={'session_id': session_id})
+
+    def reap(self) -> dict:
+        """Drops expired and over-cap entries. Returns the number removed per kind."""
+        return {}
+
+    def stats(self) -> dict:
+        return {'backend': type(self).__name__}
+
+    @staticmethod
+    def _merge_source(sources: list, url: str, fields: dict) -> dict:
+        source = next((s for s in sources if s.get('url') == url), None)
+        if source is None:
+            source = {'url': url}
+            sources.append(source)
+        source.update(fields)
+        return dict(source)
+
+
+class InMemoryStateStore(StateStore):
+    """Process-local store; fast, but only correct with a single worker process."""
+
+    def __init__(self, progress_ttl: float = PROGRESS_TTL, history_ttl: float = HISTORY_TTL,
+                 max_sessions: int = MAX_SESSIONS, max_users: int = MAX_USERS):
+        super().__init__()
+        self.progress_ttl = progress_ttl
+        self._progress = BoundedStore(max_sessions, progress_ttl)
+        self._history = BoundedStore(max_users, history_ttl)
+        self._values = BoundedStore(max_users)
+        self._bus = ProgressBus()
+        self._lock = threading.RLock()
+
+    def create_progress(self, session_id, progress):
+        with self._lock:
+            self._progress.set(session_id, json.loads(json.dumps(progress)))
+
+    def get_progress(self, session_id):
+        with self._lock:
+            progress = self._progress.get(session_id)
+            # Hand out a copy so callers never serialize a dict another thread is mutating
+            return json.loads(json.dumps(progress)) if progress is not None else None
+
+    def update_progress(self, session_id, changes):
+        with self._lock:
+            progress = self._progress.get(session_id)
+            if progress is None:
+                return False
+            progress.update(changes)
+            self._progress.touch(session_id)
+            return True
+
+    def upsert_source(self, session_id, url, fields):
+        with self._lock:
+            progress = self._progress.get(session_id)
+            if progress is None:
+                return None
+            self._progress.touch(session_id)
+            return self._merge_source(progress.setdefault('sources', []), url, fields)
+
+    def delete_progress(self, session_id):
+        with self._lock:
+            self._progress.pop(session_id, None)
+
+    def get_history(self, user_id):
+        with self._lock:
+            return list(self._history.get(user_id, []))
+
+    def append_history(self, user_id, entry, max_entries=10):
+        with self._lock:
+            history = self._history.get(user_id, []) + [entry]
+            self._history.set(user_id, history[-max_entries:])
+
+    def clear_history(self, user_id):
+        with self._lock:
+            self._history.pop(user_id, None)
+
+    def get_json(self, key):
+        with self._lock:
+            return self._values.get(key)
+
+    def set_json(self, key, value, ttl_seconds=None):
+        with self._lock:
+            self._values.set(key, value, ttl_seconds)
+
+    def setdefault_json(self, key, value):
+        with self._lock:
+            return self._values.setdefault(key, value)
+
+    def update_json(self, key, modify, ttl_seconds=None):
+        with self._lock:
+            value = modify(self._values.get(key))
+            self._values.set(key, value, ttl_seconds)
+            return value
+
+    def delete_json(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def publish_event(self, session_id, event):
+        seq = self._bus.publish(session_id, event)
+        self._notify_listeners(session_id)
+        return seq
+
+    def last_event_seq(self, session_id):
+        return self._bus.last_seq(session_id)
+
+    def wait_events(self, session_id, after_seq, timeout=15.0):
+        return self._bus.wait(session_id, after_seq, timeout)
+
+    def close_events(self, session_id):
+        self._bus.close(session_id)
+        self._notify_listeners(session_id)
+
+    def reap(self):
+        expired_sessions = self._progress.reap()
+        for session_id in expired_sessions:
+            self._bus.close(session_id)
+        return {
+            'progress': len(expired_sessions),
+            'history': len(self._history.reap()),
+            'values': len(self._values.reap()),
+            # Event logs of sessions that were never (or are no longer) tracked
+            'events': self._bus.reap(self.progress_ttl)
+        }
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'progress': self._progress.stats(),
+            'history': self._history.stats(),
+            'values': self._values.stats(),
+            'events': self._bus.stats()
+        }
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Store backed by a SQLite database in WAL mode.
+
+    Several worker processes on one host can share the file. Event waits are
+    woken immediately for publishers in the same process and fall back to
+    short polling for events written by other processes.
+    """
+
+    event_poll_interval = 0.5
+
+    def __init__(self, path: str, poll_interval: float = 0.05, max_events_per_session: int = 500,
+                 progress_ttl: float = PROGRESS_TTL, history_ttl: float = HISTORY_TTL,
+                 max_sessions: int = MAX_SESSIONS, max_users: int = MAX_USERS):
+        """
+        Initializes the SQLiteStateStore.
+
+        Args:
+            path: Database file path.
+            poll_interval: Upper bound on the delay for events published by other processes.
+            max_events_per_session: Number of recent events kept per session.
+            progress_ttl: Seconds a session's progress and events are kept after its last update.
+            history_ttl: Seconds a user's history is kept after their last turn.
+            max_sessions: Maximum number of sessions kept; the least recently updated go first.
+            max_users: Maximum number of users whose history is kept.
+        """
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_events_per_session = max_events_per_session
+        self.progress_ttl = progress_ttl
+        self.history_ttl = history_ttl
+        self.max_sessions = max_sessions
+        self.max_users = max_users
+        self._local = threading.local()
+        self._published = threading.Condition()
+        # executescript() manages its own transaction
+        self._connect().conn.executescript("""
+            CREATE TABLE IF NOT EXISTS progress (
+                session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+                entry TEXT NOT NULL, created_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS history_user ON history (user_id, id);
+            CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL);
+            CREATE TABLE IF NOT EXISTS events (
+                session_id TEXT NOT NULL, seq INTEGER NOT NULL, data TEXT NOT NULL,
+                created_at REAL NOT NULL, PRIMARY KEY (session_id, seq));
+            CREATE INDEX IF NOT EXISTS progress_updated ON progress (updated_at);
+        """)
+        try:
+            # Databases created before values could expire
+            self._connect().conn.execute("ALTER TABLE kv ADD COLUMN expires_at REAL")
+        except sqlite3.OperationalError:
+            pass
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def create_progress(self, session_id, progress):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO progress VALUES (?, ?, ?)",
+                         (session_id, json.dumps(progress), time.time()))
+
+    def get_progress(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM progress WHERE session_id = ? AND updated_at > ?",
+                               (session_id, time.time() - self.progress_ttl)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _modify_progress(self, session_id, modify):
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM progress WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            progress = json.loads(row[0])
+            result = modify(progress)
+            conn.execute("UPDATE progress SET data = ?, updated_at = ? WHERE session_id = ?",
+                         (json.dumps(progress), time.time(), session_id))
+            return result
+
+    def update_progress(self, session_id, changes):
+        return self._modify_progress(session_id, lambda p: p.update(changes) or True) is not None
+
+    def upsert_source(self, session_id, url, fields):
+        return self._modify_progress(
+            session_id, lambda p: self._merge_source(p.setdefault('sources', []), url, fields))
+
+    def delete_progress(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM progress WHERE session_id = ?", (session_id,))
+
+    def get_history(self, user_id):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT entry FROM history WHERE user_id = ? ORDER BY id", (user_id,)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def append_history(self, user_id, entry, max_entries=10):
+        with self._connect() as conn:
+            conn.execute("INSERT INTO history (user_id, entry, created_at) VALUES (?, ?, ?)",
+                         (user_id, json.dumps(entry), time.time()))
+            conn.execute("""DELETE FROM history WHERE user_id = ? AND id NOT IN (
+                                SELECT id FROM history WHERE user_id = ? ORDER BY id DESC LIMIT ?)""",
+                         (user_id, user_id, max_entries))
+
+    def clear_history(self, user_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM history WHERE user_id = ?", (user_id,))
+
+    def get_json(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                               (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_json(self, key, value, ttl_seconds=None):
+        expires_at = time.time() + ttl_seconds if ttl_seconds is not None else None
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value), expires_at))
+
+    def setdefault_json(self, key, value):
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO kv (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+            return json.loads(conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()[0])
+
+    def update_json(self, key, modify, ttl_seconds=None):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                               (key, now)).fetchone()
+            value = modify(json.loads(row[0]) if row else None)
+            conn.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value), now + ttl_seconds if ttl_seconds is not None else None))
+            return value
+
+    def delete_json(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def publish_event(self, session_id, event):
+        with self._connect() as conn:
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM events WHERE session_id = ?",
+                               (session_id,)).fetchone()[0]
+            conn.execute("INSERT INTO events VALUES (?, ?, ?, ?)",
+                         (session_id, seq, json.dumps({**event, 'seq': seq, 'ts': time.time()}), time.time()))
+            conn.execute("DELETE FROM events WHERE session_id = ? AND seq <= ?",
+                         (session_id, seq - self.max_events_per_session))
+        with self._published:
+            self._published.notify_all()
+        self._notify_listeners(session_id)
+        return seq
+
+    def last_event_seq(self, session_id):
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events WHERE session_id = ?",
+                                (session_id,)).fetchone()[0]
+
+    def _events_after(self, session_id, after_seq):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT data FROM events WHERE session_id = ? AND seq > ? ORDER BY seq",
+                                (session_id, after_seq)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def wait_events(self, session_id, after_seq, timeout=15.0):
+        deadline = time.time() + timeout
+        while True:
+            events = self._events_after(session_id, after_seq)
+            remaining = deadline - time.time()
+            if events or remaining <= 0:
+                return events
+            with self._published:
+                self._published.wait(min(self.poll_interval, remaining))
+
+    def close_events(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM events WHERE session_id = ?", (session_id,))
+        with self._published:
+            self._published.notify_all()
+        self._notify_listeners(session_id)
+
+    def reap(self):
+        now = time.time()
+        with self._connect() as conn:
+            progress = conn.execute("""DELETE FROM progress WHERE updated_at <= ? OR session_id IN (
+                                           SELECT session_id FROM progress ORDER BY updated_at DESC LIMIT -1 OFFSET ?)""",
+                                    (now - self.progress_ttl, self.max_sessions)).rowcount
+            events = conn.execute("""DELETE FROM events WHERE session_id IN (
+                                         SELECT session_id FROM events GROUP BY session_id HAVING MAX(created_at) <= ?)""",
+                                  (now - self.progress_ttl,)).rowcount
+            history = conn.execute("""DELETE FROM history WHERE user_id IN (
+                                          SELECT user_id FROM history GROUP BY user_id HAVING MAX(created_at) <= ?)""",
+                                   (now - self.history_ttl,)).rowcount
+            history += conn.execute("""DELETE FROM history WHERE user_id IN (
+                                           SELECT user_id FROM history GROUP BY user_id
+                                           ORDER BY MAX(created_at) DESC LIMIT -1 OFFSET ?)""",
+                                    (self.max_users,)).rowcount
+            values = conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,)).rowcount
+        return {'progress': progress, 'events': events, 'history': history, 'values': values}
+
+    def stats(self):
+        with self._connect() as conn:
+            counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ('progress', 'history', 'kv', 'events')}
+        return {'backend': 'sqlite', 'path': self.path, **counts}
+
+
+class _Transaction:
+    """Runs a block in one IMMEDIATE transaction on an autocommit connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RespClient:
+    """
+    Minimal client for the Redis serialization protocol (RESP2).
+
+    Only what the state store needs: plain commands and pipelined
+    transactions over a small pool of connections, and dedicated
+    connections for SUBSCRIBE.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0,
+                 password: str = None, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._pool = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str):
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip('/') or 0)
+        return cls(parsed.hostname or 'localhost', parsed.port or 6379, db, parsed.password)
+
+    def _open(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile('rb'))
+        if self.password:
+            self._call(conn, 'AUTH', self.password)
+        if self.db:
+            self._call(conn, 'SELECT', self.db)
+        return conn
+
+    def execute(self, *args):
+        with self.connection() as conn:
+            return conn.execute(*args)
+
+    def transaction(self, *commands):
+        """Runs commands (argument tuples) atomically as MULTI ... EXEC, sent in one round trip."""
+        with self.connection() as conn:
+            return conn.transaction(*commands)
+
+    def connection(self):
+        """
+        Checks out one pooled connection, for commands that must share it (WATCH ... EXEC).
+        Use as a context manager; the connection is closed instead of pooled if the block fails.
+        """
+        return _PooledConnection(self)
+
+    def subscribe(self, channel: str, timeout: float):
+        """Opens a dedicated connection subscribed to a channel. Use as a context manager."""
+        return _Subscription(self, channel, timeout)
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b''.join(parts)
+
+    def _call(self, conn, *args):
+        conn[0].sendall(self._encode(args))
+        return self._read(conn[1])
+
+    def _pipeline(self, conn, commands):
+        conn[0].sendall(b''.join(self._encode(args) for args in commands))
+        return [self._read(conn[1]) for _ in commands]
+
+    @classmethod
+    def _read(cls, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise RespError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2].decode('utf-8')
+        if kind == b'*':
+            length = int(payload)
+            return None if length < 0 else [cls._read(reader) for _ in range(length)]
+        raise RespError(f"Unexpected reply: {line!r}")
+
+
+class _PooledConnection:
+    def __init__(self, client):
+        self.client = client
+        self.conn = None
+
+    def __enter__(self):
+        with self.client._lock:
+            self.conn = self.client._pool.pop() if self.client._pool else None
+        if self.conn is None:
+            self.conn = self.client._open()
+        return self
+
+    def execute(self, *args):
+        return self.client._call(self.conn, *args)
+
+    def pipeline(self, *commands):
+        """Sends several commands (argument tuples) at once and returns their replies."""
+        return self.client._pipeline(self.conn, commands)
+
+    def transaction(self, *commands):
+        """
+        Sends MULTI, the commands and EXEC at once; returns EXEC's reply
+        (the commands' replies, or None when a WATCHed key changed).
+        """
+        return self.pipeline(('MULTI',), *commands, ('EXEC',))[-1]
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # It may be mid-reply or still watching keys
+            self.conn[0].close()
+        else:
+            with self.client._lock:
+                self.client._pool.append(self.conn)
+        return False
+
+
+class _Subscription:
+    def __init__(self, client, channel, timeout):
+        self.client = client
+        self.channel = channel
+        self.timeout = timeout
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = self.client._open()
+        self.client._call(self.conn, 'SUBSCRIBE', self.channel)
+        self.conn[0].settimeout(self.timeout)
+        return self
+
+    def get_message(self):
+        """Waits up to the timeout for a published message; returns None on timeout."""
+        try:
+            reply = RespClient._read(self.conn[1])
+        except (socket.timeout, TimeoutError):
+            return None
+        return reply[2] if isinstance(reply, list) and reply and reply[0] == 'message' else None
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn[0].close()
+        return False
+
+
+class RedisStateStore(StateStore):
+    """
+    Store backed by any server speaking the Redis protocol.
+
+    Progress is a JSON string per session, history and events are lists.
+    Progress is written from several threads and processes (the research
+    worker, queue position updates, the request handlers), so each
+    read-modify-write runs under WATCH and is retried if another writer got
+    in between. Writes that touch several keys (an event and its counter, a
+    history entry and its cap) go out as one MULTI ... EXEC in a single
+    round trip. Publishing an event announces its session on one channel; a
+    single listener thread per process holds that subscription and wakes
+    the local waiters. Every key carries an expiry, so the server drops
+    stale state itself; a size cap is left to its maxmemory policy
+    (volatile-lru).
+    """
+
+    event_poll_interval = 0.5
+    # Read-modify-write attempts before a progress update gives up under contention
+    max_update_attempts = 20
+
+    def __init__(self, client: RespClient, prefix: str = 'websight', max_events_per_session: int = 500,
+                 progress_ttl: float = PROGRESS_TTL, history_ttl: float = HISTORY_TTL):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.max_events_per_session = max_events_per_session
+        self.progress_ttl = int(progress_ttl)
+        self.history_ttl = int(history_ttl)
+        # Bumped on every event notification, so a waiter can tell it missed one while reading
+        self._published = threading.Condition()
+        self._generation = 0
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def _key(self, *parts) -> str:
+        return ':'.join((self.prefix,) + parts)
+
+    def create_progress(self, session_id, progress):
+        self.client.execute('SET', self._key('progress', session_id), json.dumps(progress), 'EX', self.progress_ttl)
+
+    def get_progress(self, session_id):
+        data = self.client.execute('GET', self._key('progress', session_id))
+        return json.loads(data) if data is not None else None
+
+    def _transact(self, key, update, ttl_seconds=None):
+        """
+        Read-modify-write of one key under WATCH, retried while other writers get in between.
+
+        update(stored string or None) returns (string to store or None to leave the key, result).
+        """
+        def commands(data):
+            data, result = update(data)
+            if data is None:
+                return None, result
+            expiry = ('EX', max(1, int(ttl_seconds))) if ttl_seconds is not None else ()
+            return [('SET', key, data, *expiry)], result
+        return self._watched(key, commands)
+
+    def _watched(self, key, build):
+        """
+        Runs commands built from one key's value as a transaction under WATCH,
+        retried while other writers get in between.
+
+        build(stored string or None) returns (commands to run, or None to run none, result).
+        """
+        for attempt in range(self.max_update_attempts):
+            if attempt:
+                # Back off a little, at random, so writers that keep colliding spread out
+                time.sleep(random.uniform(0, 0.002 * attempt))
+            with self.client.connection() as conn:
+                _, data = conn.pipeline(('WATCH', key), ('GET', key))
+                commands, result = build(data)
+                if commands is None:
+                    conn.execute('UNWATCH')
+                    return result
+                # EXEC answers nil when the key changed after WATCH
+                if conn.transaction(*commands) is not None:
+                    return result
+        raise RespError(f"{key} kept changing during the update")
+
+    def _modify_progress(self, session_id, modify):
+        def update(data):
+            if data is None:
+                return None, None
+            progress = json.loads(data)
+            result = modify(progress)
+            return json.dumps(progress), result
+        return self._transact(self._key('progress', session_id), update, self.progress_ttl)
+
+    def update_progress(self, session_id, changes):
+        return self._modify_progress(session_id, lambda p: p.update(changes) or True) is not None
+
+    def upsert_source(self, session_id, url, fields):
+        return self._modify_progress(
+            session_id, lambda p: self._merge_source(p.setdefault('sources', []), url, fields))
+
+    def delete_progress(self, session_id):
+        self.client.execute('DEL', self._key('progress', session_id))
+
+    def get_history(self, user_id):
+        return [json.loads(e) for e in self.client.execute('LRANGE', self._key('history', user_id), 0, -1)]
+
+    def append_history(self, user_id, entry, max_entries=10):
+        key = self._key('history', user_id)
+        self.client.transaction(('RPUSH', key, json.dumps(entry)),
+                                ('LTRIM', key, -max_entries, -1),
+                                ('EXPIRE', key, self.history_ttl))
+
+    def clear_history(self, user_id):
+        self.client.execute('DEL', self._key('history', user_id))
+
+    def get_json(self, key):
+        data = self.client.execute('GET', self._key('kv', key))
+        return json.loads(data) if data is not None else None
+
+    def set_json(self, key, value, ttl_seconds=None):
+        expiry = ('EX', max(1, int(ttl_seconds))) if ttl_seconds is not None else ()
+        self.client.execute('SET', self._key('kv', key), json.dumps(value), *expiry)
+
+    def setdefault_json(self, key, value):
+        self.client.execute('SET', self._key('kv', key), json.dumps(value), 'NX')
+        return self.get_json(key)
+
+    def update_json(self, key, modify, ttl_seconds=None):
+        def update(data):
+            value = modify(json.loads(data) if data is not None else None)
+            return json.dumps(value), value
+        return self._transact(self._key('kv', key), update, ttl_seconds)
+
+    def delete_json(self, key):
+        self.client.execute('DEL', self._key('kv', key))
+
+    def publish_event(self, session_id, event):
+        seq_key = self._key('events', session_id, 'seq')
+        key = self._key('events', session_id)
+
+        # The event carries its seq, so the counter is read under WATCH and
+        # written back with the event in one transaction
+        def commands(data):
+            seq = int(data or 0) + 1
+            return [('SET', seq_key, seq, 'EX', self.progress_ttl),
+                    ('RPUSH', key, json.dumps({**event, 'seq': seq, 'ts': time.time()})),
+                    ('LTRIM', key, -self.max_events_per_session, -1),
+                    ('EXPIRE', key, self.progress_ttl),
+                    ('PUBLISH', self._key('notify'), session_id)], seq
+        seq = self._watched(seq_key, commands)
+        self._wake(session_id)
+        return seq
+
+    def last_event_seq(self, session_id):
+        return int(self.client.execute('GET', self._key('events', session_id, 'seq')) or 0)
+
+    def _events_after(self, session_id, after_seq):
+        # The list holds the latest events in order, so the newer ones are its last (seq - after_seq)
+        missing = self.last_event_seq(session_id) - after_seq
+        if missing <= 0:
+            return []
+        events = self.client.execute('LRANGE', self._key('events', session_id), -missing, -1)
+        return [event for event in map(json.loads, events) if event['seq'] > after_seq]
+
+    def wait_events(self, session_id, after_seq, timeout=15.0):
+        self._start_listener()
+        deadline = time.time() + timeout
+        while True:
+            with self._published:
+                generation = self._generation
+            events = self._events_after(session_id, after_seq)
+            remaining = deadline - time.time()
+            if events or remaining <= 0:
+                return events
+            with self._published:
+                if self._generation == generation:
+                    self._published.wait(min(self.event_poll_interval, remaining))
+
+    def subscribe(self, session_id, callback):
+        self._start_listener()
+        return super().subscribe(session_id, callback)
+
+    def close_events(self, session_id):
+        self.client.execute('DEL', self._key('events', session_id), self._key('events', session_id, 'seq'))
+        self.client.execute('PUBLISH', self._key('notify'), session_id)
+        self._wake(session_id)
+
+    def _wake(self, session_id):
+        with self._published:
+            self._generation += 1
+            self._published.notify_all()
+        self._notify_listeners(session_id)
+
+    def _start_listener(self):
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='redis-events', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        """Holds this process's one subscription and wakes local waiters for events published anywhere."""
+        while True:
+            try:
+                with self.client.subscribe(self._key('notify'), timeout=30) as subscription:
+                    while True:
+                        session_id = subscription.get_message()
+                        if session_id:
+                            self._wake(session_id)
+            except (OSError, ConnectionError, RespError) as e:
+                # Waiters fall back to polling until the subscription is back
+                logger.warning("Event subscription lost", extra={'error': str(e)})
+                time.sleep(1)
+
+    def stats(self):
+        return {'backend': 'redis', 'host': self.client.host, 'port': self.client.port}
+
+
+def create_state_store(backend: str = None) -> StateStore:
+    """
+    Builds the state store selected by the WEBSIGHT_STATE_BACKEND environment variable.
+
+    'memory' (default) keeps state in the process; 'sqlite' uses the file in
+    WEBSIGHT_STATE_PATH; 'redis' connects to WEBSIGHT_REDIS_URL.
+    """
+    backend = (backend or os.environ.get('WEBSIGHT_STATE_BACKEND', 'memory')).lower()
+    if backend == 'memory':
+        return InMemoryStateStore()
+    if backend == 'sqlite':
+        return SQLiteStateStore(os.environ.get('WEBSIGHT_STATE_PATH', 'websight_state.db'))
+    if backend == 'redis':
+        return RedisStateStore(RespClient.from_url(os.environ.get('WEBSIGHT_REDIS_URL', 'redis://localhost:6379/0')))
+    raise ValueError(f"Unknown state backend: {backend}")
@@ -0,0 +1,269 @@
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from server.bounded_store import BoundedStore
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the pool's queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Research queue is full; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class OwnerLimitError(QueueFullError):
+    """Raised when one owner already has as many jobs queued as they are allowed."""
+
+
+class _Job:
+    __slots__ = ('key', 'fn', 'args', 'kwargs', 'owner', 'tag', 'seq', 'enqueued_at', 'context')
+
+    def __init__(self, key, fn, args, kwargs, owner, tag, seq):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.owner = owner
+        self.tag = tag
+        self.seq = seq
+        self.enqueued_at = time.time()
+        # Runs in the submitter's context, so log correlation IDs follow the job onto the worker
+        self.context = contextvars.copy_context()
+
+
+class ResearchWorkerPool:
+    """
+    Fixed-size pool of worker threads with a bounded, weighted fair queue.
+
+    Research jobs are long (tens of seconds of scraping and LLM calls), so
+    instead of a thread per request the pool runs at most `max_workers` jobs
+    at once and queues up to `max_queue` more. Submitting beyond that fails
+    fast with QueueFullError so the caller can shed load.
+
+    Jobs are not served first come, first served: each job carries an owner
+    (a user) and is tagged with a virtual start time that advances by
+    1/weight per job of that owner (start-time fair queueing), and workers
+    take the queued job with the lowest tag. An
+    owner with a long backlog therefore cannot delay someone else's single
+    job by more than about one job per worker. An owner may also have at most
+    `max_active_per_owner` jobs running and `max_queued_per_owner` waiting.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16, on_position_change=None,
+                 max_active_per_owner: int = None, max_queued_per_owner: int = None):
+        """
+        Initializes the ResearchWorkerPool.
+
+        Args:
+            max_workers: Maximum number of jobs running concurrently.
+            max_queue: Maximum number of jobs waiting for a worker.
+            on_position_change: Optional callback(key, position) called whenever a
+                queued job moves up; position 0 means the job has started.
+            max_active_per_owner: Maximum number of one owner's jobs running at once (None for no cap).
+            max_queued_per_owner: Maximum number of one owner's jobs waiting (None for no cap).
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.on_position_change = on_position_change
+        self.max_active_per_owner = max_active_per_owner
+        self.max_queued_per_owner = max_queued_per_owner
+        self._queue = []
+        self._cond = threading.Condition()
+        self._workers = []
+        self._active = 0
+        self._owner_active = {}   # owner -> running jobs
+        self._owner_tags = {}     # owner -> virtual time at which their next job may start
+        self._weights = {}        # owner -> weight, for owners not weighted 1
+        self._virtual_time = 0.0  # start tag of the job dispatched last
+        self._usage = BoundedStore(max_entries=10000, ttl_seconds=24 * 3600)
+        self._started_at = time.time()
+        self._busy_seconds = 0.0
+        self._wait_times = deque(maxlen=500)
+        self._run_times = deque(maxlen=500)
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.cancelled = 0
+
+    def set_weight(self, owner, weight: float):
+        """Gives an owner a larger (or smaller) share of the workers; the default weight is 1."""
+        with self._cond:
+            if weight == 1:
+                self._weights.pop(owner, None)
+            else:
+                self._weights[owner] = weight
+
+    def submit(self, key, fn, *args, owner=None, **kwargs) -> int:
+        """
+        Queues fn(*args, **kwargs) under an identifying key.
+
+        Args:
+            owner: Who the job is run for; jobs are shared fairly between owners.
+
+        Returns:
+            The job's 1-based queue position (0 if a worker picks it up immediately).
+
+        Raises:
+            OwnerLimitError: If the owner already has max_queued_per_owner jobs waiting.
+            QueueFullError: If the queue already holds max_queue jobs.
+        """
+        with self._cond:
+            if self.max_queued_per_owner is not None and \
+                    sum(1 for job in self._queue if job.owner == owner) >= self.max_queued_per_owner:
+                self.rejected += 1
+                raise OwnerLimitError(self._retry_after())
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(self._retry_after())
+            tag = max(self._virtual_time, self._owner_tags.get(owner, 0.0))
+            self._owner_tags[owner] = tag + 1.0 / self._weights.get(owner, 1.0)
+            self.submitted += 1
+            self._queue.append(_Job(key, fn, args, kwargs, owner, tag, self.submitted))
+            self._record_usage(owner, 'submitted')
+            if len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, name=f"research-worker-{len(self._workers) + 1}",
+                                          daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._cond.notify()
+            position = self._order().index(key) + 1
+            idle = len(self._workers) - self._active
+            return 0 if position <= idle and self._eligible(owner) else position
+
+    def cancel(self, key) -> bool:
+        """
+        Removes a job that is still waiting in the queue.
+
+        Returns:
+            True if the job was dequeued; False if it is unknown or already running.
+        """
+        with self._cond:
+            job = next((job for job in self._queue if job.key == key), None)
+            if job is None:
+                return False
+            self._queue.remove(job)
+            self.cancelled += 1
+            moved = self._order()
+        for i, waiting_key in enumerate(moved):
+            self._notify_position(waiting_key, i + 1)
+        return True
+
+    def position(self, key) -> int:
+        """Returns the 1-based queue position of a job, 0 once it runs, or None if unknown."""
+        with self._cond:
+            order = self._order()
+        return order.index(key) + 1 if key in order else None
+
+    def usage(self, owner) -> dict:
+        """Returns an owner's queued and running jobs and their totals over the last day."""
+        with self._cond:
+            totals = self._usage.get(owner) or {}
+            return {
+                'queued': sum(1 for job in self._queue if job.owner == owner),
+                'active': self._owner_active.get(owner, 0),
+                'submitted': totals.get('submitted', 0),
+                'completed': totals.get('completed', 0),
+                'run_seconds': round(totals.get('run_seconds', 0.0), 1)
+            }
+
+    def metrics(self) -> dict:
+        """Returns queue depth, wait times and utilization counters."""
+        with self._cond:
+            uptime = max(time.time() - self._started_at, 1e-9)
+            waits = sorted(self._wait_times)
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queue_depth': len(self._queue),
+                'owners_waiting': len({job.owner for job in self._queue}),
+                'utilization': self._active / self.max_workers,
+                'busy_ratio': min(1.0, self._busy_seconds / (self.max_workers * uptime)),
+                'avg_wait_s': sum(waits) / len(waits) if waits else 0.0,
+                'p95_wait_s': waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                'avg_run_s': sum(self._run_times) / len(self._run_times) if self._run_times else 0.0,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'cancelled': self.cancelled
+            }
+
+    def _retry_after(self) -> int:
+        """Estimates when a queue slot frees up, from recent job durations."""
+        avg_run = sum(self._run_times) / len(self._run_times) if self._run_times else 30.0
+        return max(1, math.ceil(avg_run / self.max_workers))
+
+    def _eligible(self, owner) -> bool:
+        return self.max_active_per_owner is None or \
+            self._owner_active.get(owner, 0) < self.max_active_per_owner
+
+    def _order(self) -> list:
+        """Keys of the queued jobs in the order they would be served."""
+        return [job.key for job in sorted(self._queue, key=lambda job: (job.tag, job.seq))]
+
+    def _next_job(self):
+        eligible = [job for job in self._queue if self._eligible(job.owner)]
+        if not eligible:
+            return None
+        job = min(eligible, key=lambda job: (job.tag, job.seq))
+        self._queue.remove(job)
+        self._virtual_time = max(self._virtual_time, job.tag)
+        # Owners whose share has caught up with virtual time start afresh from it
+        for owner in [o for o, tag in self._owner_tags.items() if tag <= self._virtual_time]:
+            del self._owner_tags[owner]
+        return job
+
+    def _record_usage(self, owner, counter, seconds=0.0):
+        totals = self._usage.setdefault(owner, {'submitted': 0, 'completed': 0, 'run_seconds': 0.0})
+        totals[counter] += 1
+        totals['run_seconds'] += seconds
+        self._usage.touch(owner)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                self._active += 1
+                self._owner_active[job.owner] = self._owner_active.get(job.owner, 0) + 1
+                self._wait_times.append(time.time() - job.enqueued_at)
+                moved = self._order()
+
+            self._notify_position(job.key, 0)
+            for i, waiting_key in enumerate(moved):
+                self._notify_position(waiting_key, i + 1)
+
+            started = time.time()
+            try:
+                job.context.run(job.fn, *job.args, **job.kwargs)
+            except Exception:
+                logger.exception("Research job failed", extra={'job': job.key})
+            finally:
+                elapsed = time.time() - started
+                with self._cond:
+                    self._active -= 1
+                    self._owner_active[job.owner] -= 1
+                    if not self._owner_active[job.owner]:
+                        del self._owner_active[job.owner]
+                    self.completed += 1
+                    self._busy_seconds += elapsed
+                    self._run_times.append(elapsed)
+                    self._record_usage(job.owner, 'completed', elapsed)
+                    # The owner may be below their cap again, so a waiting job of theirs can run
+                    self._cond.notify_all()
+
+    def _notify_position(self, key, position):
+        if self.on_position_change:
+            try:
+                self.on_position_change(key, position)
+            except Exception:
+                logger.exception("Queue position callback failed", extra={'job': key})
@@ -12,6 +12,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const resultContent = document.getElementById('result-content');
     const sourcesList = document.getElementById('sources-list');
     const sourcesCount = document.getElementById('sources-count');
+    const preliminaryFindings = document.getElementById('preliminary-findings');
+    const findingsList = document.getElementById('findings-list');
     const loadingAnimation = document.querySelector('.loading-animation');
     const researchStatus = document.getElementById('research-status');
     const historyContainer = document.getElementById('history-container');
@@ -22,6 +24,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const researchProcess = document.getElementById('research-process');
     const toggleProcessBtn = document.getElementById('toggle-process');
     const toggleSourcesBtn = document.getElementById('toggle-sources');
+    const shareReportBtn = document.getElementById('share-report');
     const sourcesPanel = document.getElementById('sources-panel');
     const closeSourcesPanelBtn = document.querySelector('.close-panel');
     
@@ -43,8 +46,43 @@ document.addEventListener('DOMContentLoaded', function() {
     const feedbackSection = document.querySelector('.feedback-section');
     const feedbackButtons = document.querySelectorAll('.feedback-btn');
 
+    // Query of the research currently shown
+    let currentQuery = null;
+    // Session of the research still running, if any, and the stream of its progress
+    let runningSessionId = null;
+    let progressSource = null;
+    // Saved report currently shown, if any
+    let currentReportId = null;
+
+    // Leaving the page cancels the running research so it stops using server capacity
+    window.addEventListener('pagehide', function() {
+        if (runningSessionId && navigator.sendBeacon) {
+            navigator.sendBeacon(`/research/${runningSessionId}/cancel`);
+        }
+    });
+
     // Load conversation history on page load
     loadConversationHistory();
+    
+    // A permalink (/?report=<id>) opens the saved report instead of researching again
+    const linkedReport = new URLSearchParams(window.location.search).get('report');
+    if (linkedReport) {
+        openReport(linkedReport);
+    }
+    
+    // Copy the permalink of the report shown
+    if (shareReportBtn) {
+        shareReportBtn.addEventListener('click', function() {
+            if (!currentReportId) return;
+            const url = `${window.location.origin}/?report=${encodeURIComponent(currentReportId)}`;
+            navigator.clipboard.writeText(url).then(() => {
+                shareReportBtn.querySelector('span').textContent = 'Link copied';
+                setTimeout(() => {
+                    shareReportBtn.querySelector('span').textContent = 'Copy link';
+                }, 2000);
+            });
+        });
+    }
 
     // Toggle research process view
     if (toggleProcessBtn) {
@@ -184,11 +222,23 @@ document.addEventListener('DOMContentLoaded', function() {
                 </button>
             `;
             
+            // Saved reports re-open instantly, without another research run
+            if (item.report_id) {
+                const viewButton = document.createElement('button');
+                viewButton.className = 'history-reuse-btn';
+                viewButton.innerHTML = '<i class="fas fa-file-alt"></i> View Report';
+                viewButton.addEventListener('click', function() {
+                    openReport(item.report_id);
+                    resultSection.scrollIntoView({ behavior: 'smooth' });
+                });
+                historyItem.appendChild(viewButton);
+            }
+            
             historyItems.appendChild(historyItem);
         });
         
         // Add click event to the "Research Again" buttons
-        document.querySelectorAll('.history-reuse-btn').forEach(button => {
+        document.querySelectorAll('.history-reuse-btn[data-query]').forEach(button => {
             button.addEventListener('click', function() {
                 queryInput.value = this.dataset.query;
                 searchForm.dispatchEvent(new Event('submit'));
@@ -209,6 +259,15 @@ document.addEventListener('DOMContentLoaded', function() {
         resultContent.innerHTML = '';
         sourcesList.innerHTML = '';
         sourcesCount.textContent = '0';
+        findingsList.innerHTML = '';
+        preliminaryFindings.classList.add('hidden');
+        
+        // A new research has no permalink yet
+        currentReportId = null;
+        shareReportBtn.classList.add('hidden');
+        if (window.location.search) {
+            history.replaceState(null, '', window.location.pathname);
+        }
         
         // Show loading animation
         loadingAnimation.classList.remove('hidden');
@@ -251,6 +310,10 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Start the search process
     function startSearch(query) {
+        currentQuery = query;
+        // Events of a research this one replaces must not reach the new one's UI
+        closeProgressStream();
+        
         // Use fetch to POST the query
         fetch('/research', {
             method: 'POST',
@@ -261,6 +324,10 @@ document.addEventListener('DOMContentLoaded', function() {
         })
         .then(response => response.json())
         .then(data => {
+            // A newer search was started while this one was being submitted
+            if (query !== currentQuery) {
+                return;
+            }
             if (data.error) {
                 handleError(data.error);
                 return;
@@ -278,12 +345,50 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Stop listening to the progress of the research shown so far
+    function closeProgressStream() {
+        if (progressSource) {
+            progressSource.close();
+            progressSource = null;
+        }
+    }
+    
     // Track research progress
     function trackProgress(sessionId) {
-        const progressSource = new EventSource(`/research_stream/${sessionId}`);
+        closeProgressStream();
+        const source = new EventSource(`/research_stream/${sessionId}`);
+        progressSource = source;
+        runningSessionId = sessionId;
+        
+        // Local copy of the session's progress: a snapshot first, then deltas
+        let data = null;
         
-        progressSource.onmessage = function(e) {
-            const data = JSON.parse(e.data);
+        // Whether this stream still belongs to the research being shown
+        function isCurrent() {
+            return source === progressSource && sessionId === runningSessionId;
+        }
+        
+        source.onmessage = function(e) {
+            if (!isCurrent()) {
+                source.close();
+                return;
+            }
+            const event = JSON.parse(e.data);
+            
+            if (event.type === 'snapshot') {
+                data = event.progress;
+            } else if (!data) {
+                return;
+            } else if (event.type === 'update') {
+                Object.assign(data, event.changes);
+            } else if (event.type === 'source') {
+                const index = data.sources.findIndex(source => source.url === event.source.url);
+                if (index >= 0) {
+                    data.sources[index] = event.source;
+                } else {
+                    data.sources.push(event.source);
+                }
+            }
             
             // Update progress bar
             progressFill.style.width = `${data.progress_pct}%`;
@@ -295,27 +400,36 @@ document.addEventListener('DOMContentLoaded', function() {
             // Add sources as they come in
             if (data.sources && data.sources.length > 0) {
                 updateSourcesList(data.sources);
+                updateFindings(data.sources);
             }
             
             // If complete, display result
             if (data.status === 'complete' && data.result) {
-                displayResult({content: data.result});
-                progressSource.close();
+                runningSessionId = null;
+                closeProgressStream();
+                displayResult({content: data.result, cacheHit: data.cache_hit, degradation: data.degradation,
+                               reportId: data.report_id});
                 
                 // Refresh history after research completes
                 loadConversationHistory();
             }
             
             // If error, display error
-            if (data.status === 'error') {
-                handleError(data.error);
-                progressSource.close();
+            if (data.status === 'error' || data.status === 'cancelled') {
+                runningSessionId = null;
+                closeProgressStream();
+                handleError(data.status === 'cancelled' ? data.message : data.error);
             }
         };
         
-        progressSource.onerror = function() {
+        source.onerror = function() {
+            source.close();
+            if (!isCurrent()) {
+                return;
+            }
             console.error('EventSource error');
-            progressSource.close();
+            runningSessionId = null;
+            progressSource = null;
             handleError('Connection to server lost. Please try again.');
         };
     }
@@ -434,10 +548,77 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Show a saved report without running the research again
+    function openReport(reportId) {
+        resultSection.style.display = 'block';
+        resetUI();
+        researchProcess.style.display = 'none';
+        toggleProcessBtn.classList.remove('active');
+        progressText.textContent = 'Loading saved report...';
+        
+        fetch(`/report/${encodeURIComponent(reportId)}`)
+            .then(response => response.json().then(data => {
+                if (!response.ok) {
+                    throw new Error(data.error || 'Report not found.');
+                }
+                return data;
+            }))
+            .then(report => {
+                currentQuery = report.query;
+                queryInput.value = report.query;
+                progressFill.style.width = '100%';
+                progressText.textContent = `Saved report from ${new Date(report.completed_at * 1000).toLocaleString()}`;
+                updateSourcesList(report.sources.map(source => ({...source, status: 'analyzed'})));
+                displayResult({content: report.report, reportId: report.id});
+            })
+            .catch(error => {
+                console.error('Error loading report:', error);
+                handleError(error.message);
+            });
+    }
+
+    // Show each analyzed source's findings while the report is still being written
+    function updateFindings(sources) {
+        const analyzed = sources
+            .filter(source => source.status === 'analyzed' && source.summary)
+            .sort((a, b) => (b.relevance || 0) - (a.relevance || 0));
+        if (analyzed.length === 0) {
+            return;
+        }
+        
+        findingsList.innerHTML = '';
+        analyzed.forEach(source => {
+            const item = document.createElement('li');
+            item.innerHTML = `
+                <div class="finding-title">
+                    <a class="source-link" target="_blank" rel="noopener noreferrer"></a>
+                    <span class="relevance"></span>
+                </div>
+                <p class="finding-summary"></p>
+                <ul class="finding-points"></ul>
+            `;
+            // Findings are text extracted from web pages, so they are never inserted as HTML
+            const link = item.querySelector('.source-link');
+            link.href = source.url;
+            link.textContent = source.title || source.url;
+            item.querySelector('.relevance').textContent = `${((source.relevance || 0) * 100).toFixed(0)}% relevant`;
+            item.querySelector('.finding-summary').textContent = source.summary;
+            const points = item.querySelector('.finding-points');
+            (source.key_points || []).slice(0, 3).forEach(point => {
+                const li = document.createElement('li');
+                li.textContent = point;
+                points.appendChild(li);
+            });
+            findingsList.appendChild(item);
+        });
+        preliminaryFindings.classList.remove('hidden');
+    }
+
     // Display final research result
     function displayResult(data) {
-        // Hide loading animation
+        // Hide loading animation and the early findings the report replaces
         loadingAnimation.classList.add('hidden');
+        preliminaryFindings.classList.add('hidden');
         resultContent.classList.remove('hidden');
         
         // Update research status
@@ -454,6 +635,27 @@ document.addEventListener('DOMContentLoaded', function() {
         // Process content
         resultContent.innerHTML = data.content;
         
+        // Finished reports are saved; the address bar and "Copy link" point at them
+        if (data.reportId) {
+            currentReportId = data.reportId;
+            shareReportBtn.classList.remove('hidden');
+            history.replaceState(null, '', `?report=${encodeURIComponent(data.reportId)}`);
+        }
+        
+        // Answers reused from a similar earlier question can be flagged and re-researched
+        if (data.cacheHit) {
+            showCacheNotice(data.cacheHit);
+        }
+        
+        // Under heavy load the server does less work per research; say so
+        if (data.degradation && data.degradation.level > 0) {
+            const notice = document.createElement('div');
+            notice.className = 'cache-notice';
+            notice.innerHTML = '<p></p>';
+            notice.querySelector('p').textContent = data.degradation.message;
+            resultContent.prepend(notice);
+        }
+        
         // Highlight code blocks if any
         if (window.Prism) {
             Prism.highlightAllUnder(resultContent);
@@ -467,6 +669,37 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Show which earlier question a cached answer came from
+    function showCacheNotice(cacheHit) {
+        const notice = document.createElement('div');
+        notice.className = 'cache-notice';
+        notice.innerHTML = `
+            <p>Answered from a recent research on "<span class="cache-matched"></span>".</p>
+            <button class="cache-false-hit-btn">Not what I asked &mdash; research again</button>
+        `;
+        notice.querySelector('.cache-matched').textContent = cacheHit.matched_query;
+        
+        const query = currentQuery;
+        notice.querySelector('.cache-false-hit-btn').addEventListener('click', function() {
+            fetch('/cache/false_hit', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                },
+                body: `query=${encodeURIComponent(query)}`
+            })
+            .then(() => {
+                queryInput.value = query;
+                searchForm.dispatchEvent(new Event('submit'));
+            })
+            .catch(error => {
+                console.error('Error reporting cached answer:', error);
+            });
+        });
+        
+        resultContent.prepend(notice);
+    }
+
     // Handle search errors
     function handleError(errorMsg) {
         // Hide loading animation
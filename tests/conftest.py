@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_report_dir = None
+
+
+def pytest_configure(config):
+    # Importing the app opens the report store and domain stats; keep their database out of the working tree
+    global _report_dir
+    if not os.environ.get("WEBSIGHT_REPORT_PATH"):
+        _report_dir = tempfile.mkdtemp(prefix="websight-tests-")
+        os.environ["WEBSIGHT_REPORT_PATH"] = os.path.join(_report_dir, "reports.db")
+
+
+def pytest_unconfigure(config):
+    if _report_dir:
+        os.environ.pop("WEBSIGHT_REPORT_PATH", None)
+        shutil.rmtree(_report_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def bench_config():
+    """Builds research benchmark configs: offline, no latency or failures, fixed seed; keyword arguments override."""
+    from benchmarks.research_bench import DEFAULT_CORPUS
+
+    def build(**overrides):
+        config = {
+            'corpus': DEFAULT_CORPUS, 'concurrency': [1, 2], 'turns': 3,
+            'llm_latency': 0.0, 'llm_sigma': 0.5, 'llm_errors': 0.0, 'llm_malformed': 0.0,
+            'search_latency': 0.0, 'fetch_latency': 0.0, 'fetch_sigma': 0.8, 'fetch_errors': 0.0,
+            'cache': False, 'seed': 1
+        }
+        config.update(overrides)
+        return config
+    return build
@@ -0,0 +1,157 @@
+"""A tiny in-memory server speaking enough of the Redis protocol to test RedisStateStore."""
+import socketserver
+import threading
+import time
+
+from server.state_store import RespClient
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # Like Redis, send each reply right away; pipelined replies would otherwise wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        server = self.server
+        watched = {}  # key -> version when WATCHed
+        queued = None  # commands between MULTI and EXEC
+        while True:
+            try:
+                command = RespClient._read(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            name, args = command[0].upper(), command[1:]
+            if name == 'SUBSCRIBE':
+                channel = args[0]
+                with server.lock:
+                    server.subscribers.setdefault(channel, []).append(self)
+                self._send(['subscribe', channel, 1])
+                continue
+            if name == 'WATCH':
+                with server.lock:
+                    watched.update((key, server.versions.get(key, 0)) for key in args)
+                self._send(True)
+                continue
+            if name == 'UNWATCH':
+                watched.clear()
+                self._send(True)
+                continue
+            if name == 'MULTI':
+                queued = []
+                self._send(True)
+                continue
+            if queued is not None and name != 'EXEC':
+                queued.append((name, args))
+                self._send('QUEUED')
+                continue
+            if name == 'EXEC':
+                with server.lock:
+                    if any(server.versions.get(key, 0) != version for key, version in watched.items()):
+                        reply = None
+                    else:
+                        reply = [server.run(*command) for command in queued]
+                watched.clear()
+                queued = None
+                self._send(reply)
+                continue
+            try:
+                with server.lock:
+                    reply = server.run(name, args)
+            except Exception as e:
+                self.wfile.write(f"-ERR {e}\r\n".encode())
+                continue
+            self._send(reply)
+
+    def _send(self, reply):
+        try:
+            self.wfile.write(_encode(reply))
+        except OSError:
+            pass
+
+
+def _encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, bool):
+        return b"+OK\r\n"
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, list):
+        return f"*{len(reply)}\r\n".encode() + b''.join(_encode(r) for r in reply)
+    data = str(reply).encode('utf-8')
+    return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+
+def _list_slice(items, start, stop):
+    n = len(items)
+    start, stop = int(start), int(stop)
+    start = max(0, start + n if start < 0 else start)
+    stop = stop + n if stop < 0 else stop
+    return items[start:stop + 1]
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.data = {}
+        self.expires = {}
+        self.subscribers = {}
+        self.versions = {}  # key -> write count, for WATCH
+        self.lock = threading.Lock()
+        self.port = self.server_address[1]
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def run(self, name, args):
+        data = self.data
+        now = time.time()
+        for key in [k for k, at in self.expires.items() if at <= now]:
+            data.pop(key, None)
+            del self.expires[key]
+        if name in ('PING', 'SELECT', 'AUTH'):
+            return True
+        if name in ('SET', 'DEL', 'INCR', 'RPUSH', 'LTRIM'):
+            for key in args if name == 'DEL' else args[:1]:
+                self.versions[key] = self.versions.get(key, 0) + 1
+        if name == 'GET':
+            return data.get(args[0])
+        if name == 'SET':
+            options = [a.upper() for a in args[2:]]
+            if 'NX' in options and args[0] in data:
+                return None
+            data[args[0]] = args[1]
+            self.expires.pop(args[0], None)
+            if 'EX' in options:
+                self.expires[args[0]] = now + int(args[2 + options.index('EX') + 1])
+            return True
+        if name == 'EXPIRE':
+            if args[0] not in data:
+                return 0
+            self.expires[args[0]] = now + int(args[1])
+            return 1
+        if name == 'DEL':
+            for key in args:
+                self.expires.pop(key, None)
+            return sum(1 for key in args if data.pop(key, None) is not None)
+        if name == 'INCR':
+            data[args[0]] = str(int(data.get(args[0], 0)) + 1)
+            return int(data[args[0]])
+        if name == 'RPUSH':
+            data.setdefault(args[0], []).extend(args[1:])
+            return len(data[args[0]])
+        if name == 'LRANGE':
+            return _list_slice(data.get(args[0], []), args[1], args[2])
+        if name == 'LTRIM':
+            data[args[0]] = _list_slice(data.get(args[0], []), args[1], args[2])
+            return True
+        if name == 'PUBLISH':
+            handlers = self.subscribers.get(args[0], [])
+            for handler in handlers:
+                handler._send(['message', args[0], args[1]])
+            return len(handlers)
+        raise ValueError(f"unknown command '{name}'")
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
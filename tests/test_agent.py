@@ -165,6 +165,116 @@ def test_agent_no_search_results(
     mock_analyzer_tool.analyze.assert_not_called()
     assert "Could not find any relevant web pages" in report
 
+@pytest.mark.skipif(not agent_module, reason="Agent module could not be loaded, check GEMINI_API_KEY")
+@patch('agent.agent.genai.GenerativeModel')
+@patch('agent.agent.WebSearchTool')
+@patch('agent.agent.WebScraperTool')
+@patch('agent.agent.ContentAnalyzerTool')
+def test_agent_follow_up_reuses_stored_sources(
+    MockContentAnalyzerTool, MockWebScraperTool, MockWebSearchTool, MockGenerativeModel,
+    mock_env, mock_search_tool, mock_scraper_tool, mock_analyzer_tool, mock_llm_model
+):
+    """Tests that a follow-up answered by stored pages skips search and scraping."""
+    from agent.source_store import SourceStore
+
+    MockGenerativeModel.return_value = mock_llm_model
+    MockWebSearchTool.return_value = mock_search_tool
+    MockWebScraperTool.return_value = mock_scraper_tool
+    MockContentAnalyzerTool.return_value = mock_analyzer_tool
+
+    store = SourceStore()
+    for i, region in enumerate(['Washington', 'New Zealand', 'Poland']):
+        store.add_page(f'http://example.com/stored{i}', f'Stored {i}', f'Apples are grown in orchards in {region}.')
+
+    agent = WebResearchAgent()
+    agent.research_with_context("Where are apples grown?", "Previous research: apples", source_store=store)
+
+    mock_search_tool.search.assert_not_called()
+    mock_scraper_tool.scrape.assert_not_called()
+    assert mock_analyzer_tool.analyze.call_count == 3
+
+@pytest.mark.skipif(not agent_module, reason="Agent module could not be loaded, check GEMINI_API_KEY")
+@patch('agent.agent.genai.GenerativeModel')
+@patch('agent.agent.WebSearchTool')
+@patch('agent.agent.WebScraperTool')
+@patch('agent.agent.ContentAnalyzerTool')
+def test_agent_serves_rephrased_query_from_cache(
+    MockContentAnalyzerTool, MockWebScraperTool, MockWebSearchTool, MockGenerativeModel,
+    mock_env, mock_search_tool, mock_scraper_tool, mock_analyzer_tool, mock_llm_model
+):
+    """Tests that a rephrased question is answered from the semantic cache via the callbacks."""
+    MockGenerativeModel.return_value = mock_llm_model
+    MockWebSearchTool.return_value = mock_search_tool
+    MockWebScraperTool.return_value = mock_scraper_tool
+    MockContentAnalyzerTool.return_value = mock_analyzer_tool
+
+    agent = WebResearchAgent()
+    first = agent.research("compare apples and oranges")
+
+    analysis_callback = MagicMock()
+    source_callback = MagicMock()
+    second = agent.research("apples vs oranges comparison",
+                            query_analysis_callback=analysis_callback, source_callback=source_callback)
+
+    assert second == first
+    mock_search_tool.search.assert_called_once()
+    assert "cache_hit" in analysis_callback.call_args.args[0]
+    assert source_callback.call_count == 4  # start + complete for both cached sources
+
+@pytest.mark.skipif(not agent_module, reason="Agent module could not be loaded, check GEMINI_API_KEY")
+@patch('agent.agent.genai.GenerativeModel')
+@patch('agent.agent.WebSearchTool')
+@patch('agent.agent.WebScraperTool')
+@patch('agent.agent.ContentAnalyzerTool')
+def test_agent_reports_findings_per_source(
+    MockContentAnalyzerTool, MockWebScraperTool, MockWebSearchTool, MockGenerativeModel,
+    mock_env, mock_search_tool, mock_scraper_tool, mock_analyzer_tool, mock_llm_model
+):
+    """Tests that each analyzed source's findings reach source_callback before synthesis starts."""
+    MockGenerativeModel.return_value = mock_llm_model
+    mock_search_tool.search.return_value.append(
+        {'title': 'Broken', 'url': 'http://example.com/broken', 'snippet': 'Snippet 3'})
+    MockWebSearchTool.return_value = mock_search_tool
+    MockWebScraperTool.return_value = mock_scraper_tool
+    MockContentAnalyzerTool.return_value = mock_analyzer_tool
+
+    events = []
+    agent = WebResearchAgent()
+    agent.research("Tell me about apples", use_cache=False,
+                   source_callback=lambda *args: events.append(args[2:]),
+                   synthesis_callback=lambda: events.append(('synthesis',)))
+
+    assert events[1] == ('http://example.com/1', 'Test Result 1', 'complete',
+                         {'relevance_score': 0.9, 'summary': 'Info about apples.', 'key_points': ['Apples are fruit']})
+    assert ('http://example.com/broken', 'Broken', 'skipped') in events
+    assert events[-1] == ('synthesis',)
+
+@pytest.mark.skipif(not agent_module, reason="Agent module could not be loaded, check GEMINI_API_KEY")
+@patch('agent.agent.genai.GenerativeModel')
+@patch('agent.agent.WebSearchTool')
+@patch('agent.agent.WebScraperTool')
+@patch('agent.agent.ContentAnalyzerTool')
+def test_agent_snippets_only_mode_skips_scraping(
+    MockContentAnalyzerTool, MockWebScraperTool, MockWebSearchTool, MockGenerativeModel,
+    mock_env, mock_search_tool, mock_scraper_tool, mock_analyzer_tool, mock_llm_model
+):
+    """Tests that a degraded run answers from search snippets with a single LLM call."""
+    MockGenerativeModel.return_value = mock_llm_model
+    MockWebSearchTool.return_value = mock_search_tool
+    MockWebScraperTool.return_value = mock_scraper_tool
+    MockContentAnalyzerTool.return_value = mock_analyzer_tool
+
+    agent = WebResearchAgent()
+    report = agent.research("Snippet 1", options={'skip_query_analysis': True, 'snippets_only': True,
+                                                  'max_search_results': 3})
+
+    mock_search_tool.search.assert_called_once_with("Snippet 1", num_results=3)
+    mock_scraper_tool.scrape.assert_not_called()
+    mock_analyzer_tool.analyze.assert_not_called()
+    assert mock_llm_model.generate_content.call_count == 1  # synthesis only
+    assert "Synthesized mock report based on context." in report
+    assert agent.query_cache.stats()['entries'] == 0
+
 # Add more tests:
 # - Test case where scraping fails for all URLs
 # - Test case where analysis deems all content irrelevant
@@ -0,0 +1,69 @@
+import json
+
+from agent.llm_stats import llm_stats
+from tools.analyzer import ANALYSIS_SCHEMA, ContentAnalyzerTool
+
+PAGE = ("Solar panel efficiency measures how much sunlight becomes electricity. "
+        "Most residential solar panels reach an efficiency between 18 and 22 percent.")
+VALID = json.dumps({'summary': ' Panels convert about a fifth of sunlight. ', 'key_points': ['18-22%', ''],
+                    'relevance_score': 1.4})
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _ScriptedModel:
+    """Answers with the given texts in turn and records the prompts and configs it received."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls.append((prompt, generation_config))
+        return _Response(self.answers.pop(0))
+
+
+def _parse_counts():
+    stats = llm_stats.parse_stats()
+    return {key: stats[key] for key in ('valid', 'repaired', 'invalid')}, dict(stats['errors'])
+
+
+def test_valid_answer_is_parsed_once_with_the_schema():
+    model = _ScriptedModel(VALID)
+    before, _ = _parse_counts()
+
+    result = ContentAnalyzerTool(model=model).analyze(PAGE, "solar panel efficiency")
+    assert result == {'summary': 'Panels convert about a fifth of sunlight.', 'key_points': ['18-22%'],
+                      'relevance_score': 1.0, 'error': None}
+    assert model.calls[0][1]['response_schema'] is ANALYSIS_SCHEMA
+    after, _ = _parse_counts()
+    assert after['valid'] == before['valid'] + 1
+
+
+def test_invalid_answer_is_sent_back_for_correction():
+    model = _ScriptedModel('Sure! ```json\n{"summary": "Panels convert', VALID)
+    before, errors_before = _parse_counts()
+
+    result = ContentAnalyzerTool(model=model).analyze(PAGE, "solar panel efficiency")
+    assert result['summary'] == 'Panels convert about a fifth of sunlight.'
+    repair_prompt = model.calls[1][0]
+    # Only the broken answer is resent, not the page
+    assert '{"summary": "Panels convert' in repair_prompt and PAGE not in repair_prompt
+    after, errors_after = _parse_counts()
+    assert after['repaired'] == before['repaired'] + 1
+    assert errors_after['not_json'] == errors_before.get('not_json', 0) + 1
+
+
+def test_answers_that_stay_invalid_fall_back_to_a_local_summary():
+    model = _ScriptedModel('{}', '{"summary": 1, "key_points": [], "relevance_score": 0.5}')
+    before, _ = _parse_counts()
+
+    result = ContentAnalyzerTool(model=model, max_repairs=1).analyze(PAGE, "solar panel efficiency")
+    assert len(model.calls) == 2
+    assert result['method'] == 'extractive' and result['error'] is None
+    assert result['llm_error'].startswith("Invalid model output: summary must be a string")
+    after, _ = _parse_counts()
+    assert after['invalid'] == before['invalid'] + 1
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+# Importing the app builds the agent, which needs an API key
+asgi = None
+if os.getenv("GEMINI_API_KEY"):
+    try:
+        import app
+        import asgi
+    except (ImportError, ValueError) as e:
+        print(f"Could not import the ASGI app: {e}")
+
+pytestmark = pytest.mark.skipif(not asgi, reason="ASGI app could not be loaded, check GEMINI_API_KEY")
+
+
+class _FakeAgent:
+    """Stands in for the research agent: reports progress, then returns a fixed report."""
+
+    def __init__(self, query_cache):
+        self.query_cache = query_cache
+
+    def research(self, query, cancel_token=None, **callbacks):
+        cached = self.query_cache.lookup(query)
+        if cached:
+            callbacks['query_analysis_callback']({'analysis': 'fake', 'cache_hit': {
+                'matched_query': cached['matched_query'], 'report_id': cached['report_id']}})
+            return cached['report']
+        callbacks['query_analysis_callback']({'analysis': 'fake'})
+        cancel_token.wait(0.1)
+        cancel_token.raise_if_cancelled()
+        callbacks['synthesis_callback']()
+        if query.startswith("nothing"):
+            return "Could not find any relevant web pages for the query."
+        report = f"<p>Report on {query}</p>"
+        self.query_cache.store(query, report)
+        return report
+
+    def research_with_context(self, query, context, **kwargs):
+        return self.research(query, **kwargs)
+
+
+@pytest.fixture
+def fake_agent(monkeypatch):
+    monkeypatch.setattr(app, 'agent_instance', _FakeAgent(app.get_agent().query_cache))
+
+
+def call(method, path, body=b'', headers=()):
+    """Drives the ASGI application with one request and returns (status, headers, body)."""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': list(headers),
+             'query_string': b'', 'http_version': '1.1', 'scheme': 'http',
+             'server': ('testserver', 80), 'client': ('127.0.0.1', 1234)}
+    asyncio.run(asyncio.wait_for(asgi.application(scope, receive, send), 10))
+    return sent[0]['status'], dict(sent[0]['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def research(query):
+    """Runs a research through the ASGI routes; returns the stream's headers, its events and the cookie."""
+    status, headers, body = call('POST', '/research', b'query=' + query.replace(' ', '+').encode(),
+                                 [(b'content-type', b'application/x-www-form-urlencoded')])
+    assert status == 200
+    session_id = json.loads(body)['session_id']
+    cookie = headers[b'set-cookie'].split(b';')[0]
+
+    status, headers, body = call('GET', f'/research_stream/{session_id}', headers=[(b'cookie', cookie)])
+    events = [json.loads(chunk[len('data: '):]) for chunk in body.decode().split('\n\n') if chunk.startswith('data: ')]
+    return headers, events, cookie
+
+
+def final_progress(events):
+    """The session's progress once the stream ended: its snapshot with every later change applied."""
+    progress = dict(events[0]['progress'])
+    for event in events[1:]:
+        progress.update(event.get('changes', {}))
+    return progress
+
+
+def test_research_streams_to_completion(fake_agent):
+    headers, events, cookie = research('asgi streaming test')
+    assert headers[b'content-type'] == b'text/event-stream'
+    assert events[0]['type'] == 'snapshot'
+    assert events[-1]['changes']['status'] == 'complete'
+
+    # The cookie set by the native route is a valid Flask session
+    status, _, body = call('GET', '/conversation_history', headers=[(b'cookie', cookie)])
+    assert status == 200
+    assert json.loads(body)[-1]['query'] == 'asgi streaming test'
+
+
+def test_other_routes_go_to_flask():
+    status, headers, body = call('GET', '/')
+    assert status == 200
+    assert b'<html' in body.lower()
+
+
+def test_unknown_session_progress_is_404():
+    status, _, body = call('GET', '/research_progress/no_such_session')
+    assert status == 404
+    assert json.loads(body)['error'] == "Invalid session ID"
+
+
+def test_only_the_user_served_a_cached_answer_can_report_it(fake_agent):
+    cache = app.agent_instance.query_cache
+    cache.store("compare tea and coffee", "<p>Report</p>")
+    assert cache.lookup("tea vs coffee comparison") is not None
+    client = app.app.test_client()
+
+    # Anyone else posting the query gets refused and the entry stays
+    assert client.post('/cache/false_hit', data={'query': "tea vs coffee comparison"}).status_code == 403
+    assert cache.lookup("tea vs coffee comparison") is not None
+
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = 'user-served-cache'
+    app.state_store.set_json(app.cache_hit_key('user-served-cache'), {'query': "tea vs coffee comparison"})
+    response = client.post('/cache/false_hit', data={'query': "tea vs coffee comparison"})
+    assert response.get_json() == {'status': 'success'}
+    assert cache.lookup("tea vs coffee comparison") is None
+    # Each served answer can be reported once
+    assert client.post('/cache/false_hit', data={'query': "tea vs coffee comparison"}).status_code == 403
+
+
+def test_only_synthesized_reports_are_saved(fake_agent, monkeypatch):
+    # Every call comes from the same test client address
+    monkeypatch.setattr(app, 'rate_limiter', app.UserRateLimiter(per_minute=60, burst=10))
+    _, events, _ = research('history of the printing press')
+    report_id = final_progress(events)['report_id']
+    assert app.report_store.get(report_id)[1]['query'] == 'history of the printing press'
+
+    # A cached answer links to the report it came from instead of saving a copy
+    _, events, _ = research('printing press history')
+    progress = final_progress(events)
+    assert progress['cache_hit'] and progress['report_id'] == report_id
+
+    _, events, _ = research('nothing to find here')
+    progress = final_progress(events)
+    assert progress['status'] == 'complete' and progress['report_id'] is None
@@ -0,0 +1,68 @@
+import json
+from unittest.mock import MagicMock
+
+from agent.batch import BatchResearchRunner
+from agent.query_cache import SemanticQueryCache
+
+
+class FakeAgent:
+    """Minimal stand-in exposing the tools and entry points the runner uses."""
+
+    def __init__(self):
+        self.scraper_tool = MagicMock()
+        self.scraper_tool.scrape.side_effect = lambda url: {'url': url, 'raw_text': f'Text of {url}', 'error': None}
+        self.analyzer_tool = MagicMock()
+        self.analyzer_tool.analyze.side_effect = lambda content, query: {
+            'summary': content, 'key_points': [], 'relevance_score': 0.5, 'error': None}
+        self.query_cache = SemanticQueryCache()
+
+    def research(self, query, source_callback=None):
+        if query == 'boom':
+            raise RuntimeError('research failed')
+        if query == 'nothing':
+            return 'Could not find any relevant web pages for the query.'
+        text = self.scraper_tool.scrape('http://example.com/shared')['raw_text']
+        self.analyzer_tool.analyze(text, query)
+        if source_callback:
+            source_callback(1, 1, 'http://example.com/shared', 'Shared', 'complete')
+        report = f'<p>Report for {query}</p>'
+        self.query_cache.store(query, report)
+        return report
+
+
+def test_batch_dedupes_fetches_and_identical_queries(tmp_path):
+    agent = FakeAgent()
+    output = tmp_path / 'results.jsonl'
+    runner = BatchResearchRunner(agent, max_workers=3, output_path=str(output))
+
+    stats = runner.run([
+        {'id': 'a', 'query': 'Apples'},
+        {'id': 'b', 'query': '  apples '},
+        {'id': 'c', 'query': 'Oranges'},
+    ])
+
+    assert stats['succeeded'] == 3
+    assert agent.scraper_tool.scrape.call_count == 1
+    assert agent.analyzer_tool.analyze.call_count == 2  # 'a' and 'b' share one research run
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(r['id'] for r in records) == ['a', 'b', 'c']
+    assert records[0]['sources'] == [{'url': 'http://example.com/shared', 'title': 'Shared'}]
+    # The batch's answers stay out of the caller's semantic cache
+    assert agent.query_cache.stats()['entries'] == 0
+    assert runner.agent.query_cache.stats()['entries'] == 2
+
+
+def test_batch_resumes_and_retries_failures(tmp_path):
+    output = tmp_path / 'results.jsonl'
+    items = [{'id': 'a', 'query': 'Apples'}, {'id': 'b', 'query': 'boom'}, {'id': 'c', 'query': 'nothing'}]
+
+    first = BatchResearchRunner(FakeAgent(), output_path=str(output)).run(items)
+    assert (first['succeeded'], first['failed']) == (1, 2)
+    records = {r['id']: r for r in map(json.loads, output.read_text().splitlines())}
+    assert records['c']['error'].startswith('Could not find') and records['c']['report'] is None
+
+    agent = FakeAgent()
+    second = BatchResearchRunner(agent, output_path=str(output)).run(items)
+    assert second['skipped'] == 1
+    assert second['failed'] == 2  # Only the failed queries are attempted again
+    assert agent.scraper_tool.scrape.call_count == 0
@@ -0,0 +1,59 @@
+from benchmarks.fakes import Corpus, FakeGeminiModel, LatencyModel
+from benchmarks.research_bench import compare_results, run_benchmark
+
+
+def test_benchmark_runs_offline_without_an_api_key(bench_config, monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    document = run_benchmark(bench_config())
+
+    assert [result['concurrency'] for result in document['results']] == [1, 2]
+    for result in document['results']:
+        assert result['turns'] >= 3
+        assert result['failed_turns'] == 0
+        assert result['latency_p50_s'] <= result['latency_p95_s'] <= result['latency_p99_s']
+        # Query analysis, per-source analyses and synthesis all went through the fake model
+        assert set(result['llm_by_kind']) >= {'content_analysis', 'synthesis'}
+        assert result['tokens_per_turn'] > 0
+        assert result['fetches'] > 0
+
+
+def test_failing_llm_calls_are_counted(bench_config):
+    document = run_benchmark(bench_config(concurrency=[1], llm_errors=1.0))
+    result = document['results'][0]
+    assert result['llm_errors'] == result['llm_calls'] > 0
+
+
+def test_extractive_analysis_skips_per_source_llm_calls(bench_config):
+    document = run_benchmark(bench_config(concurrency=[1], analysis='extractive'))
+    result = document['results'][0]
+    assert result['failed_turns'] == 0
+    assert 'content_analysis' not in result['llm_by_kind']
+    assert 'synthesis' in result['llm_by_kind']
+
+
+def test_malformed_analyses_are_repaired_by_a_retry(bench_config):
+    document = run_benchmark(bench_config(concurrency=[1], llm_malformed=1.0))
+    result = document['results'][0]
+    assert result['failed_turns'] == 0
+    by_kind = result['llm_by_kind']
+    assert by_kind['analysis_repair']['calls'] == by_kind['content_analysis']['calls'] > 0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = {'results': [{'concurrency': 1, 'latency_p95_s': 2.0, 'throughput_turns_per_s': 1.0}]}
+    slower = {'results': [{'concurrency': 1, 'latency_p95_s': 2.5, 'throughput_turns_per_s': 0.95}]}
+
+    rows, regressed = compare_results(baseline, slower, threshold=0.1)
+    assert regressed
+    assert {row['metric']: row['regression'] for row in rows} == {
+        'latency_p95_s': True, 'throughput_turns_per_s': False}
+
+    _, regressed = compare_results(baseline, baseline, threshold=0.1)
+    assert not regressed
+
+
+def test_fake_model_can_return_malformed_analyses():
+    model = FakeGeminiModel(Corpus({}), LatencyModel(seed=3), malformed_rate=1.0)
+    prompt = 'CONTENT ANALYSIS TASK\nWEB CONTENT:\nGreen tea contains catechins and some caffeine per cup.\n\nSEARCH QUERY:\n"green tea"'
+    texts = {model.generate_content(prompt).text for _ in range(10)}
+    assert any(not text.startswith('{') or not text.endswith('}') for text in texts)
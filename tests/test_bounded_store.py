@@ -0,0 +1,51 @@
+import threading
+import time
+
+from server.bounded_store import BoundedStore, Reaper
+
+
+def test_least_recently_used_entry_is_evicted():
+    store = BoundedStore(max_entries=2)
+    store.set('a', 1)
+    store.set('b', 2)
+    store.get('a')
+    store.set('c', 3)
+
+    assert 'a' in store and 'c' in store
+    assert 'b' not in store
+    assert store.stats()['evicted'] == 1
+
+
+def test_entries_expire_after_last_write():
+    store = BoundedStore(ttl_seconds=0.1)
+    store.set('a', {'status': 'running'})
+    store.set('b', 'short', ttl=0.01)
+    time.sleep(0.05)
+
+    assert store.touch('a')
+    assert store.get('b') is None
+    time.sleep(0.07)
+    assert store.get('a') == {'status': 'running'}
+    time.sleep(0.1)
+    assert store.reap() == ['a']
+    assert len(store) == 0
+
+
+def test_reaper_runs_registered_tasks_on_one_thread():
+    reaper = Reaper(interval=0.02)
+    calls = []
+    done = threading.Event()
+
+    def task():
+        calls.append(threading.current_thread().name)
+        if len(calls) >= 3:
+            done.set()
+
+    reaper.register('task', task)
+    reaper.register('broken', lambda: 1 / 0)
+    reaper.start()
+    assert done.wait(2)
+    reaper.stop()
+
+    assert set(calls) == {'reaper'}
+    assert reaper.runs >= 2
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from agent.cancellation import CancelToken, ResearchCancelled, check_cancelled
+from tools.scraper import WebScraperTool
+
+
+def test_cancel_interrupts_wait_and_raises():
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel, args=("user left",)).start()
+
+    started = time.time()
+    assert token.wait(5) is True
+    assert time.time() - started < 1
+
+    with pytest.raises(ResearchCancelled, match="user left"):
+        check_cancelled(token)
+    check_cancelled(None)
+
+
+def test_poll_is_rate_limited():
+    calls = []
+
+    def poll():
+        calls.append(time.time())
+        return "stopped elsewhere" if len(calls) >= 2 else None
+
+    token = CancelToken(poll=poll, poll_interval=0.05)
+    assert not token.cancelled
+    assert not token.cancelled
+    assert len(calls) == 1
+    time.sleep(0.06)
+    assert token.cancelled
+    assert token.reason == "stopped elsewhere"
+
+
+class _StreamedResponse:
+    encoding = 'utf-8'
+
+    def __init__(self, token):
+        self.token = token
+        self.chunks_read = 0
+
+    def iter_content(self, chunk_size):
+        for _ in range(100):
+            self.chunks_read += 1
+            if self.chunks_read == 3:
+                self.token.cancel()
+            yield b'<p>chunk</p>'
+
+
+def test_streamed_download_stops_once_cancelled():
+    token = CancelToken()
+    response = _StreamedResponse(token)
+
+    with pytest.raises(ResearchCancelled):
+        WebScraperTool._read_body(response, token)
+    assert response.chunks_read == 3
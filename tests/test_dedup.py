@@ -0,0 +1,39 @@
+from agent.dedup import ParagraphDeduplicator, merge_key_points
+
+ARTICLE = ("The city council approved the new transit plan on Tuesday, adding three bus lines "
+           "and extending light rail service to the airport by 2027.")
+
+
+def test_repeated_boilerplate_and_syndicated_paragraphs_are_removed():
+    dedup = ParagraphDeduplicator()
+    first = dedup.filter(f"Home | News | Sports\n{ARTICLE}\nPrivacy Policy")
+    second = dedup.filter(
+        "Home | News | Sports\n"
+        + ARTICLE.replace("Tuesday", "Tuesday evening") + "\n"
+        + "Critics say the plan underfunds maintenance.\n"
+        + "Privacy Policy"
+    )
+
+    assert first.count('\n') == 2
+    assert second == "Critics say the plan underfunds maintenance."
+    assert dedup.stats()['blocks_removed'] == 3
+
+
+def test_short_distinct_blocks_are_kept():
+    dedup = ParagraphDeduplicator()
+    dedup.filter("Apples are red.")
+    assert dedup.filter("Oranges are orange.") == "Oranges are orange."
+
+
+def test_merge_key_points_keeps_most_relevant_phrasing():
+    analyzed = [
+        {'url': 'a', 'relevance_score': 0.4, 'key_points': ['Vue is easier to learn than React', 'Vue has SFCs']},
+        {'url': 'b', 'relevance_score': 0.9, 'key_points': ['Vue is easier to learn than React.']},
+    ]
+
+    merged = merge_key_points(analyzed)
+
+    assert [item['url'] for item in merged] == ['a', 'b']
+    assert merged[0]['key_points'] == ['Vue has SFCs']
+    assert merged[1]['key_points'] == ['Vue is easier to learn than React.']
+    assert len(analyzed[0]['key_points']) == 2
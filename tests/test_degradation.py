@@ -0,0 +1,77 @@
+import pytest
+
+from agent.llm_stats import LLMCallStats
+from server import degradation as degradation_module
+from server.degradation import DegradationController
+
+
+class _Load:
+    def __init__(self):
+        self.queue_depth = 0
+        self.p50 = 0.0
+
+    def pool(self):
+        return {'queue_depth': self.queue_depth, 'max_workers': 4}
+
+    def llm(self):
+        return {'calls': 10, 'p50_s': self.p50, 'error_rate': 0.0}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(degradation_module.time, 'time', lambda: now[0])
+    return now
+
+
+def test_level_rises_at_once_and_recovers_one_step_after_hold(clock):
+    load = _Load()
+    controller = DegradationController(load.pool, load.llm, min_hold_seconds=30)
+    assert controller.current()['mode'] == 'full'
+
+    load.queue_depth = 13  # 3.25 waiting jobs per worker
+    mode = controller.current()
+    assert (mode['level'], mode['options']) == (3, {'cached_only': True})
+
+    # Pressure gone, but the level is held for a while
+    load.queue_depth = 0
+    clock[0] += 10
+    assert controller.update() == 3
+    clock[0] += 25
+    assert controller.update() == 2
+    assert controller.update() == 2
+    clock[0] += 30
+    assert controller.update() == 1
+
+
+def test_no_recovery_just_below_the_threshold(clock):
+    load = _Load()
+    controller = DegradationController(load.pool, load.llm, min_hold_seconds=0)
+    load.p50 = 7.0
+    assert controller.update() == 1
+
+    # Below the 6s threshold but above 60% of it: stays degraded
+    load.p50 = 5.0
+    clock[0] += 60
+    assert controller.update() == 1
+    load.p50 = 3.0
+    assert controller.update() == 0
+
+
+def test_disabled_controller_stays_full():
+    load = _Load()
+    load.queue_depth = 100
+    controller = DegradationController(load.pool, load.llm, enabled=False)
+    assert controller.current()['level'] == 0
+
+
+def test_llm_stats_counts_failed_calls():
+    stats = LLMCallStats()
+    with stats.timed():
+        pass
+    with pytest.raises(RuntimeError):
+        with stats.timed():
+            raise RuntimeError("quota exceeded")
+    recent = stats.recent()
+    assert (recent['calls'], recent['error_rate']) == (2, 0.5)
+    assert stats.stats()['total_errors'] == 1
@@ -0,0 +1,59 @@
+import time
+
+from agent.domain_stats import DomainStats, domain_of
+from benchmarks.fakes import Corpus
+from benchmarks.research_bench import DEFAULT_CORPUS, build_agent
+
+PAGE_CHARS = 3000
+
+
+def test_known_domains_move_from_their_search_position(tmp_path):
+    stats = DomainStats(str(tmp_path / 'domains.db'))
+    urls = ['https://slow.example/a', 'https://new.example/b', 'https://www.fast.example/c']
+    # Unknown domains keep the search engine's order
+    assert stats.order(urls) == (urls, [])
+
+    for _ in range(5):
+        stats.record_fetch('https://slow.example/x', 12.0, True, PAGE_CHARS)
+        stats.record_relevance('https://slow.example/x', 0.4)
+        stats.record_fetch('https://fast.example/y', 0.3, True, PAGE_CHARS)
+        stats.record_relevance('https://fast.example/y', 0.9)
+
+    assert stats.order(urls) == (['https://www.fast.example/c', 'https://new.example/b',
+                                  'https://slow.example/a'], [])
+    fast = stats.get('https://fast.example/')
+    assert fast['fetches'] == fast['analyses'] == 5 and fast['chars'] == PAGE_CHARS
+    assert stats.stats()['domains'] == 2
+
+
+def test_failing_domains_are_pruned_until_retried(tmp_path):
+    stats = DomainStats(str(tmp_path / 'domains.db'), retry_after=3600)
+    urls = ['https://paywall.example/a', 'https://open.example/b']
+    for attempt in range(5):
+        # A paywall answers, but with next to no text
+        stats.record_fetch(urls[0], 0.5, True, 80)
+        if attempt < 4:
+            assert stats.order(urls)[1] == []
+
+    assert stats.order(urls) == (['https://open.example/b'], ['https://paywall.example/a'])
+    # Pruned URLs are still fetched when there would not be enough sources otherwise
+    assert stats.order(urls, keep=2) == (['https://open.example/b', 'https://paywall.example/a'], [])
+
+    stats._connect().execute("UPDATE domains SET updated_at = ?", (time.time() - 7200,))
+    assert stats.order(urls)[1] == []
+    assert domain_of('https://WWW.Paywall.example:443/a') == 'paywall.example'
+
+
+def test_agent_learns_from_sources_and_skips_pruned_domains(bench_config, tmp_path):
+    corpus = Corpus.load(DEFAULT_CORPUS)
+    agent = build_agent(corpus, bench_config(), seed=1)[0]
+    agent.domain_stats = DomainStats(str(tmp_path / 'domains.db'))
+    for _ in range(5):
+        agent.domain_stats.record_fetch('https://forum.example/', 1.0, False)
+
+    agent.research(corpus.conversations[0][0], use_cache=False)
+    # The first search result's domain was not fetched again
+    assert agent.domain_stats.get('https://forum.example/')['fetches'] == 5
+    learned = agent.domain_stats.get('https://wiki.example/')
+    assert learned['fetches'] > 0 and learned['analyses'] > 0
+    assert agent.domain_stats.stats()['pruned_urls'] > 0
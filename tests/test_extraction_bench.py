@@ -0,0 +1,41 @@
+from benchmarks.extraction_bench import (bench_llm_outputs, bench_parsers, check_thresholds, compare_baseline,
+                                         load_cases)
+from tools.scraper import WebScraperTool
+
+
+def test_extraction_benchmark_measures_parsers_and_outputs():
+    pages, llm_outputs = load_cases(corpus_pages=2)
+    pages = {name: pages[name] for name in ('unclosed_tags', 'entities_and_unicode', 'huge_inline_script')}
+    parsers = bench_parsers(pages, ['html.parser'], repeat=1)
+
+    summary = parsers['html.parser']['summary']
+    assert summary['cases'] == 3
+    assert summary['text_chars_total'] > 0
+    outputs = {row['name']: row for row in bench_llm_outputs(llm_outputs, repeat=1)['outputs']}
+    assert outputs['clean_json']['outcome'] == 'valid'
+    assert outputs['prose_wrapped']['outcome'] == 'not_json'
+    assert outputs['empty_object']['outcome'] == 'missing_keys'
+
+
+def test_thresholds_and_baseline_flag_regressions():
+    results = {
+        'parsers': {'html.parser': {'summary': {'p95_ms': 30.0, 'p50_ms': 10.0, 'text_chars_total': 1000}}},
+        'llm_outputs': {'summary': {'p95_ms': 1.0, 'p50_ms': 0.1}}
+    }
+    thresholds = {'parsers': {'html.parser': {'p95_ms': 20, 'min_text_chars_total': 2000}, 'lxml': {'p95_ms': 1}},
+                  'llm_outputs': {'p95_ms': 5}}
+    violations = check_thresholds(results, thresholds)
+    assert len(violations) == 2
+    assert any('p95_ms' in v for v in violations) and any('below the minimum' in v for v in violations)
+
+    baseline = {
+        'parsers': {'html.parser': {'summary': {'p95_ms': 30.0, 'p50_ms': 5.0, 'text_chars_total': 1000}}},
+        'llm_outputs': {'summary': {'p95_ms': 1.0, 'p50_ms': 0.1}}
+    }
+    assert compare_baseline(results, baseline, tolerance=0.25) == [
+        "parser html.parser: p50_ms went from 5.0 to 10.0 (+100.0%)"]
+
+
+def test_unavailable_parser_falls_back_to_html_parser():
+    assert WebScraperTool(parser='no-such-parser').parser == 'html.parser'
+    assert WebScraperTool(parser='html.parser').extract_text('<p>One</p><p>Two</p>') == 'One\nTwo'
@@ -0,0 +1,35 @@
+import requests
+
+from benchmarks.fakes import Corpus
+from benchmarks.load_test import PageServer, Recorder, local_url, read_events, summarize
+
+
+def test_page_server_serves_recorded_pages_locally():
+    corpus = Corpus({'pages': {'https://site.example/a/page': '<html><body><p>Hello</p></body></html>'}})
+    with PageServer(corpus) as pages:
+        response = requests.get(local_url(pages.base_url, 'https://site.example/a/page'), timeout=5)
+        missing = requests.get(local_url(pages.base_url, 'https://site.example/missing'), timeout=5)
+    assert response.status_code == 200
+    assert '<p>Hello</p>' in response.text
+    assert missing.status_code == 404
+
+
+class _Stream:
+    def iter_lines(self, decode_unicode=False):
+        return iter(['data: {"type": "snapshot", "progress": {}}', '', ': keep-alive', '',
+                     'data: {"type": "update", "changes": {"status": "complete"}, "ts": 1.0}'])
+
+
+def test_stream_events_are_parsed_and_summarized():
+    events = [event for _, event in read_events(_Stream())]
+    assert [event['type'] for event in events] == ['snapshot', 'update']
+
+    recorder = Recorder()
+    recorder.request('POST /research', 200, 0.1)
+    recorder.request('POST /research', 429, 0.01)
+    recorder.add('event_delays', 0.002)
+    recorder.add('timeline', {'t': 0.5, 'threads': 12, 'rss_mb': 90.0, 'queue_depth': 3})
+    report = summarize(recorder, wall_s=1.0)
+    assert report['endpoints']['POST /research']['error_rate'] == 0.5
+    assert report['event_delay_s']['count'] == 1
+    assert (report['peak_threads'], report['peak_queue_depth']) == (12, 3)
@@ -0,0 +1,41 @@
+from agent.memory import ConversationMemory, summarize_turn
+from tools.text_utils import estimate_tokens
+
+REPORT = (
+    "<h3>Overview:</h3>\n"
+    "<p>React is a UI library maintained by Meta. It uses a virtual DOM and JSX.</p>\n"
+    "<p>Vue is a progressive framework with single-file components. It is easy to adopt incrementally.</p>"
+)
+
+
+def test_summarize_turn_strips_html_and_leads_with_topic_sentences():
+    turn = summarize_turn("React vs Vue", REPORT)
+
+    assert turn['query'] == "React vs Vue"
+    assert turn['findings'][:2] == [
+        "React is a UI library maintained by Meta.",
+        "Vue is a progressive framework with single-file components.",
+    ]
+    assert not any('<' in f for f in turn['findings'])
+    assert "Overview:" not in turn['findings']
+
+
+def test_context_stays_under_token_cap():
+    memory = ConversationMemory(max_tokens=120)
+    for i in range(10):
+        memory.add_turn(f"Question number {i}", REPORT)
+
+    context = memory.get_context()
+    assert estimate_tokens(context) <= 120
+    # The newest turn is always kept, the oldest are dropped first
+    assert "Question number 9" in context
+    assert "Question number 0" not in context
+
+
+def test_async_update_and_rebuild():
+    memory = ConversationMemory()
+    memory.add_turn_async("React vs Vue", REPORT).result(timeout=5)
+
+    rebuilt = ConversationMemory.from_turns(memory.get_turns())
+    assert rebuilt.get_context() == memory.get_context()
+    assert rebuilt.get_context().startswith("Previous research:\nQ: React vs Vue")
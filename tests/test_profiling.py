@@ -0,0 +1,75 @@
+import os
+import pstats
+import threading
+
+from server.profiling import MemoryTracer, RequestProfiles, StackSampler, is_admin
+
+_retained = []
+
+
+def test_admin_token_is_required_and_checked(monkeypatch):
+    monkeypatch.delenv('WEBSIGHT_ADMIN_TOKEN', raising=False)
+    assert not is_admin({'X-Admin-Token': ''})
+
+    monkeypatch.setenv('WEBSIGHT_ADMIN_TOKEN', 's3cret')
+    assert is_admin({'X-Admin-Token': 's3cret'})
+    assert is_admin({'Authorization': 'Bearer s3cret'})
+    assert not is_admin({'Authorization': 'Bearer wrong'})
+    assert not is_admin({})
+
+
+def busy_parse(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_stack_sampler_finds_the_busy_thread():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_parse, args=(stop,), name='profiled-worker', daemon=True)
+    other = threading.Thread(target=stop.wait, name='unrelated', daemon=True)
+    worker.start()
+    other.start()
+    try:
+        sampler = StackSampler(seconds=0.3, interval=0.005, thread_prefix='profiled').run()
+    finally:
+        stop.set()
+
+    top = sampler.top()
+    assert sampler.samples > 10
+    assert top['threads'] == ['profiled-worker']
+    assert any(entry['function'].startswith('busy_parse') and entry['share'] > 0.9 for entry in top['total'])
+    assert 'busy_parse (test_profiling.py' in sampler.collapsed()
+
+
+def test_memory_tracer_diffs_snapshots():
+    tracer = MemoryTracer()
+    tracer.start(frames=5)
+    try:
+        first = tracer.snapshot()
+        assert first['compared_to'] is None
+        _retained.append([str(i) * 10 for i in range(20000)])
+        grown = tracer.snapshot(limit=5)
+    finally:
+        tracer.stop()
+        _retained.clear()
+
+    assert grown['compared_to'] == 'previous'
+    top_site = grown['sites'][0]
+    assert top_site['site'].startswith(os.path.abspath(__file__)) and top_site['size_diff_kb'] > 500
+    assert not tracer.tracing
+
+
+def parse_everything(n):
+    return sorted(str(i) for i in range(n))
+
+
+def test_request_profiles_store_a_loadable_profile(tmp_path):
+    profiles = RequestProfiles()
+    assert profiles.wrap('research_1', parse_everything)(5000)[0] == '0'
+
+    assert 'parse_everything' in profiles.report('research_1')
+    path = tmp_path / 'research_1.prof'
+    path.write_bytes(profiles.dump('research_1'))
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert 'parse_everything' in functions
+    assert profiles.dump('unknown') is None
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from server.progress_bus import ProgressBus
+
+
+def test_waiting_subscriber_is_woken_by_publish():
+    bus = ProgressBus()
+    received = []
+
+    def subscriber():
+        received.extend(bus.wait('s1', after_seq=0, timeout=5))
+
+    thread = threading.Thread(target=subscriber)
+    thread.start()
+    time.sleep(0.05)
+    started = time.time()
+    bus.publish('s1', {'type': 'update', 'changes': {'status': 'searching'}})
+    thread.join(timeout=5)
+
+    assert time.time() - started < 0.5
+    assert received[0]['changes'] == {'status': 'searching'}
+    assert received[0]['seq'] == 1
+
+
+def test_wait_returns_only_newer_events():
+    bus = ProgressBus()
+    for status in ['starting', 'searching', 'synthesizing']:
+        bus.publish('s1', {'type': 'update', 'changes': {'status': status}})
+
+    events = bus.wait('s1', after_seq=1, timeout=0)
+
+    assert [e['changes']['status'] for e in events] == ['searching', 'synthesizing']
+    assert bus.last_seq('s1') == 3
+    assert bus.wait('s1', after_seq=3, timeout=0) == []
+
+
+def test_close_wakes_waiters_and_drops_log():
+    bus = ProgressBus()
+    bus.publish('s1', {'type': 'update', 'changes': {}})
+    result = []
+    thread = threading.Thread(target=lambda: result.append(bus.wait('s1', after_seq=1, timeout=5)))
+    thread.start()
+    time.sleep(0.05)
+    bus.close('s1')
+    thread.join(timeout=1)
+
+    assert result == [[]]
+    assert bus.last_seq('s1') == 0
@@ -0,0 +1,62 @@
+from agent.query_cache import SemanticQueryCache, normalize_query
+
+
+def test_rephrased_comparison_queries_normalize_alike():
+    assert normalize_query("compare React versus Vue") == normalize_query("React vs Vue comparison")
+    assert normalize_query("New York news") == ['new', 'news', 'york']
+
+
+def test_lookup_hits_similar_query_and_misses_different_topic():
+    cache = SemanticQueryCache()
+    cache.store("compare React and Vue", "<p>Report</p>", [{'url': 'http://example.com'}])
+
+    hit = cache.lookup("React vs Vue comparison")
+    assert hit['report'] == "<p>Report</p>"
+    assert hit['matched_query'] == "compare React and Vue"
+    assert cache.lookup("React vs Angular comparison") is None
+
+    stats = cache.stats()
+    assert (stats['lookups'], stats['hits']) == (2, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_expired_entries_are_not_served():
+    cache = SemanticQueryCache(ttl_seconds=0)
+    cache.store("React vs Vue", "<p>Report</p>")
+    assert cache.lookup("React vs Vue") is None
+
+
+def test_false_hit_report_evicts_entry():
+    cache = SemanticQueryCache()
+    cache.store("React vs Vue", "<p>Report</p>")
+    assert cache.lookup("Vue versus React") is not None
+
+    assert cache.report_false_hit("Vue versus React")
+    assert cache.lookup("Vue versus React") is None
+    assert cache.stats()['false_hits'] == 1
+    assert cache.recent_hits()[0]['false_hit'] is True
+    assert 'recent_hits' not in cache.stats()
+
+
+def test_opposite_questions_miss_the_cache():
+    cache = SemanticQueryCache()
+    pairs = [("advantages of nuclear power", "disadvantages of nuclear power"),
+             ("pros of remote work", "cons of remote work"),
+             ("is Python better than Java", "is Java better than Python"),
+             ("Python better than Java", "Python worse than Java"),
+             ("latest restaurants in York", "New York restaurants"),
+             ("effects of caffeine on sleep", "effects of sleep on caffeine")]
+    for cached, asked in pairs:
+        cache.store(cached, "<p>Report</p>")
+        assert cache.lookup(asked) is None, (cached, asked)
+    cache.store("health benefits of green tea", "<p>Tea</p>")
+    assert cache.lookup("green tea health benefits") is not None
+
+
+def test_hits_share_the_saved_report_id():
+    cache = SemanticQueryCache()
+    report = "<p>Report</p>"
+    cache.store("history of the printing press", report)
+    assert cache.lookup("printing press history")['report_id'] is None
+    cache.link_report(report, "abc123")
+    assert cache.lookup("printing press history")['report_id'] == "abc123"
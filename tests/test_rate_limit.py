@@ -0,0 +1,30 @@
+import pytest
+
+from server import rate_limit
+from server.rate_limit import UserRateLimiter, RateLimitedError
+
+
+def test_bucket_allows_a_burst_then_refills(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, 'time', lambda: now[0])
+    limiter = UserRateLimiter(per_minute=6, burst=2)
+
+    limiter.acquire('alice')
+    limiter.acquire('alice')
+    with pytest.raises(RateLimitedError) as excinfo:
+        limiter.acquire('alice')
+    assert excinfo.value.retry_after == 10
+
+    # Other users have their own bucket
+    limiter.acquire('bob')
+
+    now[0] += 10
+    limiter.acquire('alice')
+    assert limiter.usage('alice') == {'remaining': 0, 'burst': 2, 'per_minute': 6, 'allowed': 3, 'throttled': 1}
+    assert limiter.stats()['throttled'] == 1
+
+
+def test_unknown_user_has_a_full_allowance():
+    limiter = UserRateLimiter(per_minute=6, burst=3)
+    assert limiter.usage('nobody')['remaining'] == 3
+    assert limiter.stats()['users'] == 0
@@ -0,0 +1,35 @@
+import time
+
+from server.report_store import ReportStore
+
+
+def test_report_round_trip(tmp_path):
+    store = ReportStore(str(tmp_path / 'reports.db'))
+    sources = [{'url': 'http://example.com/1', 'title': 'One', 'relevance': 0.9,
+                'summary': 'Apples grow on trees.', 'key_points': ['Trees']}]
+    report_id = store.save('Where do apples grow?', '<p>On trees.</p>' * 200, sources, started_at=100.0)
+
+    etag, report = store.get(report_id)
+    assert report['query'] == 'Where do apples grow?'
+    assert report['sources'] == sources
+    assert (report['id'], report['started_at']) == (report_id, 100.0)
+    assert store.etag(report_id) == etag
+    # Stored compressed
+    assert store.stats()['stored_bytes'] < len('<p>On trees.</p>' * 200)
+
+    assert store.get('missing') == (None, None)
+    assert store.etag('missing') is None
+
+
+def test_reap_evicts_by_age_then_size(tmp_path):
+    store = ReportStore(str(tmp_path / 'reports.db'), max_age=3600, max_bytes=10 ** 6)
+    old = store.save('old question', 'old report')
+    store._connect().execute("UPDATE reports SET created_at = ? WHERE id = ?", (time.time() - 7200, old))
+    ids = [store.save(f'question {i}', f'report {i} ' + 'x' * 50) for i in range(5)]
+    assert store.get(old) == (None, None)
+
+    # Room for exactly the three newest reports
+    sizes = dict(store._connect().execute("SELECT id, size FROM reports").fetchall())
+    store.max_bytes = sum(sizes[report_id] for report_id in ids[2:])
+    assert store.reap() == {'expired': 1, 'over_size': 2}
+    assert [store.get(report_id)[1] is not None for report_id in ids] == [False, False, True, True, True]
@@ -0,0 +1,25 @@
+from server.single_flight import SingleFlight, flight_key
+
+
+def test_same_query_with_same_context_shares_key():
+    assert flight_key("Benefits of bananas", "") == flight_key("  benefits of  BANANAS?", "")
+    # Only the same question shares a run, not opposite or reordered ones
+    assert flight_key("pros of remote work", "") != flight_key("cons of remote work", "")
+    assert flight_key("advantages of nuclear power", "") != flight_key("disadvantages of nuclear power", "")
+    assert flight_key("Python better than Java", "") != flight_key("Java better than Python", "")
+    assert flight_key("Benefits of bananas", "") != flight_key("Benefits of bananas", "Previous research:\nQ: x")
+    assert flight_key("Benefits of bananas", "") != flight_key("Benefits of apples", "")
+
+
+def test_followers_join_the_leader_until_it_finishes():
+    flights = SingleFlight()
+    key = flight_key("bananas", "")
+
+    assert flights.join(key, 'u1', 'session-1') == ('session-1', True)
+    assert flights.join(key, 'u2', 'session-2') == ('session-1', False)
+    assert flights.join(key, 'u2', 'session-3') == ('session-1', False)
+
+    assert flights.finish(key) == ['u1', 'u2']
+    assert flights.finish(key) == []
+    assert flights.join(key, 'u3', 'session-4') == ('session-4', True)
+    assert flights.stats() == {'in_flight': 1, 'leaders': 2, 'coalesced': 2}
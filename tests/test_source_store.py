@@ -0,0 +1,49 @@
+from agent.source_store import SourceStore
+
+APPLE_TEXT = (
+    "Apples are grown in temperate regions around the world. "
+    "The apple harvest in Washington state peaks in September and October. "
+    "Honeycrisp and Gala are among the most popular apple varieties."
+)
+ORANGE_TEXT = (
+    "Oranges are citrus fruits rich in vitamin C. "
+    "Florida and Brazil are the largest producers of orange juice."
+)
+
+
+def test_rank_prefers_matching_page():
+    store = SourceStore()
+    store.add_page('http://example.com/apples', 'Apples', APPLE_TEXT)
+    store.add_page('http://example.com/oranges', 'Oranges', ORANGE_TEXT)
+
+    ranked = store.rank("When is the apple harvest in Washington?")
+
+    assert ranked[0]['url'] == 'http://example.com/apples'
+    assert ranked[0]['coverage'] > 0.6
+    assert any('September' in p for p in ranked[0]['passages'])
+
+
+def test_rank_ignores_unrelated_pages():
+    store = SourceStore()
+    store.add_page('http://example.com/oranges', 'Oranges', ORANGE_TEXT)
+
+    assert store.rank("apple harvest season") == []
+
+
+def test_analysis_lookup_uses_normalized_query():
+    store = SourceStore()
+    store.add_page('http://example.com/apples', 'Apples', APPLE_TEXT)
+    analysis = {'summary': 'Apples.', 'key_points': [], 'relevance_score': 0.8, 'error': None}
+    store.add_analysis('http://example.com/apples', 'Tell me about apple varieties', analysis)
+
+    assert store.get_analysis('http://example.com/apples', 'apple varieties') == analysis
+    assert store.get_analysis('http://example.com/apples', 'apple prices') is None
+
+
+def test_least_recently_added_pages_are_evicted():
+    store = SourceStore(max_pages=2)
+    for i in range(3):
+        store.add_page(f'http://example.com/{i}', str(i), APPLE_TEXT)
+
+    assert len(store) == 2
+    assert 'http://example.com/0' not in store
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_app_defers_the_agent_and_its_libraries(tmp_path):
+    env = {**os.environ, 'GEMINI_API_KEY': os.environ.get('GEMINI_API_KEY') or 'placeholder',
+           'WEBSIGHT_WARMUP': '0', 'WEBSIGHT_STATE_BACKEND': 'memory',
+           'WEBSIGHT_REPORT_PATH': str(tmp_path / 'reports.db')}
+    script = ("import sys, app; "
+              "print(sorted(m for m in ('google.generativeai', 'duckduckgo_search', 'bs4') if m in sys.modules)); "
+              "print(app.app.test_client().get('/').status_code, app.agent_instance)")
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-2:] == ['[]', '200 None']
@@ -0,0 +1,175 @@
+import threading
+import time
+
+import pytest
+
+from server.state_store import InMemoryStateStore, RedisStateStore, RespClient, SQLiteStateStore
+from tests.redis_stand_in import RedisStandIn
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        yield InMemoryStateStore()
+    elif request.param == 'sqlite':
+        yield SQLiteStateStore(str(tmp_path / 'state.db'))
+    else:
+        server = RedisStandIn()
+        yield RedisStateStore(RespClient('127.0.0.1', server.port))
+        server.close()
+
+
+def test_progress_updates_and_sources(store):
+    store.create_progress('s1', {'status': 'queued', 'sources': []})
+
+    assert store.update_progress('s1', {'status': 'searching', 'progress_pct': 20})
+    store.upsert_source('s1', 'https://a.example', {'title': 'A', 'status': 'processing'})
+    source = store.upsert_source('s1', 'https://a.example', {'status': 'analyzed'})
+
+    progress = store.get_progress('s1')
+    assert progress['status'] == 'searching'
+    assert progress['sources'] == [{'url': 'https://a.example', 'title': 'A', 'status': 'analyzed'}]
+    assert source['status'] == 'analyzed'
+
+    assert not store.update_progress('missing', {'status': 'x'})
+    assert store.upsert_source('missing', 'https://a.example', {}) is None
+    store.delete_progress('s1')
+    assert store.get_progress('s1') is None
+
+
+def test_history_is_capped(store):
+    for i in range(5):
+        store.append_history('u1', {'query': f'q{i}'}, max_entries=3)
+
+    assert [h['query'] for h in store.get_history('u1')] == ['q2', 'q3', 'q4']
+    assert store.get_history('u2') == []
+    store.clear_history('u1')
+    assert store.get_history('u1') == []
+
+
+def test_json_values(store):
+    assert store.get_json('k') is None
+    store.set_json('k', [{'query': 'q', 'findings': ['f']}])
+    assert store.get_json('k') == [{'query': 'q', 'findings': ['f']}]
+    assert store.setdefault_json('secret', 'first') == 'first'
+    assert store.setdefault_json('secret', 'second') == 'first'
+    store.delete_json('k')
+    assert store.get_json('k') is None
+
+
+def test_concurrent_json_updates_are_all_kept(store):
+    # Like conversation turns of one user finishing together
+    threads = [threading.Thread(target=store.update_json,
+                                args=('memory:u1', lambda turns, i=i: (turns or []) + [i], 60))
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert sorted(store.get_json('memory:u1')) == list(range(8))
+
+
+def test_events_wake_waiting_subscriber(store):
+    assert store.publish_event('s1', {'type': 'update', 'changes': {'status': 'starting'}}) == 1
+    received = []
+
+    def subscriber():
+        received.extend(store.wait_events('s1', after_seq=1, timeout=5))
+
+    thread = threading.Thread(target=subscriber)
+    thread.start()
+    time.sleep(0.1)
+    started = time.time()
+    store.publish_event('s1', {'type': 'update', 'changes': {'status': 'searching'}})
+    thread.join(timeout=5)
+
+    assert time.time() - started < 1.0
+    assert [e['seq'] for e in received] == [2]
+    assert received[0]['changes'] == {'status': 'searching'}
+    assert store.last_event_seq('s1') == 2
+    assert store.wait_events('s1', after_seq=2, timeout=0.05) == []
+
+
+def test_stores_share_state_across_instances(tmp_path):
+    # Two store objects on one database behave like two worker processes
+    path = str(tmp_path / 'state.db')
+    worker_a, worker_b = SQLiteStateStore(path), SQLiteStateStore(path)
+
+    worker_a.create_progress('s1', {'status': 'queued', 'sources': []})
+    worker_a.publish_event('s1', {'type': 'update', 'changes': {'status': 'complete'}})
+    worker_a.append_history('u1', {'query': 'q'})
+
+    assert worker_b.get_progress('s1')['status'] == 'queued'
+    assert worker_b.wait_events('s1', after_seq=0, timeout=1)[0]['changes'] == {'status': 'complete'}
+    assert worker_b.get_history('u1') == [{'query': 'q'}]
+
+
+def test_reap_drops_idle_sessions_and_users(tmp_path):
+    for store in [InMemoryStateStore(progress_ttl=0.05, history_ttl=0.05, max_sessions=2),
+                  SQLiteStateStore(str(tmp_path / 'state.db'), progress_ttl=0.05, history_ttl=0.05,
+                                   max_sessions=2)]:
+        for sid in ['s1', 's2', 's3']:
+            store.create_progress(sid, {'status': 'complete', 'sources': []})
+            store.publish_event(sid, {'type': 'update', 'changes': {'status': 'complete'}})
+        store.append_history('u1', {'query': 'q'})
+        store.set_json('memory:u1', [], ttl_seconds=0.05)
+        store.reap()
+        assert store.get_progress('s1') is None  # over the session cap
+        assert store.get_progress('s3') is not None
+
+        time.sleep(0.1)
+        removed = store.reap()
+        assert store.get_progress('s3') is None
+        assert store.get_history('u1') == []
+        assert store.get_json('memory:u1') is None
+        assert store.last_event_seq('s3') == 0
+        assert removed['history'] == 1
+
+
+def test_redis_updates_from_many_writers_are_not_lost():
+    server = RedisStandIn()
+    try:
+        # Two store objects on one server behave like two worker processes
+        stores = [RedisStateStore(RespClient('127.0.0.1', server.port)) for _ in range(2)]
+        stores[0].create_progress('s1', {'status': 'queued', 'sources': []})
+
+        def write(store, i):
+            store.update_progress('s1', {f'field_{i}': i})
+            store.upsert_source('s1', f'https://{i}.example', {'status': 'analyzed'})
+            store.publish_event('s1', {'type': 'update', 'changes': {'n': i}})
+
+        threads = [threading.Thread(target=write, args=(stores[i % 2], i)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        progress = stores[1].get_progress('s1')
+        assert all(progress[f'field_{i}'] == i for i in range(20))
+        assert len(progress['sources']) == 20
+        # Each event is stored with its own seq, in seq order
+        assert [e['seq'] for e in stores[0].wait_events('s1', after_seq=0, timeout=1)] == list(range(1, 21))
+    finally:
+        server.close()
+
+
+def test_redis_waiters_share_one_subscription():
+    server = RedisStandIn()
+    try:
+        publisher = RedisStateStore(RespClient('127.0.0.1', server.port))
+        waiter = RedisStateStore(RespClient('127.0.0.1', server.port))
+        waiter.event_poll_interval = 30  # only the subscription can wake it in time
+        for seq in range(1, 4):
+            publisher.publish_event('s1', {'type': 'update', 'changes': {'n': seq}})
+        assert [e['seq'] for e in waiter.wait_events('s1', after_seq=1, timeout=1)] == [2, 3]
+        time.sleep(0.2)  # the listener subscribes in the background
+
+        for seq in range(4, 7):
+            started = time.time()
+            timer = threading.Timer(0.1, publisher.publish_event, ('s1', {'type': 'update', 'changes': {}}))
+            timer.start()
+            assert [e['seq'] for e in waiter.wait_events('s1', after_seq=seq - 1, timeout=5)] == [seq]
+            assert time.time() - started < 2
+        assert len(server.subscribers[waiter._key('notify')]) == 1
+    finally:
+        server.close()
@@ -0,0 +1,99 @@
+import io
+import json
+import logging
+import queue
+import threading
+
+import pytest
+
+from agent import structured_log
+from agent.structured_log import (NonBlockingQueueHandler, configure_logging, current_context, flush_logging,
+                                  log_context, logging_stats)
+from server.worker_pool import ResearchWorkerPool
+
+
+@pytest.fixture
+def configure():
+    """configure_logging writing to a buffer; the root logger is restored afterwards."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    stream = io.StringIO()
+
+    def _configure(**settings):
+        configure_logging(stream=stream, **settings)
+        return stream
+
+    yield _configure
+    if structured_log._listener is not None:
+        structured_log._listener.stop()
+    structured_log._handler = structured_log._listener = None
+    root.handlers[:] = [h for h in saved_handlers if not isinstance(h, NonBlockingQueueHandler)]
+    root.setLevel(saved_level)
+
+
+def _records(stream):
+    flush_logging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_records_carry_context_extra_fields_and_traceback(configure):
+    stream = configure(level='INFO', fmt='json')
+    logger = logging.getLogger('websight.test')
+    with log_context(request_id='req-1', user_id='u1'):
+        logger.info("Search results found", extra={'results': 3})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Research failed")
+    logger.info("Outside")
+
+    first, failure, outside = _records(stream)
+    assert first['msg'] == "Search results found"
+    assert first['level'] == 'INFO' and first['logger'] == 'websight.test'
+    assert first['request_id'] == 'req-1' and first['user_id'] == 'u1' and first['results'] == 3
+    assert 'ValueError: boom' in failure['exc']
+    assert 'request_id' not in outside
+    assert current_context() == {}
+
+
+def test_debug_records_are_sampled(configure):
+    stream = configure(level='DEBUG', fmt='json', debug_sample_rate=0.0)
+    logger = logging.getLogger('websight.test')
+    for _ in range(20):
+        logger.debug("Parsed model response")
+    logger.info("Kept")
+    logger.info("Sampled away", extra={'sample': 0.0})
+
+    assert [record['msg'] for record in _records(stream)] == ["Kept"]
+    assert logging_stats()['sampled_out'] == 21
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    logger = logging.getLogger('websight.test.queue')
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.warning("first")
+        logger.warning("second %s", "dropped")
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().msg == "first"
+
+
+def test_worker_pool_jobs_run_in_the_submitting_context():
+    seen = []
+    done = threading.Event()
+
+    def job():
+        seen.append(current_context())
+        done.set()
+
+    pool = ResearchWorkerPool(max_workers=1, max_queue=2)
+    with log_context(request_id='req-2'):
+        pool.submit('a', job)
+    assert done.wait(timeout=5)
+    assert seen == [{'request_id': 'req-2'}]
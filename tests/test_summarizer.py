@@ -0,0 +1,51 @@
+from tools.analyzer import ContentAnalyzerTool
+from tools.summarizer import ExtractiveSummarizer
+
+PAGE = """Solar Panels Explained
+Solar panel efficiency measures how much of the sunlight hitting a panel becomes electricity.
+Most residential solar panels today reach an efficiency between 18 and 22 percent.
+Monocrystalline panels usually have a higher efficiency than polycrystalline panels.
+Our company was founded in 1998 and has offices in twelve countries around the world.
+Monocrystalline panels usually have a higher efficiency than the polycrystalline panels.
+Panel efficiency drops slightly as the temperature of the cells rises on hot days.
+Subscribe to our newsletter for the latest deals on garden furniture and grills.
+"""
+
+
+def test_summary_and_key_points_follow_the_query():
+    result = ExtractiveSummarizer(summary_sentences=2, key_points=2).summarize(PAGE, "solar panel efficiency")
+
+    assert set(result) == {'summary', 'key_points', 'relevance_score', 'error', 'method'}
+    assert result['error'] is None and result['method'] == 'extractive'
+    assert 'efficiency' in result['summary']
+    assert 'newsletter' not in result['summary'] and 'founded' not in result['summary']
+    assert len(result['key_points']) == 2
+    # The repeated monocrystalline sentence is picked at most once
+    picked = [result['summary']] + result['key_points']
+    assert sum('Monocrystalline' in text for text in picked) <= 1
+    assert result['relevance_score'] == 0.6
+
+
+def test_unrelated_or_empty_content_scores_low():
+    summarizer = ExtractiveSummarizer()
+    assert summarizer.summarize(PAGE, "medieval castle architecture")['relevance_score'] == 0.1
+    assert summarizer.summarize("", "solar panel efficiency") == {
+        'summary': '', 'key_points': [], 'relevance_score': 0.0, 'error': None, 'method': 'extractive'}
+
+
+class _QuotaExhaustedModel:
+    def generate_content(self, prompt, generation_config=None):
+        raise RuntimeError("429 Resource has been exhausted (e.g. check quota).")
+
+
+def test_analyzer_summarizes_locally_when_the_model_fails():
+    analyzer = ContentAnalyzerTool(model=_QuotaExhaustedModel())
+
+    result = analyzer.analyze(PAGE, "solar panel efficiency")
+    assert result['error'] is None and result['method'] == 'extractive'
+    assert 'efficiency' in result['summary']
+    assert result['llm_error'].startswith("LLM generation failed: 429")
+
+    # Nothing to summarize: the failure is reported as before
+    failed = analyzer.analyze("Too short.", "solar panel efficiency")
+    assert failed['error'].startswith("LLM generation failed") and failed['relevance_score'] == 0.1
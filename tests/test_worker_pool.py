@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+
+from server.worker_pool import ResearchWorkerPool, QueueFullError, OwnerLimitError
+
+
+def test_pool_bounds_concurrency_and_rejects_when_queue_is_full():
+    release = threading.Event()
+    started = []
+    positions = {}
+
+    def job(name):
+        started.append(name)
+        release.wait(timeout=5)
+
+    pool = ResearchWorkerPool(max_workers=1, max_queue=2,
+                              on_position_change=lambda key, pos: positions.setdefault(key, []).append(pos))
+    assert pool.submit('a', job, 'a') == 0
+    # Let the worker pick up 'a' before queueing more work
+    for _ in range(100):
+        if started:
+            break
+        threading.Event().wait(0.01)
+    assert pool.submit('b', job, 'b') == 1
+    assert pool.submit('c', job, 'c') == 2
+
+    with pytest.raises(QueueFullError) as excinfo:
+        pool.submit('d', job, 'd')
+    assert excinfo.value.retry_after >= 1
+
+    metrics = pool.metrics()
+    assert (metrics['active'], metrics['queue_depth'], metrics['rejected']) == (1, 2, 1)
+    assert pool.position('c') == 2
+
+    release.set()
+    for _ in range(200):
+        if pool.metrics()['completed'] == 3:
+            break
+        threading.Event().wait(0.01)
+
+    assert started == ['a', 'b', 'c']
+    assert positions['c'][-1] == 0
+    assert 1 in positions['c']  # moved up when 'b' started
+    assert pool.metrics()['utilization'] == 0.0
+
+
+def test_cancelled_job_leaves_the_queue_without_running():
+    release = threading.Event()
+    ran = []
+    pool = ResearchWorkerPool(max_workers=1, max_queue=4)
+
+    pool.submit('a', lambda: (ran.append('a'), release.wait(timeout=5)))
+    for _ in range(100):
+        if ran:
+            break
+        threading.Event().wait(0.01)
+    pool.submit('b', ran.append, 'b')
+    pool.submit('c', ran.append, 'c')
+
+    assert pool.cancel('b') is True
+    assert pool.cancel('a') is False  # already running
+    assert pool.position('c') == 1
+
+    release.set()
+    for _ in range(200):
+        if pool.metrics()['completed'] == 2:
+            break
+        threading.Event().wait(0.01)
+    assert ran == ['a', 'c']
+    assert pool.metrics()['cancelled'] == 1
+
+
+def test_light_user_is_served_before_a_heavy_users_backlog():
+    release = threading.Event()
+    ran = []
+
+    def job(name):
+        ran.append(name)
+        release.wait(timeout=5)
+
+    pool = ResearchWorkerPool(max_workers=1, max_queue=10)
+    pool.submit('heavy-1', job, 'heavy-1', owner='heavy')
+    for _ in range(100):
+        if ran:
+            break
+        threading.Event().wait(0.01)
+    for i in range(2, 6):
+        pool.submit(f'heavy-{i}', job, f'heavy-{i}', owner='heavy')
+    assert pool.submit('light-1', job, 'light-1', owner='light') == 1
+
+    release.set()
+    for _ in range(200):
+        if pool.metrics()['completed'] == 6:
+            break
+        threading.Event().wait(0.01)
+    assert ran[:3] == ['heavy-1', 'light-1', 'heavy-2']
+    assert pool.usage('heavy')['completed'] == 5
+
+
+def test_owner_caps_bound_running_and_queued_jobs():
+    release = threading.Event()
+    ran = []
+
+    def job(name):
+        ran.append(name)
+        release.wait(timeout=5)
+
+    pool = ResearchWorkerPool(max_workers=2, max_queue=10, max_active_per_owner=1, max_queued_per_owner=1)
+    pool.submit('a1', job, 'a1', owner='a')
+    for _ in range(100):
+        if ran:
+            break
+        threading.Event().wait(0.01)
+    pool.submit('a2', job, 'a2', owner='a')
+    with pytest.raises(OwnerLimitError):
+        pool.submit('a3', job, 'a3', owner='a')
+    pool.submit('b1', job, 'b1', owner='b')
+    for _ in range(100):
+        if len(ran) == 2:
+            break
+        threading.Event().wait(0.01)
+
+    # A free worker does not take a2 while a1 is still running
+    assert sorted(ran) == ['a1', 'b1']
+    assert pool.usage('a') == {'queued': 1, 'active': 1, 'submitted': 2, 'completed': 0, 'run_seconds': 0.0}
+    release.set()
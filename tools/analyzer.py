@@ -1,28 +1,65 @@
 import google.generativeai as genai
-import os
 import json
-import re
-from dotenv import load_dotenv
+import logging
+from agent.cancellation import ResearchCancelled, check_cancelled
+from agent.llm_stats import llm_stats
+from agent.gemini import configure_gemini
+from tools.summarizer import ExtractiveSummarizer
 
-# Load environment variables once
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
-else:
-    print("Warning: GEMINI_API_KEY not found in environment variables. Analyzer tool will not work.")
+logger = logging.getLogger(__name__)
+
+# Gemini constrains its output to this schema, so a well-behaved answer parses in one step
+ANALYSIS_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'summary': {'type': 'STRING'},
+        'key_points': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+        'relevance_score': {'type': 'NUMBER'},
+    },
+    'required': ['summary', 'key_points', 'relevance_score'],
+}
+
+# Corrective follow-up for an answer that didn't match the schema; only the answer is resent, not the page
+REPAIR_PROMPT = """Your previous answer to a content analysis task could not be used: {problem}.
+
+PREVIOUS ANSWER:
+{previous}
+
+Return ONLY the corrected JSON object, keeping the content of the previous answer, with exactly these keys:
+"summary" (string), "key_points" (list of strings) and "relevance_score" (number between 0.0 and 1.0)."""
+
+# Longest previous answer quoted in a repair prompt
+MAX_REPAIR_ECHO_CHARS = 8000
+
+
+class AnalysisParseError(ValueError):
+    """Raised when the model's answer doesn't match ANALYSIS_SCHEMA."""
+
+    def __init__(self, reason: str, problem: str):
+        super().__init__(problem)
+        self.reason = reason
 
 class ContentAnalyzerTool:
     """Tool for analyzing scraped web content using an LLM."""
 
-    def __init__(self, model_name="gemini-2.0-flash"):
+    def __init__(self, model_name="gemini-2.0-flash", model=None, summarizer=None, max_repairs: int = 1):
         """
         Initializes the ContentAnalyzerTool.
 
         Args:
             model_name: The name of the Generative AI model to use.
+            model: Optional model to use instead of Gemini (e.g. a recorded or fake one);
+                anything with a compatible generate_content(prompt, generation_config=...) works.
+            summarizer: Local summarizer answering when the model fails; an ExtractiveSummarizer by default.
+            max_repairs: Corrective retries for an answer that doesn't match the schema.
         """
-        if not api_key:
+        self.summarizer = summarizer if summarizer is not None else ExtractiveSummarizer()
+        self.max_repairs = max_repairs
+        self.generation_config = {"response_mime_type": "application/json", "response_schema": ANALYSIS_SCHEMA}
+        if model is not None:
+             self.model = model
+             return
+        if not configure_gemini():
              raise ValueError("Cannot initialize ContentAnalyzerTool without GEMINI_API_KEY.")
         try:
              # Set safety settings to be more permissive for content analysis
@@ -36,20 +73,21 @@ class ContentAnalyzerTool:
              self.model = genai.GenerativeModel(
                  model_name,
                  safety_settings=safety_settings,
-                 generation_config={"temperature": 0.1, "response_mime_type": "application/json"}  # Force JSON response
+                 generation_config={"temperature": 0.1, **self.generation_config}  # Schema-constrained JSON
              )
-             print(f"--- Content Analyzer initialized with model: {model_name} ---")
+             logger.info("Content Analyzer initialized", extra={'model': model_name})
         except Exception as e:
-             print(f"--- Failed to initialize Generative Model: {e} ---")
+             logger.error("Failed to initialize Generative Model", extra={'error': str(e)})
              raise
 
-    def analyze(self, content: str, query_context: str) -> dict:
+    def analyze(self, content: str, query_context: str, cancel_token=None) -> dict:
         """
         Analyzes the provided text content for relevance to the query context.
 
         Args:
             content: The text content scraped from a web page.
             query_context: The original user query or relevant sub-question.
+            cancel_token: Optional CancelToken checked before and after the LLM call.
 
         Returns:
             A dictionary containing:
@@ -57,13 +95,21 @@ class ContentAnalyzerTool:
             - 'key_points': A list of key takeaways related to the query.
             - 'relevance_score': A float between 0.0 and 1.0 indicating relevance.
             - 'error': An error message if analysis failed, otherwise None.
+            An answer that doesn't match ANALYSIS_SCHEMA is sent back to the model for
+            correction (up to max_repairs times). When the model fails, or never gives
+            a usable answer, the content is summarized locally instead: the result
+            then also has 'method' ('extractive') and 'llm_error' (why the model failed).
+
+        Raises:
+            ResearchCancelled: If the cancel token is triggered.
         """
-        print(f"--- Analyzing content (length: {len(content)}) for query: {query_context} ---")
+        check_cancelled(cancel_token)
+        logger.info("Analyzing content", extra={'chars': len(content), 'query': query_context})
 
         # Truncate content if too long to avoid excessive API costs/time
         max_len = 50000 # Adjust as needed
         if len(content) > max_len:
-            print(f"--- Content truncated from {len(content)} to {max_len} characters for analysis ---")
+            logger.debug("Content truncated for analysis", extra={'chars': len(content), 'max_chars': max_len})
             content = content[:max_len]
 
         # Extract keywords from the query to help with relevance determination
@@ -102,179 +148,91 @@ You must output ONLY a valid JSON object with these exact keys:
 }}
 </task>"""
 
-        try:
-            # Generate content using the Gemini model with structured format
-            response = self.model.generate_content(
-                prompt,
-                generation_config={"response_mime_type": "application/json"}
-            )
-
-            # Enhanced logic to parse potentially malformed responses
+        errors = []
+        for attempt in range(self.max_repairs + 1):
             try:
-                if not hasattr(response, 'text') or not response.text:
-                    print("--- Analysis failed: Empty response from model ---")
-                    return self._create_fallback_response("Empty response from model")
-                
-                raw_text = response.text
-                print(f"--- Raw response length: {len(raw_text)} characters ---")
-                
-                # First try direct JSON parsing
-                try:
-                    # Clean potential markdown formatting from the response
-                    json_str = raw_text.strip()
-                    if json_str.startswith('```json'):
-                        json_str = json_str[7:]
-                    if json_str.endswith('```'):
-                        json_str = json_str[:-3]
-                    json_str = json_str.strip()
-                    
-                    analysis_result = json.loads(json_str)
-                    print("--- Analysis successful with direct JSON parsing ---")
-                    
-                    # Validate required keys exist
-                    self._validate_and_fix_keys(analysis_result)
-                    analysis_result['error'] = None
-                    return analysis_result
-                except json.JSONDecodeError:
-                    # If direct parsing fails, try to extract JSON using regex
-                    json_pattern = r'({[\s\S]*})'
-                    json_matches = re.search(json_pattern, raw_text)
-                    
-                    if json_matches:
-                        json_str = json_matches.group(1)
-                        try:
-                            analysis_result = json.loads(json_str)
-                            print("--- Analysis successful with JSON extraction ---")
-                            
-                            # Validate required keys exist
-                            self._validate_and_fix_keys(analysis_result)
-                            analysis_result['error'] = None
-                            return analysis_result
-                        except json.JSONDecodeError as je:
-                            print(f"--- Failed to parse extracted JSON: {je} ---")
-                
-                # If all JSON parsing attempts fail, try to extract data in a more forgiving way
-                print("--- Attempting to extract data from non-JSON response ---")
-                return self._extract_data_from_text(raw_text, query_context)
-                
+                raw_text = self._generate(prompt, cancel_token)
+            except ResearchCancelled:
+                raise
             except Exception as e:
-                print(f"--- Analysis processing error: {e} ---")
-                return self._create_fallback_response(f"Processing error: {e}")
-
-        except Exception as e:
-            error_msg = f"LLM generation failed: {e}"
-            print(f"--- Analysis failed: {error_msg} ---")
-            return self._create_fallback_response(error_msg)
-    
-    def _validate_and_fix_keys(self, analysis_result):
-        """Validate and fix missing keys in the analysis result."""
-        required_keys = ['summary', 'key_points', 'relevance_score']
-        if not all(k in analysis_result for k in required_keys):
-            missing = [k for k in required_keys if k not in analysis_result]
-            print(f"--- JSON missing required keys: {missing} ---")
-            # Add missing keys with default values
-            for key in missing:
-                if key == 'summary':
-                    analysis_result[key] = "Content related to query but missing details"
-                elif key == 'key_points':
-                    analysis_result[key] = ["Information extracted from webpage"]
-                elif key == 'relevance_score':
-                    analysis_result[key] = 0.5
-        
-        # Ensure relevance_score is a float
-        if 'relevance_score' in analysis_result and not isinstance(analysis_result['relevance_score'], float):
+                error_msg = f"LLM generation failed: {e}"
+                logger.warning("Analysis failed", extra={'error': error_msg})
+                if errors:
+                    llm_stats.record_parse('invalid', errors)
+                return self._summarize_locally(content, query_context, error_msg)
             try:
-                analysis_result['relevance_score'] = float(analysis_result['relevance_score'])
-            except (ValueError, TypeError):
-                analysis_result['relevance_score'] = 0.5
-        
-        # Ensure key_points is a list
-        if 'key_points' in analysis_result and not isinstance(analysis_result['key_points'], list):
-            if isinstance(analysis_result['key_points'], str):
-                analysis_result['key_points'] = [analysis_result['key_points']]
-            else:
-                analysis_result['key_points'] = ["Information extracted from webpage"]
-    
-    def _extract_data_from_text(self, text: str, query_context: str) -> dict:
-        """Extract structured data from unstructured text response."""
-        result = {
-            'summary': '',
-            'key_points': [],
-            'relevance_score': 0.3,  # Default to low-moderate relevance
+                analysis = self._parse_response(raw_text)
+            except AnalysisParseError as e:
+                errors.append(e.reason)
+                problem = str(e)
+                logger.info("Model answer does not match the schema",
+                            extra={'reason': e.reason, 'attempt': attempt + 1})
+                # An empty answer is simply asked again; anything else is sent back to be corrected
+                if e.reason != 'empty':
+                    prompt = REPAIR_PROMPT.format(problem=problem, previous=raw_text[:MAX_REPAIR_ECHO_CHARS])
+                continue
+            llm_stats.record_parse('repaired' if errors else 'valid', errors)
+            return analysis
+
+        llm_stats.record_parse('invalid', errors)
+        return self._summarize_locally(content, query_context, f"Invalid model output: {problem}")
+
+    def _generate(self, prompt: str, cancel_token=None) -> str:
+        """Calls the model with the schema-constrained config; returns its text (empty if it gave none)."""
+        with llm_stats.timed():
+            response = self.model.generate_content(prompt, generation_config=self.generation_config)
+        # The call itself can't be interrupted; drop its result if the run was cancelled meanwhile
+        check_cancelled(cancel_token)
+        # .text raises when the answer was blocked or has no parts
+        return response.text or ''
+
+    def _parse_response(self, raw_text: str) -> dict:
+        """
+        Validates the model's answer against ANALYSIS_SCHEMA.
+
+        Returns:
+            The analysis dict, with whitespace trimmed, empty key points dropped
+            and the relevance score clamped to 0.0-1.0.
+
+        Raises:
+            AnalysisParseError: If the answer is not a JSON object with the schema's fields and types.
+        """
+        if not raw_text.strip():
+            raise AnalysisParseError('empty', "empty answer")
+        try:
+            data = json.loads(raw_text)
+        except json.JSONDecodeError as e:
+            raise AnalysisParseError('not_json', f"not valid JSON ({e})")
+        if not isinstance(data, dict):
+            raise AnalysisParseError('not_object', "not a JSON object")
+        missing = [key for key in ANALYSIS_SCHEMA['required'] if key not in data]
+        if missing:
+            raise AnalysisParseError('missing_keys', f"missing {', '.join(missing)}")
+        summary, key_points, score = data['summary'], data['key_points'], data['relevance_score']
+        if not isinstance(summary, str) or not isinstance(key_points, list) or \
+                not all(isinstance(point, str) for point in key_points) or \
+                isinstance(score, bool) or not isinstance(score, (int, float)):
+            raise AnalysisParseError('wrong_types', "summary must be a string, key_points a list of strings "
+                                                    "and relevance_score a number")
+        return {
+            'summary': summary.strip(),
+            'key_points': [point.strip() for point in key_points if point.strip()],
+            'relevance_score': min(1.0, max(0.0, float(score))),
             'error': None
         }
-        
-        # Try to find a summary (look for paragraphs or sentences after "summary" word)
-        summary_patterns = [
-            r'["\']?summary["\']?\s*:\s*["\']([^"\']+)["\']',  # "summary": "text"
-            r'summary\s*(?:is|:)\s*([^\.]+\.)',  # Summary is: text. or Summary: text.
-            r'([^\.]{20,200}\.)'  # Just grab the first substantial sentence as a fallback
-        ]
-        
-        for pattern in summary_patterns:
-            summary_match = re.search(pattern, text, re.IGNORECASE)
-            if summary_match:
-                result['summary'] = summary_match.group(1).strip()
-                break
-        
-        # Try to find key points (look for bullet points, numbered lists, or "key points" sections)
-        key_points_patterns = [
-            r'["\']?key_points["\']?\s*:\s*\[(.*?)\]',  # "key_points": ["point1", "point2"]
-            r'(?:key\s*points|main\s*points|key\s*takeaways)(?:\s*:|\s*are\s*:)(.*?)(?:\n\n|\Z)',  # Key points: text
-            r'[-•*]\s*([^\n]+)'  # Bullet points: - Point text or • Point text or * Point text
-        ]
-        
-        for pattern in key_points_patterns:
-            if pattern.startswith('[-•*]'):
-                # Handle bullet point pattern specially
-                bullet_matches = re.findall(pattern, text)
-                if bullet_matches and len(bullet_matches) >= 2:  # At least 2 bullet points to consider it a list
-                    result['key_points'] = [point.strip() for point in bullet_matches[:5]]  # Limit to 5 points
-                    break
-            else:
-                points_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-                if points_match:
-                    points_text = points_match.group(1).strip()
-                    # Split by commas, quotes, or new lines
-                    points = re.split(r'[,"\'\n]+', points_text)
-                    result['key_points'] = [point.strip() for point in points if point.strip()][:5]
-                    break
-        
-        # If we couldn't extract key points, create some basic ones
-        if not result['key_points'] and result['summary']:
-            result['key_points'] = ["Information related to " + query_context]
-        
-        # Try to find relevance score (look for numbers between 0 and 1)
-        relevance_patterns = [
-            r'["\']?relevance_score["\']?\s*:\s*(0?\.[0-9]+)',  # "relevance_score": 0.7
-            r'relevance\s*(?:score|rating|is)\s*:?\s*(0?\.[0-9]+)',  # Relevance score: 0.7
-            r'(0?\.[0-9]+)(?:\s*out of\s*1)?'  # Just a decimal like 0.7 or 0.7 out of 1
-        ]
-        
-        for pattern in relevance_patterns:
-            relevance_match = re.search(pattern, text, re.IGNORECASE)
-            if relevance_match:
-                try:
-                    score = float(relevance_match.group(1))
-                    if 0 <= score <= 1:
-                        result['relevance_score'] = score
-                        break
-                except ValueError:
-                    continue
-        
-        # Determine relevance based on content analysis if no explicit score was found
-        if result['summary'] and not result['key_points']:
-            # Some summary but no key points = low relevance
-            result['relevance_score'] = 0.2
-        elif not result['summary'] and result['key_points']:
-            # No summary but some key points = low-moderate relevance
-            result['relevance_score'] = 0.3
-        elif result['summary'] and result['key_points']:
-            # Both summary and key points = moderate relevance at minimum
-            result['relevance_score'] = max(0.5, result['relevance_score'])
-        
-        return result
-    
+
+    def _summarize_locally(self, content: str, query_context: str, error_msg: str) -> dict:
+        """Analysis of the content by the extractive summarizer, for when the model failed."""
+        try:
+            analysis = self.summarizer.summarize(content, query_context)
+        except Exception as e:
+            logger.warning("Local summarization failed", extra={'error': str(e)})
+            return self._create_fallback_response(error_msg)
+        if not analysis['summary']:
+            return self._create_fallback_response(error_msg)
+        logger.info("Summarized content locally after the model failed", extra={'llm_error': error_msg})
+        return {**analysis, 'llm_error': error_msg}
+
     def _create_fallback_response(self, error_msg: str) -> dict:
         """Create a fallback response when analysis fails."""
         return {
@@ -300,7 +258,7 @@ You must output ONLY a valid JSON object with these exact keys:
 
 # Example usage (for testing - requires API key in .env)
 if __name__ == '__main__':
-    if not api_key:
+    if not configure_gemini():
         print("Skipping ContentAnalyzerTool test because GEMINI_API_KEY is not set.")
     else:
         analyzer = ContentAnalyzerTool()
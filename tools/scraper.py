@@ -1,56 +1,126 @@
+import os
+import logging
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound
 import time
 import random
+from agent.cancellation import ResearchCancelled, check_cancelled
+
+logger = logging.getLogger(__name__)
+
+# Tags whose content starts on a new block in the extracted text
+BLOCK_TAGS = [
+    'p', 'div', 'section', 'article', 'header', 'footer', 'nav', 'aside', 'main',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'dt', 'dd', 'tr', 'td', 'th',
+    'pre', 'blockquote', 'figcaption', 'br', 'hr', 'table', 'form'
+]
+# Marks block boundaries while the soup is flattened; unlikely to occur in page text
+_BLOCK_MARK = '\x1e'
+# BeautifulSoup tree builder used to parse pages; see benchmarks/extraction_bench.py for how they compare
+DEFAULT_PARSER = 'html.parser'
 
 class WebScraperTool:
     """Tool for scraping web pages."""
 
-    def scrape(self, url: str, timeout: int = 10) -> dict:
+    def __init__(self, parser: str = None):
+        """
+        Initializes the WebScraperTool.
+
+        Args:
+            parser: BeautifulSoup parser backend ('html.parser', 'lxml', 'html5lib'); defaults to
+                WEBSIGHT_HTML_PARSER or html.parser. An unavailable parser falls back to html.parser.
+        """
+        parser = parser or os.environ.get('WEBSIGHT_HTML_PARSER', DEFAULT_PARSER)
+        try:
+            BeautifulSoup('', parser)
+        except FeatureNotFound:
+            logger.warning("HTML parser is not installed, using the default", extra={'parser': parser, 'default': DEFAULT_PARSER})
+            parser = DEFAULT_PARSER
+        self.parser = parser
+
+    def scrape(self, url: str, timeout: int = 10, cancel_token=None) -> dict:
         """
         Scrapes the text content from a given URL.
 
         Args:
             url: The URL of the web page to scrape.
             timeout: The timeout in seconds for the request.
+            cancel_token: Optional CancelToken; the download stops as soon as it is cancelled.
 
         Returns:
             A dictionary containing:
             - 'url': The original URL.
-            - 'raw_text': The extracted text content, or None if scraping failed.
+            - 'raw_text': The extracted text content with one block (paragraph, list item,
+              heading, ...) per line, or None if scraping failed.
             - 'error': An error message if scraping failed, otherwise None.
+
+        Raises:
+            ResearchCancelled: If the cancel token is triggered during the fetch.
         """
-        print(f"--- Scraping URL: {url} ---")
+        logger.info("Scraping URL", extra={'url': url})
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
             # Simulate network delay
-            time.sleep(random.uniform(0.8, 2.0))
-            response = requests.get(url, headers=headers, timeout=timeout)
-            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-
-            soup = BeautifulSoup(response.text, 'html.parser')
+            delay = random.uniform(0.8, 2.0)
+            if cancel_token is not None:
+                cancel_token.wait(delay)
+            else:
+                time.sleep(delay)
+            check_cancelled(cancel_token)
+            with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+                html = self._read_body(response, cancel_token)
 
-            # Remove script and style elements
-            for script_or_style in soup(["script", "style"]):
-                script_or_style.decompose()
+            text = self.extract_text(html)
 
-            # Get text, trying to preserve some structure with spaces
-            text = soup.get_text(separator=' ', strip=True)
-
-            print(f"--- Successfully scraped {len(text)} characters from {url} ---")
+            logger.info("Scraped page", extra={'url': url, 'chars': len(text)})
             return {'url': url, 'raw_text': text, 'error': None}
 
+        except ResearchCancelled:
+            logger.info("Scraping cancelled", extra={'url': url})
+            raise
         except requests.exceptions.RequestException as e:
             error_msg = f"Request failed: {e}"
-            print(f"--- Scraping failed for {url}: {error_msg} ---")
+            logger.warning("Scraping failed", extra={'url': url, 'error': error_msg})
             return {'url': url, 'raw_text': None, 'error': error_msg}
         except Exception as e:
             error_msg = f"An unexpected error occurred during scraping: {e}"
-            print(f"--- Scraping failed for {url}: {error_msg} ---")
+            logger.warning("Scraping failed", extra={'url': url, 'error': error_msg})
             return {'url': url, 'raw_text': None, 'error': error_msg}
 
+    @staticmethod
+    def _read_body(response, cancel_token=None) -> str:
+        """Reads a streamed response in chunks, checking for cancellation between them."""
+        chunks = []
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            check_cancelled(cancel_token)
+            chunks.append(chunk)
+        return b''.join(chunks).decode(response.encoding or 'utf-8', errors='replace')
+
+    def extract_text(self, html: str) -> str:
+        """
+        Extracts readable text from HTML, keeping one block per line.
+
+        Keeping block boundaries lets later stages work per paragraph (for
+        example to recognise boilerplate repeated across pages).
+        """
+        soup = BeautifulSoup(html, self.parser)
+
+        # Remove script and style elements
+        for script_or_style in soup(["script", "style"]):
+            script_or_style.decompose()
+
+        for block in soup.find_all(BLOCK_TAGS):
+            block.insert_before(_BLOCK_MARK)
+            block.insert_after(_BLOCK_MARK)
+
+        # Get text, trying to preserve some structure with spaces
+        text = soup.get_text(separator=' ')
+        blocks = (' '.join(block.split()) for block in text.split(_BLOCK_MARK))
+        return '\n'.join(block for block in blocks if block)
+
 # Example usage (for testing)
 if __name__ == '__main__':
     scraper_tool = WebScraperTool()
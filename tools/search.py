@@ -1,38 +1,46 @@
 from duckduckgo_search import DDGS
+import logging
 import time
 import random
+from agent.cancellation import check_cancelled
+
+logger = logging.getLogger(__name__)
 
 class WebSearchTool:
     """Tool for performing web searches using DuckDuckGo."""
 
-    def search(self, query: str, num_results: int = 5) -> list[dict]:
+    def search(self, query: str, num_results: int = 5, cancel_token=None) -> list[dict]:
         """
         Performs a web search for the given query.
 
         Args:
             query: The search query string.
             num_results: The maximum number of results to return.
+            cancel_token: Optional CancelToken checked before each search request.
 
         Returns:
             A list of dictionaries, where each dictionary represents a search result
             and contains 'title', 'href' (URL), and 'body' (snippet).
             Returns an empty list if the search fails.
         """
-        print(f"--- Performing web search for: {query} ---")
+        logger.info("Performing web search", extra={'query': query})
         
         # First attempt with original query
-        results = self._perform_search(query, num_results)
+        check_cancelled(cancel_token)
+        results = self._perform_search(query, num_results, cancel_token)
         
         # If no results are found, try simplifying the query
         if not results:
             simplified_query = self._simplify_query(query)
             if simplified_query != query:
-                print(f"--- No results found with original query. Trying simplified query: {simplified_query} ---")
-                results = self._perform_search(simplified_query, num_results)
+                check_cancelled(cancel_token)
+                logger.info("No results, trying a simplified query", extra={'query': simplified_query})
+                results = self._perform_search(simplified_query, num_results, cancel_token)
+        check_cancelled(cancel_token)
         
         return results
     
-    def _perform_search(self, query: str, num_results: int) -> list[dict]:
+    def _perform_search(self, query: str, num_results: int, cancel_token=None) -> list[dict]:
         """Helper method to perform the actual search."""
         try:
             # Use DDGS context manager for potentially cleaner resource handling
@@ -40,10 +48,14 @@ class WebSearchTool:
                 results = list(ddgs.text(query, max_results=num_results))
             
             # Simulate network delay slightly
-            time.sleep(random.uniform(0.5, 1.5))
+            delay = random.uniform(0.5, 1.5)
+            if cancel_token is not None:
+                cancel_token.wait(delay)
+            else:
+                time.sleep(delay)
 
             if not results:
-                print("--- No results found. ---")
+                logger.info("Search found no results")
                 return []
 
             # Format results to match expected output structure
@@ -51,10 +63,10 @@ class WebSearchTool:
                 {'title': r.get('title', ''), 'url': r.get('href', ''), 'snippet': r.get('body', '')}
                 for r in results
             ]
-            print(f"--- Found {len(formatted_results)} results. ---")
+            logger.info("Search results found", extra={'results': len(formatted_results)})
             return formatted_results
         except Exception as e:
-            print(f"--- Web search failed: {e} ---")
+            logger.warning("Web search failed", extra={'error': str(e)})
             return []
     
     def _simplify_query(self, query: str) -> str:
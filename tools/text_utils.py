@@ -0,0 +1,92 @@
+import re
+from html import unescape
+
+# Common English words that carry little meaning for matching and ranking
+STOP_WORDS = {
+    'a', 'an', 'the', 'and', 'or', 'but', 'if', 'because', 'as', 'what',
+    'when', 'where', 'how', 'why', 'who', 'whom', 'which', 'tell', 'me',
+    'about', 'can', 'you', 'please', 'need', 'would', 'could', 'should', 'is',
+    'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do',
+    'does', 'did', 'will', 'shall', 'may', 'might', 'must', 'current', 'of',
+    'in', 'on', 'at', 'to', 'for', 'from', 'by', 'with', 'it', 'its', 'this',
+    'that', 'these', 'those', 'there', 'their', 'they', 'them', 'than', 'then',
+    'so', 'not', 'no', 'into', 'over', 'also', 'more', 'most', 'some', 'any',
+    'such', 'our', 'your', 'his', 'her', 'we', 'i', 'my', 'all', 'just', 'get'
+}
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.'-]*[a-z0-9+#]|[a-z0-9]")
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(])')
+
+
+def tokenize(text: str, drop_stop_words: bool = True) -> list[str]:
+    """
+    Splits text into lowercase word tokens.
+
+    Args:
+        text: The text to tokenize.
+        drop_stop_words: Whether common stop words should be removed.
+
+    Returns:
+        A list of tokens in their original order.
+    """
+    if not text:
+        return []
+    tokens = _WORD_RE.findall(text.lower())
+    if drop_stop_words:
+        tokens = [t for t in tokens if t not in STOP_WORDS]
+    return tokens
+
+
+def split_sentences(text: str) -> list[str]:
+    """Splits text into sentences on terminal punctuation."""
+    if not text:
+        return []
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+def split_passages(text: str, max_chars: int = 600) -> list[str]:
+    """
+    Splits text into passages of roughly max_chars characters.
+
+    Line breaks are treated as block boundaries first; long blocks are packed
+    sentence by sentence so a passage never cuts a sentence in half.
+    """
+    passages = []
+    current = ''
+    for block in (b.strip() for b in text.splitlines()):
+        if not block:
+            continue
+        pieces = split_sentences(block) if len(block) > max_chars else [block]
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > max_chars:
+                passages.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_BLOCK_TAG_RE = re.compile(r'</?(?:p|h[1-6]|li|ul|ol|div|br|tr|table|section|article)\b[^>]*>', re.IGNORECASE)
+_SPACE_RE = re.compile(r'[ \t\r\f\v]+')
+
+
+def strip_html(html: str) -> str:
+    """
+    Converts an HTML fragment (such as a formatted report) to plain text.
+
+    Block-level tags become line breaks so paragraph boundaries survive.
+    """
+    if not html:
+        return ''
+    text = _BLOCK_TAG_RE.sub('\n', html)
+    text = unescape(_TAG_RE.sub('', text))
+    lines = (_SPACE_RE.sub(' ', line).strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for prompt budgeting (roughly 4 characters per token)."""
+    return (len(text) + 3) // 4